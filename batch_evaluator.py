@@ -0,0 +1,150 @@
+"""
+Gevectoriseerde hand-evaluatie met NumPy, voor offline analyse van miljoenen handen.
+
+Gebruikt dezelfde kaartcodes als hand_evaluator (``rang * 4 + kleur``) en geeft
+exact dezelfde sterktes terug als hand_evaluator.evalueer().
+
+Voor 7 kaarten wordt een dichte tabel gebruikt: elke rang krijgt een sleutel
+zodat de som over 7 kaarten uniek is per multiset van rangen. Voor 5 en 6
+kaarten wordt er gezocht in de gesorteerde sleutels van hand_evaluator.
+"""
+
+import time
+
+import numpy as np
+
+from hand_evaluator import _FLUSH_TABEL, _RANG_SLEUTEL, _RANG_TABEL, _multisets
+
+STANDAARD_CHUNK = 1 << 16  # rijen per blok, houdt de tijdelijke arrays in de cache
+
+# Rangsleutels waarvan de som over 7 kaarten uniek is per multiset van rangen.
+_RANG_SLEUTEL_7 = np.array(
+    [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181], dtype=np.int32
+)
+# Kleursleutels waarvan de som over 7 kaarten verraadt of (en welke) kleur 5+ keer voorkomt.
+_KLEUR_SLEUTEL = np.array([0, 1, 8, 57], dtype=np.int32)
+
+
+def _bouw_tabellen():
+    sleutels_7 = []
+    sterktes_7 = []
+    for tellingen in _multisets(7):
+        sleutels_7.append(int(np.dot(tellingen, _RANG_SLEUTEL_7)))
+        sterktes_7.append(_RANG_TABEL[sum(aantal * _RANG_SLEUTEL[rang] for rang, aantal in enumerate(tellingen))])
+    if len(set(sleutels_7)) != len(sleutels_7):
+        raise RuntimeError("Rangsleutels voor 7 kaarten zijn niet uniek")
+    rang_7 = np.zeros(max(sleutels_7) + 1, dtype=np.int32)
+    rang_7[sleutels_7] = sterktes_7
+
+    flush_kleur = np.full(7 * int(_KLEUR_SLEUTEL.max()) + 1, -1, dtype=np.int8)
+    gezien = {}
+    for a in range(8):
+        for b in range(8 - a):
+            for c in range(8 - a - b):
+                d = 7 - a - b - c
+                telling = (a, b, c, d)
+                som = int(np.dot(telling, _KLEUR_SLEUTEL))
+                kleur = next((k for k in range(4) if telling[k] >= 5), -1)
+                if gezien.setdefault(som, kleur) != kleur:
+                    raise RuntimeError("Kleursleutels zijn niet uniek")
+                flush_kleur[som] = kleur
+
+    gesorteerd = np.array(sorted(_RANG_TABEL), dtype=np.int64)
+    sterktes = np.array([_RANG_TABEL[sleutel] for sleutel in gesorteerd.tolist()], dtype=np.int32)
+    return rang_7, flush_kleur, gesorteerd, sterktes
+
+
+_RANG_TABEL_7, _FLUSH_KLEUR, _GESORTEERDE_SLEUTELS, _GESORTEERDE_STERKTES = _bouw_tabellen()
+_FLUSH = np.array(_FLUSH_TABEL, dtype=np.int32)
+
+# Per kaartcode vooraf opgezocht, zodat er maar één gather per kolom nodig is.
+_CODES = np.arange(52)
+_KAART_RANG_7 = _RANG_SLEUTEL_7[_CODES >> 2]
+_KAART_RANG = np.array(_RANG_SLEUTEL, dtype=np.int64)[_CODES >> 2]
+_KAART_KLEUR_SLEUTEL = _KLEUR_SLEUTEL[_CODES & 3].astype(np.int16)
+_KAART_KLEUR = (_CODES & 3).astype(np.int8)
+_KAART_BIT = (1 << (_CODES >> 2)).astype(np.int16)
+
+
+def _kolomsom(tabel: np.ndarray, kolommen) -> np.ndarray:
+    # Kolom voor kolom optellen is veel sneller dan een gather op (N, 7) gevolgd door sum(axis=1).
+    som = tabel.take(kolommen[0])
+    for kolom in kolommen[1:]:
+        som += tabel.take(kolom)
+    return som
+
+
+def _evalueer_blok(kaarten: np.ndarray, out: np.ndarray) -> None:
+    kolommen = [kaarten[:, i] for i in range(kaarten.shape[1])]
+    if len(kolommen) == 7:
+        _RANG_TABEL_7.take(_kolomsom(_KAART_RANG_7, kolommen), out=out)
+        flush_kleur = _FLUSH_KLEUR.take(_kolomsom(_KAART_KLEUR_SLEUTEL, kolommen))
+        rijen = np.flatnonzero(flush_kleur >= 0)
+        if len(rijen) == 0:
+            return
+        # Alleen de rijen met een flush (zo'n 3%) krijgen de tweede, duurdere stap.
+        flush_rijen = kaarten[rijen]
+        in_kleur = _KAART_KLEUR[flush_rijen] == flush_kleur[rijen, None]
+        masker = np.where(in_kleur, _KAART_BIT[flush_rijen], 0).sum(axis=1)
+        out[rijen] = _FLUSH[masker]
+        return
+
+    # 5 of 6 kaarten: zoeken in de gesorteerde sleutels, flush per kleur.
+    sleutels = _kolomsom(_KAART_RANG, kolommen)
+    out[:] = _GESORTEERDE_STERKTES[np.searchsorted(_GESORTEERDE_SLEUTELS, sleutels)]
+    kleuren = _KAART_KLEUR[kaarten]
+    bits = _KAART_BIT[kaarten]
+    for kleur in range(4):
+        masker = np.where(kleuren == kleur, bits, 0).sum(axis=1)
+        np.maximum(out, _FLUSH[masker], out=out)
+
+
+def evalueer_batch(kaarten, chunk_grootte: int = STANDAARD_CHUNK, out: np.ndarray = None) -> np.ndarray:
+    """
+    Evalueer een (N, 7) array met kaartcodes (ook (N, 5) of (N, 6)).
+
+    Parameters:
+    - kaarten: integer array, elke rij één hand.
+    - chunk_grootte: aantal rijen per blok; bepaalt het geheugengebruik van de tussenresultaten.
+    - out: optioneel een (N,) int32 array om het resultaat in te schrijven.
+
+    Returns:
+    - (N,) int32 array met sterktes, vergelijkbaar met hand_evaluator.evalueer().
+    """
+    kaarten = np.asarray(kaarten)
+    if kaarten.ndim != 2 or kaarten.shape[1] not in (5, 6, 7):
+        raise ValueError(f"Verwacht een (N, 5/6/7) array, kreeg vorm {kaarten.shape}")
+    if kaarten.dtype.kind not in "iu":
+        raise ValueError("Kaartcodes moeten integers zijn")
+    n = len(kaarten)
+    if out is None:
+        out = np.empty(n, dtype=np.int32)
+    elif out.shape != (n,):
+        raise ValueError("out heeft de verkeerde vorm")
+    for start in range(0, n, chunk_grootte):
+        _evalueer_blok(kaarten[start:start + chunk_grootte], out[start:start + chunk_grootte])
+    return out
+
+
+def evalueer_stroom(blokken, chunk_grootte: int = STANDAARD_CHUNK):
+    """
+    Evalueer een iterable van (n, 7) arrays, bijvoorbeeld ingelezen met np.memmap,
+    zonder dat alles tegelijk in het geheugen staat. Levert per blok een array met sterktes.
+    """
+    for blok in blokken:
+        yield evalueer_batch(blok, chunk_grootte)
+
+
+def willekeurige_handen(n: int, kaarten_per_hand: int = 7, seed: int = None) -> np.ndarray:
+    """(n, kaarten_per_hand) array met willekeurige handen zonder dubbele kaarten per rij."""
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((n, 52)), axis=1)[:, :kaarten_per_hand].astype(np.uint8)
+
+
+if __name__ == "__main__":
+    handen = willekeurige_handen(2_000_000, seed=1)
+    evalueer_batch(handen[:1000])
+    start = time.perf_counter()
+    evalueer_batch(handen)
+    duur = time.perf_counter() - start
+    print(f"{len(handen) / duur / 1e6:.1f} miljoen handen per seconde")
@@ -0,0 +1,400 @@
+"""
+Belastingtest: speel met duizenden headless clients tegelijk tegen een lokale server.py.
+
+Iedere client spreekt hetzelfde protocol als client.py: een "connect" (met formaten, en een redirect
+naar de juiste worker), daarna de gamestate- en delta-berichten bijhouden, met "request gamestate"
+bij een gat in de volgnummers (of met --poll periodiek, zoals oudere clients), en een "action"
+sturen als hij aan de beurt is, na een denktijd uit een instelbare verdeling.
+
+Het aantal clients loopt in stappen op (--stappen 100,500,1000), verdeeld over --processen
+processen. Per stap meldt de harness:
+- acties/s die de clients verstuurd hebben;
+- p50/p95/p99 van actie tot staat: van het versturen van een actie tot de push waarin de speler
+  niet meer aan de beurt is, of waarin een nieuwe biedronde (andere river) begint;
+- het RSS van de server, samen met zijn workers (via /proc; alleen Linux);
+- weggevallen verbindingen en mislukte connects.
+
+Let op: een nieuwe tafel begint pas 10 seconden nadat de tweede speler is gaan zitten
+(zie server.speel_tafel), dus neem --duur ruim langer.
+
+Gebruik:
+    python belastingtest.py --start-server --stappen 100,500,1000 --duur 30 --denktijd exp:0.5
+    python belastingtest.py --poort 8000 --server-pid 12345 --stappen 2000 --processen 4 --json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, WebSocketException
+
+import protocol
+
+MAX_GELIJKTIJDIGE_CONNECTS = 50  # per proces; anders staan de handshakes elkaar in de weg
+RAISE_BEDRAG = 10
+
+
+def denktijd_verdeling(specificatie: str):
+    """
+    Maak een functie rng -> seconden uit een specificatie als "exp:0.5" (gemiddelde), "vast:0.2",
+    "uniform:0.1,1.0" of "lognormaal:-1,0.5" (mu, sigma). Raises ValueError bij een onbekende verdeling.
+    """
+    soort, _, parameters = specificatie.partition(":")
+    try:
+        waarden = [float(waarde) for waarde in parameters.split(",") if waarde]
+        if soort == "vast":
+            (seconden,) = waarden
+            return lambda rng: seconden
+        if soort == "exp":
+            (gemiddelde,) = waarden
+            return lambda rng: rng.expovariate(1 / gemiddelde) if gemiddelde > 0 else 0.0
+        if soort == "uniform":
+            laag, hoog = waarden
+            return lambda rng: rng.uniform(laag, hoog)
+        if soort == "lognormaal":
+            mu, sigma = waarden
+            return lambda rng: rng.lognormvariate(mu, sigma)
+    except ValueError:
+        raise ValueError(f"Ongeldige parameters voor denktijd: {specificatie}") from None
+    raise ValueError(f"Onbekende denktijd-verdeling: {specificatie}")
+
+
+class Statistiek:
+    """Wat de clients in één proces sinds de vorige stap gemeten hebben."""
+
+    def __init__(self):
+        self.verbonden = 0
+        self.reset()
+        self.weggevallen = 0
+        self.mislukt = 0
+
+    def reset(self) -> None:
+        self.acties = 0
+        self.latenties: list[float] = []
+        self.fouten = 0
+
+    def rapport(self, stap: int) -> dict:
+        rapport = {"stap": stap, "acties": self.acties, "latenties": self.latenties, "fouten": self.fouten,
+                   "verbonden": self.verbonden, "weggevallen": self.weggevallen, "mislukt": self.mislukt}
+        self.reset()
+        return rapport
+
+
+class LastClient:
+    """Eén headless speler: houdt de staat bij zoals client.py en handelt als hij aan de beurt is."""
+
+    def __init__(self, naam: str, host: str, poort: int, binair: bool, denktijd, rng: random.Random,
+                 stat: Statistiek, poll: float = 0.0, kans_pass: float = 0.1, kans_raise: float = 0.1):
+        self.naam = naam
+        self.host = host
+        self.poort = poort
+        self.binair = binair
+        self.denktijd = denktijd
+        self.rng = rng
+        self.stat = stat
+        self.poll = poll
+        self.kans_pass = kans_pass
+        self.kans_raise = kans_raise
+        self.websocket = None
+        self.uuid: str = None
+        self.stoelen: dict[str, dict] = {}  # {stoel: publiek record}, zoals in de gamestate
+        self.river: list = None
+        self.mijn_stoel: str = None
+        self.seq: int = None
+        self.verstuurd: float = None  # perf_counter() van de actie waarop we nog wachten
+        self.denken: asyncio.Task = None
+
+    async def verbind(self) -> None:
+        """Handshake zoals client.startup_handshake, inclusief een redirect naar een andere worker."""
+        poort = self.poort
+        for _ in range(2):
+            websocket = await connect(f"ws://{self.host}:{poort}")
+            bericht = {"type": "connect", "name": self.naam}
+            if self.binair:
+                bericht["formaten"] = [protocol.FORMAAT, "json"]
+            await websocket.send(json.dumps(bericht))
+            antwoord = json.loads(await websocket.recv())
+            if antwoord.get("type") == "redirect":
+                await websocket.close()
+                poort = antwoord["port"]
+                continue
+            if antwoord.get("type") != "register":
+                await websocket.close()
+                raise ConnectionError(f"Geen register maar {antwoord}")
+            self.websocket, self.uuid = websocket, antwoord["uuid"]
+            return
+        raise ConnectionError("Te vaak doorverwezen")
+
+    async def stuur(self, bericht: dict) -> None:
+        bericht["uuid"] = self.uuid
+        await self.websocket.send(json.dumps(bericht))
+
+    def _kies_actie(self) -> dict:
+        worp = self.rng.random()
+        if worp < self.kans_pass:
+            return {"type": "action", "action": "pass"}
+        if worp < self.kans_pass + self.kans_raise:
+            return {"type": "action", "action": "raise", "amount": RAISE_BEDRAG}
+        return {"type": "action", "action": "check"}
+
+    async def _denk_en_handel(self) -> None:
+        try:
+            await asyncio.sleep(self.denktijd(self.rng))
+            if self._aan_de_beurt():
+                self.verstuurd = time.perf_counter()
+                await self.stuur(self._kies_actie())
+                self.stat.acties += 1
+        except ConnectionClosed:
+            pass
+        finally:
+            if self.denken is asyncio.current_task():
+                self.denken = None
+
+    def _aan_de_beurt(self) -> bool:
+        return bool(self.stoelen.get(self.mijn_stoel, {}).get("isAanDeBeurt"))
+
+    async def _verwerk(self, event: dict) -> None:
+        soort = event.get("type")
+        vorige_river = self.river
+        if soort == "gamestate":
+            self.stoelen = {stoel: dict(record) for stoel, record in event["spelers"].items()}
+            self.river = event["river"]
+            self.seq = event.get("seq")
+        elif soort == "delta":
+            if self.seq is None or event["seq"] < self.seq:
+                return
+            if event["seq"] > self.seq + 1:
+                self.seq = None  # gat: vraag de volledige staat op, net als client.py
+                await self.stuur({"type": "request gamestate"})
+                return
+            for stoel, record in event.get("spelers", {}).items():
+                self.stoelen.setdefault(stoel, {}).update(record)
+            for stoel in event.get("weg", ()):
+                self.stoelen.pop(stoel, None)
+            self.river = event.get("river", self.river)
+            self.seq = event["seq"]
+        else:
+            if soort == "error":
+                self.stat.fouten += 1
+            return
+        if self.mijn_stoel not in self.stoelen:
+            self.mijn_stoel = next((stoel for stoel, record in self.stoelen.items() if record.get("naam") == self.naam), None)
+
+        aan_de_beurt = self._aan_de_beurt()
+        if self.verstuurd is not None:
+            # De actie is verwerkt als we niet meer aan de beurt zijn. Sluit onze actie een biedronde
+            # (of hand) af en zijn we in de volgende meteen weer aan de beurt, dan zien we dat aan de river.
+            if not aan_de_beurt or self.river != vorige_river:
+                self.stat.latenties.append(time.perf_counter() - self.verstuurd)
+                self.verstuurd = None
+        if aan_de_beurt and self.verstuurd is None and self.denken is None:
+            self.denken = asyncio.create_task(self._denk_en_handel())
+        elif not aan_de_beurt and self.denken is not None:
+            self.denken.cancel()
+            self.denken = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll)
+            await self.stuur({"type": "request gamestate"})
+
+    async def speel(self) -> None:
+        """Lees berichten tot de server de verbinding sluit (dat telt als weggevallen) of de taak geannuleerd wordt."""
+        poller = asyncio.create_task(self._poll()) if self.poll > 0 else None
+        try:
+            async for bericht in self.websocket:
+                try:
+                    event = protocol.decodeer(bericht) if isinstance(bericht, bytes) else json.loads(bericht)
+                except ValueError:  # json.JSONDecodeError is ook een ValueError
+                    self.stat.fouten += 1
+                    continue
+                await self._verwerk(event)
+            self.stat.weggevallen += 1
+        except ConnectionClosed:
+            self.stat.weggevallen += 1
+        finally:
+            for taak in (poller, self.denken):
+                if taak is not None:
+                    taak.cancel()
+            await self.websocket.close()
+
+
+async def _speel_client(client: LastClient, stat: Statistiek, connects: asyncio.Semaphore):
+    try:
+        async with connects:
+            await client.verbind()
+    except (OSError, WebSocketException, ConnectionError, asyncio.TimeoutError):
+        stat.mislukt += 1
+        return
+    stat.verbonden += 1
+    try:
+        await client.speel()
+    finally:
+        stat.verbonden -= 1
+
+
+def _verhoog_bestandslimiet() -> None:
+    """Iedere verbinding is een file descriptor; de standaardlimiet (vaak 1024) is te laag."""
+    try:
+        import resource
+        zacht, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+async def _draai_proces(index: int, aantal_processen: int, instellingen: dict, start: float, wachtrij) -> None:
+    _verhoog_bestandslimiet()
+    stat = Statistiek()
+    connects = asyncio.Semaphore(MAX_GELIJKTIJDIGE_CONNECTS)
+    denktijd = denktijd_verdeling(instellingen["denktijd"])
+    rng = random.Random(None if instellingen["seed"] is None else instellingen["seed"] + index)
+    taken = []
+    for stap, totaal in enumerate(instellingen["stappen"]):
+        # dit proces neemt client i voor zijn rekening als i % aantal_processen == index
+        gewenst = (totaal - index + aantal_processen - 1) // aantal_processen
+        while len(taken) < gewenst:
+            client = LastClient(f"last{index}-{len(taken)}", instellingen["host"], instellingen["poort"],
+                                instellingen["binair"], denktijd, random.Random(rng.random()), stat,
+                                instellingen["poll"], instellingen["kans_pass"], instellingen["kans_raise"])
+            taken.append(asyncio.create_task(_speel_client(client, stat, connects)))
+        stat.reset()  # de opbouw hoort bij de stap, maar metingen van de vorige stap niet
+        await asyncio.sleep(max(0.0, start + (stap + 1) * instellingen["duur"] - time.time()))
+        wachtrij.put(stat.rapport(stap))
+    for taak in taken:
+        taak.cancel()
+    await asyncio.gather(*taken, return_exceptions=True)
+
+
+def proces_main(index: int, aantal_processen: int, instellingen: dict, start: float, wachtrij) -> None:
+    asyncio.run(_draai_proces(index, aantal_processen, instellingen, start, wachtrij))
+
+
+def server_rss(pid: int) -> int:
+    """RSS in bytes van een proces en al zijn kinderen (workers), via /proc. None als dat niet kan."""
+    totaal = 0
+    te_doen = [pid]
+    try:
+        while te_doen:
+            huidig = te_doen.pop()
+            with open(f"/proc/{huidig}/status") as status:
+                for regel in status:
+                    if regel.startswith("VmRSS:"):
+                        totaal += int(regel.split()[1]) * 1024
+            for taak in os.listdir(f"/proc/{huidig}/task"):
+                with open(f"/proc/{huidig}/task/{taak}/children") as kinderen:
+                    te_doen += [int(kind) for kind in kinderen.read().split()]
+    except (OSError, ValueError):
+        return None if totaal == 0 else totaal
+    return totaal
+
+
+def _percentiel(gesorteerd: list[float], fractie: float) -> float:
+    if not gesorteerd:
+        return float("nan")
+    return gesorteerd[min(len(gesorteerd) - 1, int(fractie * len(gesorteerd)))]
+
+
+def start_server(host: str, poort: int, workers: int) -> subprocess.Popen:
+    """Start server.py uit deze map als subproces en wacht tot hij verbindingen aanneemt."""
+    map_pad = os.path.dirname(os.path.abspath(__file__))
+    proces = subprocess.Popen([sys.executable, os.path.join(map_pad, "server.py"), "--host", host, "--port", str(poort),
+                               "--workers", str(workers)], cwd=map_pad, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection((host, poort), timeout=0.1).close()
+            return proces
+        except OSError:
+            if proces.poll() is not None:
+                raise RuntimeError("server.py is direct gestopt")
+            time.sleep(0.1)
+    proces.kill()
+    raise RuntimeError(f"server.py neemt geen verbindingen aan op {host}:{poort}")
+
+
+def belastingtest(instellingen: dict, processen: int = 1, server_pid: int = None) -> list[dict]:
+    """
+    Draai alle stappen en geef per stap een dict met "clients", "verbonden", "acties_per_seconde",
+    "p50", "p95", "p99" (seconden), "rss" (bytes of None), "weggevallen", "mislukt" en "fouten".
+    """
+    wachtrij = multiprocessing.Queue()
+    start = time.time() + 0.5
+    workers = [multiprocessing.Process(target=proces_main, args=(index, processen, instellingen, start, wachtrij))
+               for index in range(processen)]
+    for proces in workers:
+        proces.start()
+    resultaten = []
+    try:
+        for stap, totaal in enumerate(instellingen["stappen"]):
+            rapporten = [wachtrij.get(timeout=instellingen["duur"] + 60) for _ in range(processen)]
+            latenties = sorted(latentie for rapport in rapporten for latentie in rapport["latenties"])
+            resultaat = {
+                "clients": totaal,
+                "verbonden": sum(rapport["verbonden"] for rapport in rapporten),
+                "acties_per_seconde": sum(rapport["acties"] for rapport in rapporten) / instellingen["duur"],
+                "p50": _percentiel(latenties, 0.50),
+                "p95": _percentiel(latenties, 0.95),
+                "p99": _percentiel(latenties, 0.99),
+                "rss": server_rss(server_pid) if server_pid else None,
+                "weggevallen": sum(rapport["weggevallen"] for rapport in rapporten),
+                "mislukt": sum(rapport["mislukt"] for rapport in rapporten),
+                "fouten": sum(rapport["fouten"] for rapport in rapporten),
+            }
+            resultaten.append(resultaat)
+            _print_regel(resultaat)
+    finally:
+        for proces in workers:
+            proces.join(timeout=10)
+            if proces.is_alive():
+                proces.kill()
+    return resultaten
+
+
+def _print_regel(resultaat: dict) -> None:
+    rss = f"{resultaat['rss'] / 2**20:8.1f}" if resultaat["rss"] else "       -"
+    print(f"{resultaat['clients']:7} {resultaat['verbonden']:9} {resultaat['acties_per_seconde']:9.1f} "
+          f"{resultaat['p50'] * 1e3:8.1f} {resultaat['p95'] * 1e3:8.1f} {resultaat['p99'] * 1e3:8.1f} {rss} "
+          f"{resultaat['weggevallen']:11} {resultaat['mislukt']:7}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Belastingtest met headless websocket-clients tegen server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--poort", type=int, default=8000)
+    parser.add_argument("--stappen", default="100,500,1000", help="aantal clients per stap, oplopend")
+    parser.add_argument("--duur", type=float, default=30.0, help="seconden per stap")
+    parser.add_argument("--processen", type=int, default=1, help="aantal client-processen")
+    parser.add_argument("--denktijd", default="exp:0.5", help="vast:S, exp:GEMIDDELDE, uniform:MIN,MAX of lognormaal:MU,SIGMA")
+    parser.add_argument("--kans-pass", type=float, default=0.1)
+    parser.add_argument("--kans-raise", type=float, default=0.1)
+    parser.add_argument("--poll", type=float, default=0.0, help="stuur elke zoveel seconden 'request gamestate' (0 = alleen bij een gat)")
+    parser.add_argument("--json", action="store_true", help="JSON in plaats van het binaire formaat")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--server-pid", type=int, default=None, help="pid van een draaiende server, voor het RSS")
+    parser.add_argument("--start-server", action="store_true", help="start zelf server.py op --host/--poort")
+    parser.add_argument("--workers", type=int, default=1, help="workers voor --start-server")
+    args = parser.parse_args()
+
+    denktijd_verdeling(args.denktijd)  # meteen melden als de verdeling niet klopt
+    instellingen = {
+        "host": args.host, "poort": args.poort, "stappen": [int(aantal) for aantal in args.stappen.split(",")],
+        "duur": args.duur, "denktijd": args.denktijd, "kans_pass": args.kans_pass, "kans_raise": args.kans_raise,
+        "poll": args.poll, "binair": not args.json, "seed": args.seed,
+    }
+    server = start_server(args.host, args.poort, args.workers) if args.start_server else None
+    print(f"{'clients':>7} {'verbonden':>9} {'acties/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'RSS MiB':>8} {'weggevallen':>11} {'mislukt':>7}")
+    try:
+        belastingtest(instellingen, args.processen, server.pid if server else args.server_pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
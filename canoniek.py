@@ -0,0 +1,101 @@
+"""
+Kleur-isomorfe canonicalisatie en een begrensde LRU-cache met hit-rate statistieken.
+
+Handsterkte en equity veranderen niet als je de kleuren onderling verwisselt:
+A♥K♥ op 2♥7♥9♣ is hetzelfde als A♠K♠ op 2♠7♠9♦. canonieke_sleutel() geeft
+zulke situaties dezelfde sleutel, zodat herhaalde spots aan verschillende
+tafels en in simulaties uit de cache komen.
+
+Werkwijze: per kleur maken we een handtekening met het rangmasker van die
+kleur in elke groep kaarten (bijv. hole cards en board). Twee situaties zijn
+isomorf precies als de gesorteerde lijst handtekeningen gelijk is; die lijst
+is dus de sleutel.
+"""
+
+from collections import OrderedDict
+
+from hand_evaluator import evalueer
+
+STANDAARD_GROOTTE = 65_536
+
+
+def canonieke_sleutel(*groepen) -> tuple:
+    """
+    Sleutel die gelijk is voor alle kleurpermutaties van dezelfde situatie.
+
+    Parameters:
+    - groepen: lijsten met kaartcodes, bijv. (hole_cards, board) of (hand1, hand2, board).
+      De volgorde binnen een groep telt niet, de volgorde van de groepen wel.
+    """
+    handtekeningen = [[0] * len(groepen) for _ in range(4)]
+    for i, groep in enumerate(groepen):
+        for kaart in groep:
+            handtekeningen[kaart & 3][i] |= 1 << (kaart >> 2)
+    return tuple(sorted(map(tuple, handtekeningen), reverse=True))
+
+
+class LRUCache:
+    """Begrensde cache die het minst recent gebruikte item weggooit als hij vol is."""
+
+    def __init__(self, max_grootte: int = STANDAARD_GROOTTE):
+        self.max_grootte = max_grootte
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.verwijderd = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, sleutel) -> bool:
+        return sleutel in self._data
+
+    def get(self, sleutel, standaard=None):
+        """Haal een waarde op en tel een hit of een miss."""
+        try:
+            waarde = self._data[sleutel]
+        except KeyError:
+            self.misses += 1
+            return standaard
+        self._data.move_to_end(sleutel)
+        self.hits += 1
+        return waarde
+
+    def put(self, sleutel, waarde) -> None:
+        self._data[sleutel] = waarde
+        self._data.move_to_end(sleutel)
+        if len(self._data) > self.max_grootte:
+            self._data.popitem(last=False)
+            self.verwijderd += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = self.verwijderd = 0
+
+    @property
+    def hit_rate(self) -> float:
+        totaal = self.hits + self.misses
+        return self.hits / totaal if totaal else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "grootte": len(self._data),
+            "max_grootte": self.max_grootte,
+            "hits": self.hits,
+            "misses": self.misses,
+            "verwijderd": self.verwijderd,
+            "hit_rate": self.hit_rate,
+        }
+
+
+STERKTE_CACHE = LRUCache()
+
+
+def gecachte_sterkte(hole_cards, board) -> int:
+    """hand_evaluator.evalueer(hole_cards + board), via de canonieke sleutel gecachet."""
+    sleutel = canonieke_sleutel(hole_cards, board)
+    sterkte = STERKTE_CACHE.get(sleutel)
+    if sterkte is None:
+        sterkte = evalueer(list(hole_cards) + list(board))
+        STERKTE_CACHE.put(sleutel, sterkte)
+    return sterkte
@@ -1,8 +1,13 @@
 import pygame
+import argparse
 import asyncio
 import json
+import os
+import time
 import websockets.asyncio.connection
 
+import protocol
+
 
 pygame.init()
 screen = pygame.display.set_mode((800, 800))
@@ -151,6 +156,21 @@ def draw_game_state(screen, game_state):
         current_bet_text = font.render(f"Current bet: {speler.current_bet}", True, FONT_COLOR)
         screen.blit(current_bet_text, (x + 10, y + 60))
 
+        # Beurtklok
+        if speler.is_AanDeBeurt and speler.beurt_tot is not None:
+            resterend = max(0.0, speler.beurt_tot - time.monotonic())
+            screen.blit(font.render(f"{resterend:.0f}s", True, FONT_COLOR), (x + 100, y + 60))
+
+        # Exacte equity bij een all-in
+        if speler.equity is not None:
+            equity_text = font.render(f"{speler.equity:.0%}", True, FONT_COLOR)
+            screen.blit(equity_text, (x + 100, y + 10))
+
+        # Huidige hand van deze client (alleen de server stuurt die voor de eigen stoel)
+        if speler.hand_info:
+            hand_text = font.render(speler.hand_info["hand"], True, FONT_COLOR)
+            screen.blit(hand_text, (x + 160, y + 92))
+
         # Kaarten tekenen (open of dicht)
         for j, kaart in enumerate(speler.hand):
             kaart_x = x + 160 + j * 70
@@ -177,6 +197,9 @@ class Speler:
         self.is_AanDeBeurt: bool = False
         self.is_Gepast: bool = False
         self.current_bet: int = 0
+        self.equity: float = None
+        self.hand_info: dict = None
+        self.beurt_tot: float = None  # time.monotonic() waarop de beurtklok van deze speler afloopt
 
 class GameState:
     def __init__(self) -> None:
@@ -186,17 +209,85 @@ class GameState:
         self.river = [None, None, None, None, None] # List of cards in river. None represents no card
         self.pot:int = 0
         self.highest_bet:int = 0
+        self.seq:int = None  # volgnummer van de laatst verwerkte update; None = wacht op een snapshot
+
+# Velden uit een spelersrecord van de server -> attributen van Speler
+SPELER_VELDEN = {
+    "naam": "naam",
+    "coins": "coins",
+    "current_bet": "current_bet",
+    "isAanDeBeurt": "is_AanDeBeurt",
+    "isGepast": "is_Gepast",
+    "equity": "equity",
+    "hand_info": "hand_info",
+}
+
+def kaart_uit_dict(kaart: dict):
+    return Kaart(kaart["kleur"], kaart["waarde"]) if kaart else None
+
+def werk_speler_bij(speler: Speler, spelerdict: dict) -> None:
+    for veld, attribuut in SPELER_VELDEN.items():
+        if veld in spelerdict:
+            setattr(speler, attribuut, spelerdict[veld])
+    if "hand" in spelerdict:
+        speler.hand = [kaart_uit_dict(kaart) for kaart in spelerdict["hand"]]
+    if "beurt_einde" in spelerdict:
+        # de server stuurt één keer per beurt wanneer hij afloopt (Unix-tijd); daarna tellen we zelf af
+        einde = spelerdict["beurt_einde"]
+        speler.beurt_tot = None if einde is None else time.monotonic() + einde - time.time()
+
+def pas_delta_toe(game_state: GameState, event: dict) -> None:
+    """Verwerk een delta van de server in de bestaande GameState: alleen de velden die erin staan veranderen."""
+    for stoelnummer, spelerdict in event.get("spelers", {}).items():
+        stoelnummer = int(stoelnummer)
+        if stoelnummer not in game_state.stoelen:
+            game_state.stoelen[stoelnummer] = Speler(naam=spelerdict["naam"], coins=spelerdict["coins"])
+        werk_speler_bij(game_state.stoelen[stoelnummer], spelerdict)
+    for stoelnummer in event.get("weg", []):
+        game_state.stoelen.pop(int(stoelnummer), None)
+    if "eigen" in event and event["eigen"]["stoel"] in game_state.stoelen:
+        werk_speler_bij(game_state.stoelen[event["eigen"]["stoel"]], event["eigen"])
+    if "river" in event:
+        game_state.river = [kaart_uit_dict(kaart) for kaart in event["river"]]
+    if "pot" in event:
+        game_state.pot = event["pot"]
+    if "highest bid" in event:
+        game_state.highest_bet = event["highest bid"]
 
 STATE_LOCK = asyncio.Lock()
 global state
 state = GameState()
 
 shutdown_event = asyncio.Event()
-
-async def startup_handshake(websocket: websockets.asyncio.connection.Connection, naam: str) -> str:
+HERVERBIND_PAUZE = 2.0  # seconden tussen twee pogingen om na een verbroken verbinding te hervatten
+
+class Doorverwezen(Exception):
+    """De server host de gevraagde tafel in een ander proces, op een andere poort."""
+    def __init__(self, poort: int):
+        super().__init__(f"doorverwezen naar poort {poort}")
+        self.poort = poort
+
+
+async def startup_handshake(websocket: websockets.asyncio.connection.Connection, naam: str, tafel: str = None,
+                            binair: bool = True, token: str = None, seq: int = None) -> tuple[str, str, int]:
+    '''
+    Returns (uuid, token, poort). Met het token van een eerdere verbinding hervat de server die sessie.
+    De poort is die van het serverproces dat de sessie heeft (None met één proces): daar moet een
+    hervatting heen, niet naar de gedeelde poort.
+    '''
     print('[DEBUG] startup handshake client side started')
     try:
-        await websocket.send(json.dumps({"type": "connect", "name": naam}))
+        connect = {"type": "connect", "name": naam}
+        if tafel is not None:
+            connect["tafel"] = tafel
+        if token is not None:
+            # zelfde stoel en coins; de server stuurt alleen de updates na `seq`
+            connect["token"] = token
+            connect["seq"] = seq
+        if binair:
+            # de server kiest; een oude server negeert dit en blijft JSON sturen
+            connect["formaten"] = [protocol.FORMAAT, "json"]
+        await websocket.send(json.dumps(connect))
         await asyncio.sleep(1)
         msg = await websocket.recv()
         event: dict = json.loads(msg)
@@ -208,6 +299,14 @@ async def startup_handshake(websocket: websockets.asyncio.connection.Connection,
             exit()
         elif event["type"] == 'register':
             my_uuid: str = event['uuid']
+            token = event.get('token')
+            eigen_poort = event.get('port')
+            if event.get('hervat'):
+                print(f"[INFO] Verbinding hervat aan tafel {event.get('tafel')}")
+            else:
+                print(f"[INFO] Aan tafel {event.get('tafel')}, formaat {event.get('formaat', 'json')}")
+        elif event["type"] == 'redirect':
+            raise Doorverwezen(event['port'])
         else:
             print("[ERROR] Unexpected message type during handshake.")
             exit()
@@ -217,12 +316,14 @@ async def startup_handshake(websocket: websockets.asyncio.connection.Connection,
     except json.JSONDecodeError as e:
         print(f"[ERROR] Failed to decode JSON during handshake: {e}")
         exit()
+    except Doorverwezen:
+        raise
     except Exception as e:
         print(f"[ERROR] Unexpected error during handshake: {e}")
         exit()
     
     print('[DEBUG] startup handshake client side finished')
-    return my_uuid
+    return my_uuid, token, eigen_poort
 
 
 async def read_messages(websocket,client_uuid)->None:
@@ -233,7 +334,8 @@ async def read_messages(websocket,client_uuid)->None:
             break  # Stop de lus als het shutdown-event is ingesteld
         await asyncio.sleep(0.01)
         try:
-            event: dict = json.loads(message)
+            # binaire frames zijn in het formaat van protocol.py, tekstframes zijn JSON
+            event: dict = protocol.decodeer(message) if isinstance(message, bytes) else json.loads(message)
             if not isinstance(event, dict):
                 raise ValueError("Received message is not a valid dictionary.")
 
@@ -254,32 +356,14 @@ async def read_messages(websocket,client_uuid)->None:
                 nieuwe_state = GameState()
                 # download gamestate
                 # nieuwe_state.AanDeBeurt = event["aanDeBeurt"]
-                nieuwe_state.river = [
-                    Kaart(kaart["kleur"], kaart["waarde"]) if kaart else None
-                    for kaart in event["river"]
-                ]
-                nieuwe_state.spelersdata = event["spelers"]
-                
-                nieuwe_state.stoelen = {}
-                for stoelnummer, spelerdict in nieuwe_state.spelersdata.items():
-                    stoelnummer = int(stoelnummer)
-                    hand = []
-                    for kaart in spelerdict["hand"]:
-                        if kaart:
-                            hand.append(Kaart(kaart["kleur"], kaart["waarde"]))
-                        else:
-                            hand.append(None)
-                    speler = Speler(
-                        naam=spelerdict["naam"],
-                        coins=spelerdict["coins"],
-                        hand=hand
-                    )
-                    speler.is_AanDeBeurt = spelerdict["isAanDeBeurt"]
-                    speler.is_Gepast = spelerdict["isGepast"]
-                    speler.current_bet = spelerdict["current_bet"]
-                    nieuwe_state.stoelen[stoelnummer] = speler
-                    nieuwe_state.pot = event["pot"]
-                    nieuwe_state.highest_bet = event["highest bid"]
+                nieuwe_state.river = [kaart_uit_dict(kaart) for kaart in event["river"]]
+                for stoelnummer, spelerdict in event["spelers"].items():
+                    speler = Speler(naam=spelerdict["naam"], coins=spelerdict["coins"])
+                    werk_speler_bij(speler, spelerdict)
+                    nieuwe_state.stoelen[int(stoelnummer)] = speler
+                nieuwe_state.pot = event["pot"]
+                nieuwe_state.highest_bet = event["highest bid"]
+                nieuwe_state.seq = event.get("seq")
                 async with STATE_LOCK:
                     state = nieuwe_state
             except KeyError as e:
@@ -287,6 +371,26 @@ async def read_messages(websocket,client_uuid)->None:
             except Exception as e:
                 print(f"[ERROR] Unexpected error while updating gamestate: {e}")
 
+        elif event["type"] == 'delta':
+            async with STATE_LOCK:
+                if state.seq is None:
+                    continue  # er is al om een snapshot gevraagd
+                if event["seq"] > state.seq + 1:
+                    # een update gemist: vraag de volledige staat opnieuw op
+                    print(f"[INFO] Update {state.seq + 1} gemist, snapshot aangevraagd")
+                    state.seq = None
+                    await websocket.send(json.dumps({"type": "request gamestate", "uuid": client_uuid}))
+                    continue
+                if event["seq"] < state.seq:
+                    continue  # ouder dan de staat die we al hebben
+                try:
+                    pas_delta_toe(state, event)
+                    state.seq = event["seq"]
+                except (KeyError, TypeError) as e:
+                    print(f"[ERROR] Invalid delta: {e}")
+                    state.seq = None
+                    await websocket.send(json.dumps({"type": "request gamestate", "uuid": client_uuid}))
+
         elif event["type"] == 'info':
             print(event['message'])
         elif event['type'] == 'error':
@@ -314,18 +418,23 @@ async def send_messages(websocket, queue, my_uuid:str)->None:
             print(f"Error sending message: {e}")
 
     
-async def handle_networking(websocket: websockets.asyncio.connection.Connection, naam: str, queue: asyncio.Queue):
+async def handle_networking(websocket: websockets.asyncio.connection.Connection, client_uuid: str, queue: asyncio.Queue):
+    read_task = asyncio.create_task(read_messages(websocket, client_uuid))
+    send_task = asyncio.create_task(send_messages(websocket, queue, client_uuid))
     try:
-        client_uuid = await startup_handshake(websocket, naam)
-        read_task = asyncio.create_task(read_messages(websocket, client_uuid))
-        send_task = asyncio.create_task(send_messages(websocket, queue, client_uuid))
-        await asyncio.gather(read_task, send_task)
+        # stopt als de verbinding wegvalt; send_messages zou anders op het volgende bericht blijven wachten
+        klaar, _ = await asyncio.wait({read_task, send_task}, return_when=asyncio.FIRST_COMPLETED)
+        for taak in klaar:
+            taak.result()
     except websockets.exceptions.InvalidURI as e:
         print(f"[ERROR] Invalid WebSocket URI: {e}")
     except websockets.exceptions.ConnectionClosedError as e:
         print(f"[ERROR] WebSocket connection was closed unexpectedly: {e}")
     except Exception as e:
         print(f"[ERROR] Unexpected error during networking: {e}")
+    finally:
+        read_task.cancel()
+        send_task.cancel()
 
 
 
@@ -364,20 +473,15 @@ async def get_raise_amount(screen, font):
         await asyncio.sleep(0)
 
 # Main game loop
-async def game_loop(websocket,queue:asyncio.Queue):
+async def game_loop(queue:asyncio.Queue):
 
     pass_button = Button(50,600,200,150,"Pass",font,BLUE,LIGHTBLUE,BLACK)
     check_button = Button(300,600,200,150,"Check",font,BLUE,LIGHTBLUE,BLACK)
     raise_button = Button(550,600,200,150,"Raise",font,BLUE,LIGHTBLUE,BLACK)
 
-    counter = 0
-    request_gamestate = {"type":'request gamestate'}
-
+    # De server pusht de gamestate zelf zodra er iets verandert; pollen is niet meer nodig.
     running = True
     while running:
-        counter+=1
-        if counter%10 == 0:
-            await queue.put(request_gamestate)
         async with STATE_LOCK:
             game_state = state
 
@@ -412,25 +516,57 @@ async def game_loop(websocket,queue:asyncio.Queue):
         await asyncio.sleep(0)
         clock.tick(30)
 
-    await websocket.close()
     pygame.quit()
 
 
-async def main():
+async def main(host: str, poort: int, tafel: str = None, binair: bool = True):
     naam:str = input("Wat is jouw naam? Maximaal 10 characters ")[:10]
     if any(c in naam for c in ["'", '"', ",", ".", "\\", "/"]):
         print("Ongeldige karakters in naam.")
         exit()
+    if len(naam.encode()) > protocol.NAAM_BYTES:
+        print(f"Naam is te lang, maximaal {protocol.NAAM_BYTES} bytes.")
+        exit()
     
     queue = asyncio.Queue() # this queue stores all messages to bne sent.
 
-    async with websockets.connect("ws://192.168.178.110:8000") as websocket:
-        # Create tasks for Pygame and receiving messages
-        pygame_task = asyncio.create_task(game_loop(websocket,queue))
-        network_task = asyncio.create_task(handle_networking(websocket,naam,queue))
-
-        # Run both tasks concurrently
-        await asyncio.gather(pygame_task, network_task)
+    # Het venster blijft draaien als de verbinding wegvalt; daarna hervatten we met het token
+    pygame_task = asyncio.create_task(game_loop(queue))
+    token = None
+    while not pygame_task.done():
+        try:
+            async with websockets.connect(f"ws://{host}:{poort}") as websocket:
+                try:
+                    client_uuid, token, eigen_poort = await startup_handshake(websocket, naam, tafel, binair, token, state.seq)
+                except Doorverwezen as e:
+                    # de tafel draait in een ander serverproces, opnieuw verbinden op diens poort
+                    poort = e.poort
+                    continue
+                if eigen_poort is not None:
+                    poort = eigen_poort  # hervatten bij het proces dat ons token kent
+
+                network_task = asyncio.create_task(handle_networking(websocket,client_uuid,queue))
+                await asyncio.wait({pygame_task, network_task}, return_when=asyncio.FIRST_COMPLETED)
+                if pygame_task.done():
+                    try:
+                        await asyncio.wait_for(queue.join(), 1.0)  # het disconnect-bericht nog versturen
+                    except asyncio.TimeoutError:
+                        pass
+                    network_task.cancel()
+                    break
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            print(f"[ERROR] Verbinding mislukt: {e}")
+        if pygame_task.done():
+            break
+        print(f"[INFO] Verbinding verbroken, over {HERVERBIND_PAUZE:.0f} s opnieuw proberen")
+        await asyncio.sleep(HERVERBIND_PAUZE)
+    await pygame_task
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Poker client")
+    parser.add_argument("--host", default=os.environ.get("POKER_HOST", "192.168.178.110"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("POKER_PORT", 8000)))
+    parser.add_argument("--tafel", default=None, help="id van de tafel waar je aan wilt zitten")
+    parser.add_argument("--json", action="store_true", help="vraag geen binair formaat aan, alleen JSON")
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.tafel, not args.json))
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Equity-berekening: hoe vaak wint, speelt gelijk of verliest een hand.
+
+equity() speelt willekeurige run-outs uit over een process pool. Elke batch
+krijgt een eigen RNG-stroom die is afgeleid van (seed, batchnummer), zodat een
+resultaat met dezelfde seed reproduceerbaar is, los van hoe de batches over de
+processen verdeeld worden.
+
+exacte_equity() rekent bij een all-in vanaf de flop alle resterende turn/river
+combinaties exact uit, en bewaart het resultaat per (board, handen) zodat de
+turn daarna uit de cache komt. Beide caches gebruiken de kleur-isomorfe sleutel
+uit canoniek, dus ook gelijkwaardige spots met andere kleuren zijn een hit.
+"""
+
+import hashlib
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from canoniek import LRUCache, canonieke_sleutel
+from hand_evaluator import DECK, evalueer, kaart_naar_int
+
+STANDAARD_BATCH = 5_000  # iteraties per taak voor een worker
+Z_95 = 1.96
+EXACT_CACHE_GROOTTE = 4096
+EQUITY_CACHE_GROOTTE = 16_384
+
+
+def naar_codes(kaarten) -> list[int]:
+    """Kaart-objecten of kaartcodes -> lijst met kaartcodes. None (nog niet gedeeld) wordt overgeslagen."""
+    return [kaart if isinstance(kaart, int) else kaart_naar_int(kaart) for kaart in kaarten if kaart is not None]
+
+
+def _batch_seed(seed: int, batch: int) -> int:
+    digest = hashlib.blake2b(f"{seed}:{batch}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _simuleer(hand: tuple, board: tuple, n_tegenstanders: int, iteraties: int, seed: int) -> tuple:
+    """
+    Speel `iteraties` run-outs uit. Geeft (wins, ties, losses, equity_som, equity_kwadraat_som) terug;
+    de equity van één run-out is 1 bij winst, 1/k bij een k-way split en 0 bij verlies.
+    """
+    rng = random.Random(seed)
+    rest = [kaart for kaart in DECK if kaart not in hand and kaart not in board]
+    te_delen = 5 - len(board)
+    nodig = te_delen + 2 * n_tegenstanders
+    board = list(board)
+    hand = list(hand)
+    wins = ties = losses = 0
+    eq_som = eq_kwadraat = 0.0
+    for _ in range(iteraties):
+        getrokken = rng.sample(rest, nodig)
+        volledig_board = board + getrokken[:te_delen]
+        mijn_sterkte = evalueer(hand + volledig_board)
+        gelijk = 1
+        verloren = False
+        for i in range(te_delen, nodig, 2):
+            sterkte = evalueer(getrokken[i:i + 2] + volledig_board)
+            if sterkte > mijn_sterkte:
+                verloren = True
+                break
+            if sterkte == mijn_sterkte:
+                gelijk += 1
+        if verloren:
+            losses += 1
+        elif gelijk == 1:
+            wins += 1
+            eq_som += 1.0
+            eq_kwadraat += 1.0
+        else:
+            ties += 1
+            aandeel = 1.0 / gelijk
+            eq_som += aandeel
+            eq_kwadraat += aandeel * aandeel
+    return wins, ties, losses, eq_som, eq_kwadraat
+
+
+def _ci_breedte(n: int, eq_som: float, eq_kwadraat: float) -> float:
+    """Halve breedte van het 95%-betrouwbaarheidsinterval van de gemiddelde equity."""
+    if n < 2:
+        return math.inf
+    gemiddelde = eq_som / n
+    variantie = max(eq_kwadraat / n - gemiddelde * gemiddelde, 0.0) * n / (n - 1)
+    return Z_95 * math.sqrt(variantie / n)
+
+
+def equity(hole_cards, board=(), n_opponents: int = 1, iterations: int = 100_000,
+           processen: int = None, seed: int = None, max_ci: float = None,
+           batch_grootte: int = STANDAARD_BATCH) -> dict:
+    """
+    Monte Carlo equity van `hole_cards` tegen `n_opponents` willekeurige handen.
+
+    Parameters:
+    - hole_cards: 2 Kaart-objecten of kaartcodes.
+    - board: 0 t/m 5 bekende gemeenschappelijke kaarten (None's worden genegeerd, zoals in GameState.river).
+    - iterations: maximaal aantal run-outs.
+    - processen: aantal worker-processen; 1 rekent in het huidige proces. Standaard os.cpu_count().
+    - seed: maakt het resultaat reproduceerbaar.
+    - max_ci: stop zodra de halve breedte van het 95%-interval van de equity hieronder zit.
+
+    Returns:
+    - dict met "win", "tie", "loss" (kansen), "equity", "ci" en het aantal gespeelde "iteraties".
+    """
+    hand = tuple(naar_codes(hole_cards))
+    board = tuple(naar_codes(board))
+    if len(hand) != 2:
+        raise ValueError("Een hand bestaat uit precies 2 kaarten")
+    if len(board) > 5:
+        raise ValueError("Het board heeft maximaal 5 kaarten")
+    if len(set(hand + board)) != len(hand + board):
+        raise ValueError("Dubbele kaarten in hand en board")
+    if not 1 <= n_opponents <= 8:
+        raise ValueError("Ongeldig aantal tegenstanders")
+    if iterations < 1:
+        raise ValueError("Minstens 1 iteratie nodig")
+    if seed is None:
+        seed = random.getrandbits(64)
+    processen = processen or os.cpu_count() or 1
+
+    batches = []
+    resterend = iterations
+    while resterend > 0:
+        grootte = min(batch_grootte, resterend)
+        batches.append(grootte)
+        resterend -= grootte
+
+    totaal = [0, 0, 0, 0.0, 0.0]
+
+    def verwerk(resultaat):
+        for i, waarde in enumerate(resultaat):
+            totaal[i] += waarde
+
+    def klaar() -> bool:
+        n = totaal[0] + totaal[1] + totaal[2]
+        return max_ci is not None and _ci_breedte(n, totaal[3], totaal[4]) <= max_ci
+
+    if processen == 1:
+        for nummer, grootte in enumerate(batches):
+            verwerk(_simuleer(hand, board, n_opponents, grootte, _batch_seed(seed, nummer)))
+            if klaar():
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=processen) as pool:
+            # Per ronde één batch per proces, daarna pas kijken of het interval smal genoeg is.
+            for start in range(0, len(batches), processen):
+                futures = [
+                    pool.submit(_simuleer, hand, board, n_opponents, grootte, _batch_seed(seed, nummer))
+                    for nummer, grootte in enumerate(batches[start:start + processen], start)
+                ]
+                for future in futures:
+                    verwerk(future.result())
+                if klaar():
+                    break
+
+    wins, ties, losses, eq_som, eq_kwadraat = totaal
+    n = wins + ties + losses
+    return {
+        "win": wins / n,
+        "tie": ties / n,
+        "loss": losses / n,
+        "equity": eq_som / n,
+        "ci": _ci_breedte(n, eq_som, eq_kwadraat),
+        "iteraties": n,
+    }
+
+
+EXACT_CACHE = LRUCache(EXACT_CACHE_GROOTTE)  # canonieke (handen..., board) -> lijst met resultaten per hand
+EQUITY_CACHE = LRUCache(EQUITY_CACHE_GROOTTE)
+
+
+def gecachte_equity(hole_cards, board=(), n_opponents: int = 1, iterations: int = 100_000, **kwargs) -> dict:
+    """
+    equity() met een LRU-cache op de kleur-isomorfe sleutel van (hole_cards, board).
+    Extra argumenten (processen, max_ci, seed, ...) gaan door naar equity() en horen bij de sleutel:
+    een ander max_ci of een andere seed geeft een ander resultaat.
+    """
+    hand = naar_codes(hole_cards)
+    board = naar_codes(board)
+    sleutel = (canonieke_sleutel(hand, board), n_opponents, iterations, tuple(sorted(kwargs.items())))
+    resultaat = EQUITY_CACHE.get(sleutel)
+    if resultaat is None:
+        resultaat = equity(hand, board, n_opponents, iterations, **kwargs)
+        EQUITY_CACHE.put(sleutel, resultaat)
+    return resultaat
+
+
+def _uitslag(handen: tuple, board: list) -> list[float]:
+    """Per hand het aandeel van de pot bij dit volledige board (1, 1/k bij een split, of 0)."""
+    sterktes = [evalueer(list(hand) + board) for hand in handen]
+    beste = max(sterktes)
+    winnaars = sterktes.count(beste)
+    return [(1.0 / winnaars if sterkte == beste else 0.0) for sterkte in sterktes]
+
+
+def _samenvatting(tellers: list, n: int) -> list[dict]:
+    return [
+        {"win": wins / n, "tie": ties / n, "equity": aandeel / n}
+        for wins, ties, aandeel in tellers
+    ]
+
+
+def exacte_equity(handen, board) -> list[dict]:
+    """
+    Exacte equity van elke hand door alle resterende boards af te lopen.
+
+    Parameters:
+    - handen: lijst met handen van 2 Kaart-objecten of kaartcodes (bijv. van GameState.actieve_spelers()).
+    - board: 3, 4 of 5 bekende kaarten (None's worden genegeerd).
+
+    Returns:
+    - per hand een dict met "win", "tie" en "equity", in dezelfde volgorde als `handen`.
+
+    Na de flop zijn er maximaal C(45, 2) = 990 run-outs. Elke run-out {a, b}
+    telt mee voor turn a (river b) en voor turn b (river a), zodat alle
+    turn-resultaten in dezelfde ronde mee in de cache komen.
+    """
+    handen = tuple(tuple(naar_codes(hand)) for hand in handen)
+    board = naar_codes(board)
+    if len(handen) < 2 or any(len(hand) != 2 for hand in handen):
+        raise ValueError("Minstens 2 handen van 2 kaarten nodig")
+    if not 3 <= len(board) <= 5:
+        raise ValueError("Exacte equity kan alleen vanaf de flop")
+    bekend = [kaart for hand in handen for kaart in hand] + board
+    if len(set(bekend)) != len(bekend):
+        raise ValueError("Dubbele kaarten in handen en board")
+
+    sleutel = canonieke_sleutel(*handen, board)
+    resultaat = EXACT_CACHE.get(sleutel)
+    if resultaat is not None:
+        return resultaat
+
+    rest = [kaart for kaart in DECK if kaart not in bekend]
+
+    if len(board) == 5:
+        aandelen = _uitslag(handen, board)
+        tellers = [(aandeel == 1.0, 0 < aandeel < 1.0, aandeel) for aandeel in aandelen]
+        resultaat = _samenvatting(tellers, 1)
+    else:
+        te_delen = 5 - len(board)
+        # Per turnkaart (alleen na de flop) de tellers [wins, ties, aandeel] per hand.
+        per_turn = {kaart: [[0, 0, 0.0] for _ in handen] for kaart in rest} if te_delen == 2 else {}
+        totaal = [[0, 0, 0.0] for _ in handen]
+        n = 0
+        for runout in combinations(rest, te_delen):
+            aandelen = _uitslag(handen, board + list(runout))
+            n += 1
+            doelen = [totaal] + [per_turn[kaart] for kaart in runout if te_delen == 2]
+            for i, aandeel in enumerate(aandelen):
+                if aandeel == 0.0:
+                    continue
+                for tellers in doelen:
+                    teller = tellers[i]
+                    if aandeel == 1.0:
+                        teller[0] += 1
+                    else:
+                        teller[1] += 1
+                    teller[2] += aandeel
+        resultaat = _samenvatting(totaal, n)
+        for turn, tellers in per_turn.items():
+            EXACT_CACHE.put(canonieke_sleutel(*handen, board + [turn]), _samenvatting(tellers, len(rest) - 1))
+
+    EXACT_CACHE.put(sleutel, resultaat)
+    return resultaat
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    # A♥ K♥ tegen 2 willekeurige handen
+    resultaat = equity([48, 44], n_opponents=2, iterations=200_000, seed=1, max_ci=0.002)
+    duur = time.perf_counter() - start
+    print(resultaat)
+    print(f"{resultaat['iteraties'] / duur:.0f} run-outs per seconde")
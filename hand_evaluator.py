@@ -0,0 +1,308 @@
+"""
+Snelle hand-evaluatie voor 5, 6 en 7 kaarten, en HandStatus voor een hand die per straat aangroeit.
+
+Kaarten worden gecodeerd als kleine integers: ``code = rang * 4 + kleur`` met
+rang 0..12 voor 2..A en kleur de index in KLEUREN. Een hand wordt gerangschikt
+via twee vooraf berekende tabellen:
+
+- _FLUSH_TABEL: bitmasker van de rangen in één kleur -> sterkte van de beste
+  flush of straight flush (0 als er geen flush in zit).
+- _RANG_TABEL: som van _RANG_SLEUTEL over de kaarten (unieke sleutel per
+  multiset van rangen) -> sterkte van de beste hand zonder flush.
+
+De sterkte is één integer die je direct kunt vergelijken: hoger is beter, en
+alle kickers zitten erin. De categorie staat in de hoogste bits, daaronder
+maximaal vijf rangen van 4 bits.
+"""
+
+KLEUREN = ("harten", "ruiten", "klaveren", "schoppen")
+WAARDES = "23456789TBVKA"  # T=10, B=boer, V=vrouw, K=koning, A=aas
+
+# Alternatieve alfabetten die in oudere code voorkomen (J/Q en "10").
+_WAARDE_ALIASSEN = {"10": "T", "J": "B", "Q": "V", "1": "A"}
+_KLEUR_ALIASSEN = {"klaver": "klaveren", "ruit": "ruiten", "hart": "harten", "schop": "schoppen"}
+
+HIGH_CARD = 1
+ONE_PAIR = 2
+TWO_PAIR = 3
+THREE_OF_A_KIND = 4
+STRAIGHT = 5
+FLUSH = 6
+FULL_HOUSE = 7
+FOUR_OF_A_KIND = 8
+STRAIGHT_FLUSH = 9
+
+CATEGORIE_NAMEN = {
+    HIGH_CARD: "high card",
+    ONE_PAIR: "one pair",
+    TWO_PAIR: "two pair",
+    THREE_OF_A_KIND: "three of a kind",
+    STRAIGHT: "straight",
+    FLUSH: "flush",
+    FULL_HOUSE: "full house",
+    FOUR_OF_A_KIND: "four of a kind",
+    STRAIGHT_FLUSH: "straight flush",
+}
+
+_CATEGORIE_SHIFT = 20
+
+# Het volledige deck, in dezelfde volgorde als de codes 0..51.
+DECK = tuple(range(52))
+
+
+def kaart_naar_int(kaart) -> int:
+    """
+    Zet een Kaart (alles met .kleur en .waarde) om naar de integer-codering.
+    Accepteert ook de oude alfabetten: "J"/"Q"/"10" en hoofdletters in de kleur.
+    """
+    waarde = str(kaart.waarde).upper()
+    waarde = _WAARDE_ALIASSEN.get(waarde, waarde)
+    kleur = str(kaart.kleur).lower()
+    kleur = _KLEUR_ALIASSEN.get(kleur, kleur)
+    try:
+        return WAARDES.index(waarde) * 4 + KLEUREN.index(kleur)
+    except ValueError:
+        raise ValueError(f"Onbekende kaart: {kaart.kleur} {kaart.waarde}") from None
+
+
+def int_naar_kaart(code: int) -> tuple[str, str]:
+    """Geeft (kleur, waarde) terug voor een kaartcode."""
+    return KLEUREN[code & 3], WAARDES[code >> 2]
+
+
+def _pak(categorie: int, rangen) -> int:
+    sterkte = categorie
+    for i in range(5):
+        sterkte = (sterkte << 4) | (rangen[i] if i < len(rangen) else 0)
+    return sterkte
+
+
+def categorie(sterkte: int) -> int:
+    """De handcategorie (HIGH_CARD .. STRAIGHT_FLUSH) van een sterkte."""
+    return sterkte >> _CATEGORIE_SHIFT
+
+
+def hand_naam(sterkte: int) -> str:
+    """Leesbare naam van de hand, met "royal flush" voor een straight flush tot de aas."""
+    cat = categorie(sterkte)
+    if cat == STRAIGHT_FLUSH and (sterkte >> 16) & 0xF == 12:
+        return "royal flush"
+    return CATEGORIE_NAMEN[cat]
+
+
+def kickers(sterkte: int, aantal_kaarten: int = 5) -> list[str]:
+    """
+    De rangen die in de sterkte zijn opgenomen, als waardes ("A", "K", ...).
+    Geef bij een onvolledige hand (minder dan 5 kaarten) het aantal kaarten mee.
+    """
+    cat = categorie(sterkte)
+    aantal = _AANTAL_RANGEN[cat]
+    if cat in _GROEPEN:
+        groepen, kaarten_in_groepen = _GROEPEN[cat]
+        aantal = min(aantal, groepen + max(aantal_kaarten - kaarten_in_groepen, 0))
+    return [WAARDES[(sterkte >> (16 - 4 * i)) & 0xF] for i in range(aantal)]
+
+
+# Aantal betekenisvolle rangen per categorie (voor kickers()).
+_AANTAL_RANGEN = {
+    HIGH_CARD: 5, ONE_PAIR: 4, TWO_PAIR: 3, THREE_OF_A_KIND: 3, STRAIGHT: 1,
+    FLUSH: 5, FULL_HOUSE: 2, FOUR_OF_A_KIND: 2, STRAIGHT_FLUSH: 1,
+}
+# Categorieën die ook met minder dan 5 kaarten kunnen: (aantal groepen, kaarten in die groepen).
+_GROEPEN = {
+    HIGH_CARD: (0, 0), ONE_PAIR: (1, 2), TWO_PAIR: (2, 4), THREE_OF_A_KIND: (1, 3), FOUR_OF_A_KIND: (1, 4),
+}
+
+
+def _bouw_straight_tabel() -> list[int]:
+    """Voor elk rangmasker: de hoogste rang van de beste straight, of -1."""
+    vensters = [(0b11111 << (hoog - 4), hoog) for hoog in range(12, 3, -1)]
+    vensters.append(((1 << 12) | 0b1111, 3))  # wheel: A-2-3-4-5, hoogste kaart is de 5
+    tabel = []
+    for masker in range(1 << 13):
+        hoogste = -1
+        for venster, hoog in vensters:
+            if masker & venster == venster:
+                hoogste = hoog
+                break
+        tabel.append(hoogste)
+    return tabel
+
+
+_STRAIGHT_HOOG = _bouw_straight_tabel()
+
+
+def _hoogste_bits(masker: int, aantal: int) -> list[int]:
+    rangen = []
+    for rang in range(12, -1, -1):
+        if masker >> rang & 1:
+            rangen.append(rang)
+            if len(rangen) == aantal:
+                break
+    return rangen
+
+
+def _bouw_flush_tabel() -> list[int]:
+    tabel = [0] * (1 << 13)
+    for masker in range(1 << 13):
+        if masker.bit_count() < 5:
+            continue
+        hoog = _STRAIGHT_HOOG[masker]
+        if hoog >= 0:
+            tabel[masker] = _pak(STRAIGHT_FLUSH, [hoog])
+        else:
+            tabel[masker] = _pak(FLUSH, _hoogste_bits(masker, 5))
+    return tabel
+
+
+def _sterkte_zonder_flush(tellingen) -> int:
+    """Beste hand uit een multiset van rangen (tellingen per rang), flushes genegeerd."""
+    masker = 0
+    for rang, aantal in enumerate(tellingen):
+        if aantal:
+            masker |= 1 << rang
+    # Groepen gesorteerd op (aantal, rang), hoogste eerst.
+    groepen = sorted(((aantal, rang) for rang, aantal in enumerate(tellingen) if aantal), reverse=True)
+    rangen_aflopend = sorted((rang for rang, aantal in enumerate(tellingen) if aantal), reverse=True)
+
+    def overige(*uitgesloten):
+        return [rang for rang in rangen_aflopend if rang not in uitgesloten]
+
+    grootste, top = groepen[0]
+    if grootste == 4:
+        return _pak(FOUR_OF_A_KIND, [top] + overige(top)[:1])
+    if grootste == 3:
+        paren = [rang for aantal, rang in groepen[1:] if aantal >= 2]
+        if paren:
+            return _pak(FULL_HOUSE, [top, max(paren)])
+    hoog = _STRAIGHT_HOOG[masker]
+    if hoog >= 0:
+        return _pak(STRAIGHT, [hoog])
+    if grootste == 3:
+        return _pak(THREE_OF_A_KIND, [top] + overige(top)[:2])
+    if grootste == 2:
+        paren = [rang for aantal, rang in groepen if aantal == 2]
+        if len(paren) >= 2:
+            hoog_paar, laag_paar = paren[0], paren[1]
+            return _pak(TWO_PAIR, [hoog_paar, laag_paar] + overige(hoog_paar, laag_paar)[:1])
+        return _pak(ONE_PAIR, [top] + overige(top)[:3])
+    return _pak(HIGH_CARD, rangen_aflopend[:5])
+
+
+_RANG_SLEUTEL = tuple(5 ** rang for rang in range(13))  # max 4 kaarten per rang, dus basis 5
+
+
+def _multisets(grootte: int, rang: int = 0):
+    """Alle tellingen (per rang, max 4) die samen `grootte` kaarten zijn."""
+    if rang == 12:
+        if grootte <= 4:
+            yield (grootte,)
+        return
+    for aantal in range(min(4, grootte) + 1):
+        for rest in _multisets(grootte - aantal, rang + 1):
+            yield (aantal,) + rest
+
+
+def _bouw_rang_tabel(groottes=range(1, 8)) -> dict[int, int]:
+    tabel = {}
+    for grootte in groottes:
+        for tellingen in _multisets(grootte):
+            sleutel = sum(aantal * _RANG_SLEUTEL[rang] for rang, aantal in enumerate(tellingen))
+            tabel[sleutel] = _sterkte_zonder_flush(tellingen)
+    return tabel
+
+
+def _bouw_straight_outs_tabel() -> list[int]:
+    """Voor elk rangmasker: hoeveel verschillende rangen er een straight van maken (0 als er al een is)."""
+    tabel = []
+    for masker in range(1 << 13):
+        if _STRAIGHT_HOOG[masker] >= 0:
+            tabel.append(0)
+            continue
+        tabel.append(sum(1 for rang in range(13) if _STRAIGHT_HOOG[masker | (1 << rang)] >= 0))
+    return tabel
+
+
+_FLUSH_TABEL = _bouw_flush_tabel()
+_RANG_TABEL = _bouw_rang_tabel()
+_STRAIGHT_OUTS = _bouw_straight_outs_tabel()
+_BIT = tuple(1 << rang for rang in range(13))
+
+
+def evalueer(kaarten) -> int:
+    """
+    Sterkte van de beste 5-kaart hand uit 5, 6 of 7 kaartcodes.
+
+    Met hoogstens 7 kaarten kan een flush niet samengaan met een full house of
+    four of a kind, dus als er een flush in zit is de flushtabel het antwoord.
+    """
+    maskers = [0, 0, 0, 0]
+    sleutel = 0
+    for kaart in kaarten:
+        rang = kaart >> 2
+        maskers[kaart & 3] |= _BIT[rang]
+        sleutel += _RANG_SLEUTEL[rang]
+    for masker in maskers:
+        flush = _FLUSH_TABEL[masker]
+        if flush:
+            return flush
+    return _RANG_TABEL[sleutel]
+
+
+def evalueer_kaarten(kaarten) -> int:
+    """Zoals evalueer(), maar voor Kaart-objecten."""
+    return evalueer([kaart_naar_int(kaart) for kaart in kaarten])
+
+
+class HandStatus:
+    """
+    Evaluatie-status van één speler die per kaart wordt bijgewerkt: eerst de
+    2 eigen kaarten, daarna flop, turn en river. Elke nieuwe kaart en elke
+    opvraging kost O(1): er worden alleen maskers en de rangsleutel bijgehouden.
+    """
+
+    __slots__ = ("maskers", "sleutel", "aantal")
+
+    def __init__(self, kaarten=()):
+        self.maskers = [0, 0, 0, 0]
+        self.sleutel = 0
+        self.aantal = 0
+        for kaart in kaarten:
+            self.voeg_toe(kaart)
+
+    def voeg_toe(self, kaart: int) -> None:
+        """Voeg een kaartcode toe (bijv. een nieuwe kaart in de river)."""
+        rang = kaart >> 2
+        self.maskers[kaart & 3] |= _BIT[rang]
+        self.sleutel += _RANG_SLEUTEL[rang]
+        self.aantal += 1
+
+    @property
+    def sterkte(self) -> int:
+        """Sterkte van de huidige hand. Bij 7 kaarten is dit de eindsterkte."""
+        for masker in self.maskers:
+            flush = _FLUSH_TABEL[masker]
+            if flush:
+                return flush
+        return _RANG_TABEL[self.sleutel]
+
+    def draws(self) -> list[str]:
+        """Open draws die de huidige hand kan verbeteren; leeg als er geen kaarten meer komen."""
+        if self.aantal >= 7:
+            return []
+        draws = []
+        cat = categorie(self.sterkte)
+        if cat < FLUSH and any(masker.bit_count() == 4 for masker in self.maskers):
+            draws.append("flush draw")
+        if cat < STRAIGHT:
+            outs = _STRAIGHT_OUTS[self.maskers[0] | self.maskers[1] | self.maskers[2] | self.maskers[3]]
+            if outs >= 2:
+                draws.append("open-ended straight draw")
+            elif outs == 1:
+                draws.append("gutshot")
+        return draws
+
+    def als_dict(self) -> dict:
+        """Samenvatting voor in een gamestate-bericht."""
+        sterkte = self.sterkte
+        return {"hand": hand_naam(sterkte), "kickers": kickers(sterkte, self.aantal), "draws": self.draws()}
@@ -0,0 +1,171 @@
+"""
+Herspeel handen uit een handjournaal (journaal.py) en controleer dat ze precies zo aflopen.
+
+Per hand wordt een verse GameState opgebouwd uit de SPELER-records (stoel, coins en volgorde aan
+tafel), met het deck van de seed uit HAND_START. Iedere speler krijgt een bot die de opgenomen
+ACTIE-records teruggeeft, dus doe_1_ronde draait zonder netwerk, event loop of wachttijden. De
+records die de hand daarbij schrijft moeten gelijk zijn aan die in het journaal: dezelfde kaarten,
+blinds, acties, river en uitbetaling.
+
+Een verschil betekent dat de spellogica zich anders gedraagt dan toen de hand gespeeld werd. Met
+--vanaf en --aantal kun je zo'n verschil opzoeken (bisecten) in de hele historie.
+
+Gebruik:
+    python herspelen.py handen.journaal
+    python herspelen.py handen.journaal --vanaf 120000 --aantal 1000 --toon
+"""
+
+import argparse
+import time
+from collections import deque
+from itertools import islice
+
+import journaal
+from server import GameState, Speler
+
+
+class _Opname:
+    """Vangt de records op die een herspeelde hand schrijft; gedraagt zich als een journaal.Journaal."""
+
+    def __init__(self):
+        self.records = []
+
+    def tafel_nummer(self, tafel_id: str) -> int:
+        return 0
+
+    def schrijf(self, soort: int, tafel: int, stoel: int = 0, bedrag: int = 0, data: int = 0) -> None:
+        self.records.append((soort, stoel, bedrag, data))
+
+
+def _voer_uit(coroutine):
+    """Draai een coroutine die nergens op wacht (zoals doe_1_ronde met bots) zonder event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as klaar:
+        return klaar.value
+    coroutine.close()
+    raise RuntimeError("De hand wacht op iets anders dan de opgenomen acties.")
+
+
+def opgenomen_bot(acties: deque):
+    """Bot die de ACTIE-records van de hand in volgorde teruggeeft, en stopt als de beurtvolgorde afwijkt."""
+    def bot(state: GameState, uuid: str) -> dict:
+        stoel = state.spelers[uuid].stoelnummer
+        if not acties:
+            raise ValueError(f"Stoel {stoel} is aan de beurt, maar het journaal heeft geen acties meer.")
+        opgenomen_stoel, bedrag, code = acties.popleft()
+        if opgenomen_stoel != stoel:
+            raise ValueError(f"Stoel {stoel} is aan de beurt, maar in het journaal was dat stoel {opgenomen_stoel}.")
+        if code >= len(journaal.ACTIES):
+            raise ValueError(f"Onbekende actie {code} van stoel {stoel} in het journaal.")
+        actie = journaal.ACTIES[code]
+        return {"action": actie, "amount": bedrag} if actie == "raise" else {"action": actie}
+    return bot
+
+
+def herspeel_hand(records: list) -> tuple:
+    """
+    Herspeel één hand uit zijn records (zoals journaal.JournaalLezer.handen() ze geeft).
+
+    Returns:
+    - (None, opgenomen records) als de hand precies zo afloopt, anders (reden, records tot zover).
+      Records zijn (soort, stoel, bedrag, data), zonder tafelnummer.
+    """
+    soort, deler_stoel, _, _, seed = records[0]
+    if soort != journaal.HAND_START:
+        return "Hand begint niet met HAND_START.", []
+    acties = deque((stoel, bedrag, data) for soort, stoel, _, bedrag, data in records if soort == journaal.ACTIE)
+    bot = opgenomen_bot(acties)
+
+    state = GameState()
+    state.journaal = opname = _Opname()
+    for soort, stoel, _, coins, _ in records:
+        if soort == journaal.SPELER:
+            state.voeg_speler_toe(f"stoel-{stoel}", Speler(f"stoel{stoel}", coins, bot=bot), stoel=stoel)
+    deler_uuid = f"stoel-{deler_stoel}"
+    if deler_uuid not in state.spelers:
+        return f"De deler (stoel {deler_stoel}) zit niet aan tafel.", []
+
+    try:
+        _voer_uit(state.doe_1_ronde(deler_uuid, seed))
+    except Exception as fout:
+        return f"{type(fout).__name__}: {fout}", opname.records
+    verwacht = [(soort, stoel, bedrag, data) for soort, stoel, _, bedrag, data in records]
+    if opname.records != verwacht:
+        for i, (gekregen, opgenomen) in enumerate(zip(opname.records, verwacht)):
+            if gekregen != opgenomen:
+                return f"Record {i} verschilt: {_beschrijf(gekregen)} in plaats van {_beschrijf(opgenomen)}.", opname.records
+        return f"{len(opname.records)} records in plaats van {len(verwacht)}.", opname.records
+    if acties:
+        return f"{len(acties)} opgenomen acties zijn niet gebruikt.", opname.records
+    return None, opname.records
+
+
+def _beschrijf(record: tuple) -> str:
+    soort, stoel, bedrag, data = record
+    return f"{journaal.SOORT_NAMEN.get(soort, soort)}(stoel={stoel}, bedrag={bedrag}, data={data})"
+
+
+def herspeel_journaal(pad: str, vanaf: int = 0, aantal: int = None, tafel: int = None) -> dict:
+    """
+    Herspeel de complete handen uit een journaal, genummerd in volgorde van HAND_EINDE vanaf 0.
+
+    Returns:
+    - dict met het aantal "handen", "afwijkend" (lijst van (handnummer, reden)), "seconden" en "handen_per_seconde".
+    """
+    lezer = journaal.JournaalLezer(pad)
+    afwijkend = []
+    aantal_handen = 0
+    start = time.perf_counter()
+    handen = lezer.handen()
+    try:
+        for nummer, (tafelnummer, records) in islice(enumerate(handen), vanaf, None if aantal is None else vanaf + aantal):
+            if tafel is not None and tafelnummer != tafel:
+                continue
+            aantal_handen += 1
+            reden, _ = herspeel_hand(records)
+            if reden is not None:
+                afwijkend.append((nummer, reden))
+    finally:
+        handen.close()  # geeft de mmap vrij
+        lezer.sluit()
+    duur = time.perf_counter() - start
+    return {"handen": aantal_handen, "afwijkend": afwijkend, "seconden": duur,
+            "handen_per_seconde": aantal_handen / duur if duur else 0.0}
+
+
+def toon_hand(pad: str, nummer: int) -> None:
+    """Print de opgenomen en de herspeelde records van één hand naast elkaar."""
+    lezer = journaal.JournaalLezer(pad)
+    handen = lezer.handen()
+    try:
+        _, records = next(islice(handen, nummer, None))
+    finally:
+        handen.close()
+        lezer.sluit()
+    reden, herspeeld = herspeel_hand(records)
+    print(f"Hand {nummer}: {reden or 'gelijk'}")
+    for i in range(max(len(records), len(herspeeld))):
+        opgenomen = records[i] if i < len(records) else None
+        opgenomen = opgenomen and (opgenomen[0], opgenomen[1], opgenomen[3], opgenomen[4])
+        gekregen = herspeeld[i] if i < len(herspeeld) else None
+        teken = " " if opgenomen == gekregen else "!"
+        print(f"{teken} {i:3} {_beschrijf(opgenomen) if opgenomen else '-':45} {_beschrijf(gekregen) if gekregen else '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Herspeel handen uit een handjournaal en controleer de uitkomst.")
+    parser.add_argument("pad")
+    parser.add_argument("--vanaf", type=int, default=0, help="eerste handnummer")
+    parser.add_argument("--aantal", type=int, default=None, help="aantal handen (standaard: alle)")
+    parser.add_argument("--tafel", type=int, default=None, help="alleen dit tafelnummer uit het journaal")
+    parser.add_argument("--toon", action="store_true", help="toon de records van de eerste afwijkende hand")
+    args = parser.parse_args()
+
+    resultaat = herspeel_journaal(args.pad, args.vanaf, args.aantal, args.tafel)
+    print(f"{resultaat['handen']} handen herspeeld in {resultaat['seconden']:.2f}s: "
+          f"{resultaat['handen_per_seconde']:,.0f} handen/s, {len(resultaat['afwijkend'])} afwijkend")
+    for nummer, reden in resultaat["afwijkend"][:10]:
+        print(f"  hand {nummer}: {reden}")
+    if args.toon and resultaat["afwijkend"]:
+        toon_hand(args.pad, resultaat["afwijkend"][0][0])
@@ -0,0 +1,268 @@
+"""
+Append-only journaal van gespeelde handen in records van vaste grootte.
+
+Het bestand begint met een header (_HEADER) en bestaat daarna uit records van 16 bytes:
+
+    soort (u8), stoel (u8), tafel (u16), bedrag (i32), data (u64)
+
+Per soort:
+    TAFEL       tafel krijgt een nummer; data = de eerste 8 bytes van de tafel_id
+    HAND_START  stoel = deler, bedrag = aantal spelers, data = seed van het deck (zie GameState.schud)
+    SPELER      stoel, bedrag = coins aan het begin van de hand, data = hole cards (2 kaartcodes)
+    BLIND       stoel, bedrag
+    ACTIE       stoel, bedrag = raise-bedrag, data = actie (index in ACTIES, 0xFF = onbekend)
+    RIVER       stoel = positie in de river (0..4), data = kaartcode
+    WINST       stoel, bedrag = gewonnen coins
+    HAND_EINDE  bedrag = de pot die in WINST-records is uitgedeeld
+
+Records van verschillende tafels lopen door elkaar; het tafelnummer houdt ze uit elkaar.
+
+Journaal schrijft via een buffer in het geheugen: write() bij een volle buffer of flush(), fsync()
+bij sync(). De server flusht periodiek en doet de fsync in een executor (zie server.sync_journaal).
+Een half geschreven record aan het eind (crash) wordt door de lezer genegeerd en bij het
+heropenen afgekapt.
+
+JournaalLezer leest via mmap zonder iets te kopiëren: records() itereert met struct.iter_unpack,
+handen() groepeert ze per hand. Met NumPy geeft als_array() een structured array en hand_index()
+de plaats van elke hand daarin, zodat analyses over miljoenen handen gevectoriseerd kunnen.
+
+Gebruik:
+    python journaal.py handen.journaal
+"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+
+VERSIE = 1
+_MAGIC = b"PKJR"
+_HEADER = struct.Struct("<4sHH8x")  # magic, versie, recordgrootte
+RECORD = struct.Struct("<BBHiQ")  # soort, stoel, tafel, bedrag, data
+
+TAFEL = 1
+HAND_START = 2
+SPELER = 3
+BLIND = 4
+ACTIE = 5
+RIVER = 6
+WINST = 7
+HAND_EINDE = 8
+
+SOORT_NAMEN = {
+    TAFEL: "tafel", HAND_START: "hand_start", SPELER: "speler", BLIND: "blind",
+    ACTIE: "actie", RIVER: "river", WINST: "winst", HAND_EINDE: "hand_einde",
+}
+ACTIES = ("pass", "check", "raise")
+GEEN_KAART = 0xFF
+
+STANDAARD_BUFFER = 64 * 1024
+
+
+def hole_cards_naar_data(codes) -> int:
+    """Twee kaartcodes (None = geen kaart) in het data-veld van een SPELER-record."""
+    eerste, tweede = (list(codes) + [None, None])[:2]
+    return (GEEN_KAART if eerste is None else eerste) | (GEEN_KAART if tweede is None else tweede) << 8
+
+
+def data_naar_hole_cards(data: int) -> tuple:
+    return tuple(None if code == GEEN_KAART else code for code in (data & 0xFF, data >> 8 & 0xFF))
+
+
+class Journaal:
+    """Schrijft records naar het eind van het journaal; maakt het bestand (met header) aan als het nog niet bestaat."""
+
+    def __init__(self, pad: str, buffer_grootte: int = STANDAARD_BUFFER):
+        self.pad = pad
+        self.buffer_grootte = buffer_grootte
+        self._buffer = bytearray()
+        self._tafels: dict[str, int] = {}
+        self._bestand = open(pad, "ab", buffering=0)
+        if self._bestand.tell() == 0:
+            self._bestand.write(_HEADER.pack(_MAGIC, VERSIE, RECORD.size))
+        else:
+            self._controleer_header()
+            # een half geschreven record van een eerdere crash afkappen, anders loopt alles daarna scheef
+            overschot = (self._bestand.tell() - _HEADER.size) % RECORD.size
+            if overschot:
+                self._bestand.truncate(self._bestand.tell() - overschot)
+                self._bestand.seek(0, os.SEEK_END)
+            self._tafels = {naam: nummer for nummer, naam in JournaalLezer(pad).tafels().items()}
+
+    def _controleer_header(self) -> None:
+        with open(self.pad, "rb") as bestand:
+            magic, versie, grootte = _HEADER.unpack(bestand.read(_HEADER.size))
+        if magic != _MAGIC or versie != VERSIE or grootte != RECORD.size:
+            raise ValueError(f"Onbekend journaalformaat: {self.pad}")
+
+    def tafel_nummer(self, tafel_id: str) -> int:
+        """Vast nummer voor een tafel; de eerste keer wordt een TAFEL-record geschreven."""
+        nummer = self._tafels.get(tafel_id)
+        if nummer is None:
+            nummer = len(self._tafels) & 0xFFFF
+            self._tafels[tafel_id] = nummer
+            naam = str(tafel_id).encode()[:8]
+            self.schrijf(TAFEL, nummer, 0, 0, int.from_bytes(naam.ljust(8, b"\0"), "little"))
+        return nummer
+
+    def schrijf(self, soort: int, tafel: int, stoel: int = 0, bedrag: int = 0, data: int = 0) -> bool:
+        """
+        Voeg een record toe. Een waarde die niet in RECORD past (geen int, of buiten bereik) wordt
+        geweigerd in plaats van een struct.error midden in een hand te geven.
+
+        Returns:
+        - False als het record niet geschreven is.
+        """
+        try:
+            record = RECORD.pack(soort, stoel, tafel, bedrag, data)
+        except struct.error:
+            logging.warning("Journaalrecord geweigerd: soort=%r stoel=%r tafel=%r bedrag=%r data=%r",
+                            soort, stoel, tafel, bedrag, data)
+            return False
+        self._buffer += record
+        if len(self._buffer) >= self.buffer_grootte:
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        """Geef de buffer aan het besturingssysteem (nog geen fsync)."""
+        if self._buffer:
+            self._bestand.write(self._buffer)
+            self._buffer.clear()
+
+    def fileno(self) -> int:
+        return self._bestand.fileno()
+
+    def sync(self) -> None:
+        """flush() en fsync(): alles tot nu toe staat op schijf."""
+        self.flush()
+        os.fsync(self._bestand.fileno())
+
+    def sluit(self) -> None:
+        self.sync()
+        self._bestand.close()
+
+
+class JournaalLezer:
+    """Alleen-lezen toegang tot een journaal via mmap."""
+
+    def __init__(self, pad: str):
+        with open(pad, "rb") as bestand:
+            self._mmap = mmap.mmap(bestand.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, versie, grootte = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or versie != VERSIE or grootte != RECORD.size:
+            self._mmap.close()
+            raise ValueError(f"Onbekend journaalformaat: {pad}")
+        self.aantal = (len(self._mmap) - _HEADER.size) // RECORD.size
+        self._data = memoryview(self._mmap)[_HEADER.size:_HEADER.size + self.aantal * RECORD.size]
+
+    def __len__(self) -> int:
+        return self.aantal
+
+    def records(self):
+        """Alle records als tuples (soort, stoel, tafel, bedrag, data)."""
+        return RECORD.iter_unpack(self._data)
+
+    def tafels(self) -> dict[int, str]:
+        """{tafelnummer: tafel_id}"""
+        return {
+            tafel: data.to_bytes(8, "little").rstrip(b"\0").decode(errors="replace")
+            for soort, _, tafel, _, data in self.records() if soort == TAFEL
+        }
+
+    def handen(self):
+        """
+        Iterator over complete handen: (tafelnummer, [records van HAND_START t/m HAND_EINDE]).
+        Een hand zonder HAND_EINDE (tafel gesloten of crash) wordt overgeslagen.
+        """
+        open_handen = {}
+        for record in RECORD.iter_unpack(self._data):
+            soort, tafel = record[0], record[2]
+            if soort == HAND_START:
+                open_handen[tafel] = [record]
+            elif soort == HAND_EINDE:
+                hand = open_handen.pop(tafel, None)
+                if hand is not None:
+                    hand.append(record)
+                    yield tafel, hand
+            elif soort != TAFEL:
+                hand = open_handen.get(tafel)
+                if hand is not None:
+                    hand.append(record)
+
+    def als_array(self):
+        """Alle records als NumPy structured array, zonder kopie (vereist NumPy)."""
+        import numpy as np
+
+        dtype = np.dtype([("soort", "u1"), ("stoel", "u1"), ("tafel", "<u2"), ("bedrag", "<i4"), ("data", "<u8")])
+        return np.frombuffer(self._data, dtype=dtype)
+
+    def hand_index(self):
+        """
+        Plaats van elke complete hand in als_array(), gevectoriseerd (vereist NumPy).
+
+        Returns:
+        - (tafel, start, einde): arrays met per hand het tafelnummer en de index van zijn HAND_START-
+          en HAND_EINDE-record. Zo is bijv. de pot van elke hand als_array()["bedrag"][einde].
+        """
+        import numpy as np
+
+        array = self.als_array()
+        soort, tafel = array["soort"], array["tafel"]
+        resultaat = ([], [], [])
+        for nummer in np.unique(tafel[(soort == HAND_START) | (soort == HAND_EINDE)]):
+            van_tafel = tafel == nummer
+            starts = np.flatnonzero(van_tafel & (soort == HAND_START))
+            eindes = np.flatnonzero(van_tafel & (soort == HAND_EINDE))
+            # het eerste HAND_EINDE na elke start; de hand is compleet als er geen nieuwe start tussen zit
+            volgende = np.searchsorted(eindes, starts)
+            heeft_einde = volgende < len(eindes)
+            starts, einde = starts[heeft_einde], eindes[volgende[heeft_einde]]
+            volgende_start = np.append(starts[1:], len(array))
+            compleet = einde < volgende_start
+            resultaat[0].append(np.full(compleet.sum(), nummer, dtype=np.uint16))
+            resultaat[1].append(starts[compleet])
+            resultaat[2].append(einde[compleet])
+        if not resultaat[0]:
+            return tuple(np.zeros(0, dtype=np.intp) for _ in resultaat)
+        return tuple(np.concatenate(delen) for delen in resultaat)
+
+    def sluit(self) -> None:
+        self._data.release()
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+
+    parser = argparse.ArgumentParser(description="Statistieken van een handjournaal.")
+    parser.add_argument("pad")
+    args = parser.parse_args()
+
+    lezer = JournaalLezer(args.pad)
+    start = time.perf_counter()
+    soorten = Counter(record[0] for record in lezer.records())
+    record_duur = time.perf_counter() - start
+    start = time.perf_counter()
+    aantal_handen = sum(1 for _ in lezer.handen())
+    hand_duur = time.perf_counter() - start
+    print(f"{len(lezer):,} records, {aantal_handen:,} complete handen, {len(lezer.tafels())} tafels")
+    print({SOORT_NAMEN.get(soort, soort): aantal for soort, aantal in sorted(soorten.items())})
+    print(f"records(): {len(lezer) / max(record_duur, 1e-9):,.0f} records/s, "
+          f"handen(): {aantal_handen / max(hand_duur, 1e-9):,.0f} handen/s")
+    try:
+        array = lezer.als_array()
+        start = time.perf_counter()
+        aantal = int((array["soort"] == HAND_START).sum())
+        print(f"als_array(): {aantal:,} hand-starts geteld in {(time.perf_counter() - start) * 1e3:.1f} ms")
+        start = time.perf_counter()
+        _, _, einde = lezer.hand_index()
+        gemiddelde_pot = array["bedrag"][einde].mean() if len(einde) else 0.0
+        duur = time.perf_counter() - start
+        print(f"hand_index(): {len(einde) / max(duur, 1e-9):,.0f} handen/s, gemiddelde pot {gemiddelde_pot:.1f}")
+        del array, einde
+    except ImportError:
+        pass
+    lezer.sluit()
@@ -0,0 +1,186 @@
+"""
+Lichte metrics (tellers, meters en histogrammen), op te vragen in het tekstformaat van Prometheus.
+
+Een meting bijwerken is in het hot path alleen een optelling (of een bisect voor een histogram);
+de tekst wordt pas gemaakt als iemand hem opvraagt. serveer() start daarvoor een minimale HTTP
+server op een lokale poort, zonder extra dependencies:
+
+    curl http://127.0.0.1:9100/metrics
+
+Metingen met labels hebben per combinatie van labelwaarden een eigen kind:
+
+    HANDEN = Teller("poker_handen_total", "Gespeelde handen", ("tafel",))
+    HANDEN.met("1").verhoog()
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+
+REGISTER: list = []  # alle metingen die exporteer() laat zien, in volgorde van aanmaken
+
+# seconden; van een snelle serialisatie tot een trage client
+STANDAARD_GRENZEN = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _label_waarde(waarde) -> str:
+    return str(waarde).replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n")
+
+
+class _Meting:
+    soort = ""
+
+    def __init__(self, naam: str, uitleg: str, labels: tuple = (), registreer: bool = True):
+        self.naam = naam
+        self.uitleg = uitleg
+        self.labels = tuple(labels)
+        self._kinderen: dict[tuple, "_Meting"] = {}
+        if registreer:
+            REGISTER.append(self)
+
+    def _nieuw_kind(self) -> "_Meting":
+        raise NotImplementedError
+
+    def met(self, *waarden) -> "_Meting":
+        """Het kind voor deze labelwaarden (in de volgorde van `labels`); wordt aangemaakt als het nog niet bestaat."""
+        kind = self._kinderen.get(waarden)
+        if kind is None:
+            if len(waarden) != len(self.labels):
+                raise ValueError(f"{self.naam} verwacht labels {self.labels}")
+            kind = self._kinderen[waarden] = self._nieuw_kind()
+        return kind
+
+    def verwijder(self, *waarden) -> None:
+        """Laat een kind weg, bijv. van een gesloten tafel, zodat het aantal reeksen niet blijft groeien."""
+        self._kinderen.pop(waarden, None)
+
+    def _regels(self, labels: str) -> list[str]:
+        raise NotImplementedError
+
+    def exporteer(self) -> list[str]:
+        regels = [f"# HELP {self.naam} {self.uitleg}", f"# TYPE {self.naam} {self.soort}"]
+        if not self.labels:
+            return regels + self._regels("")
+        for waarden, kind in list(self._kinderen.items()):
+            labels = ",".join(f'{label}="{_label_waarde(waarde)}"' for label, waarde in zip(self.labels, waarden))
+            regels += kind._regels(labels)
+        return regels
+
+
+class Teller(_Meting):
+    """Een waarde die alleen omhoog gaat, zoals het aantal gespeelde handen of verstuurde bytes."""
+    soort = "counter"
+
+    def __init__(self, naam: str, uitleg: str, labels: tuple = (), registreer: bool = True):
+        super().__init__(naam, uitleg, labels, registreer)
+        self.waarde = 0
+
+    def _nieuw_kind(self) -> "Teller":
+        return Teller(self.naam, self.uitleg, registreer=False)
+
+    def verhoog(self, aantal=1) -> None:
+        self.waarde += aantal
+
+    def _regels(self, labels: str) -> list[str]:
+        return [f"{self.naam}{{{labels}}} {self.waarde}" if labels else f"{self.naam} {self.waarde}"]
+
+
+class Meter(_Meting):
+    """Een waarde die op en neer gaat. Met een `functie` wordt hij pas bij het exporteren uitgerekend."""
+    soort = "gauge"
+
+    def __init__(self, naam: str, uitleg: str, labels: tuple = (), functie=None, registreer: bool = True):
+        super().__init__(naam, uitleg, labels, registreer)
+        self.waarde = 0.0
+        self.functie = functie
+
+    def _nieuw_kind(self) -> "Meter":
+        return Meter(self.naam, self.uitleg, registreer=False)
+
+    def zet(self, waarde) -> None:
+        self.waarde = waarde
+
+    def _regels(self, labels: str) -> list[str]:
+        waarde = self.functie() if self.functie is not None else self.waarde
+        return [f"{self.naam}{{{labels}}} {waarde}" if labels else f"{self.naam} {waarde}"]
+
+
+class Histogram(_Meting):
+    """Verdeling van waarden (meestal seconden) over vaste emmers, plus som en aantal."""
+    soort = "histogram"
+
+    def __init__(self, naam: str, uitleg: str, labels: tuple = (), grenzen: tuple = STANDAARD_GRENZEN,
+                 registreer: bool = True):
+        super().__init__(naam, uitleg, labels, registreer)
+        self.grenzen = tuple(sorted(grenzen))
+        self.tellingen = [0] * (len(self.grenzen) + 1)  # de laatste is +Inf
+        self.som = 0.0
+        self.aantal = 0
+
+    def _nieuw_kind(self) -> "Histogram":
+        return Histogram(self.naam, self.uitleg, grenzen=self.grenzen, registreer=False)
+
+    def observeer(self, waarde: float) -> None:
+        self.tellingen[bisect.bisect_left(self.grenzen, waarde)] += 1
+        self.som += waarde
+        self.aantal += 1
+
+    def _regels(self, labels: str) -> list[str]:
+        scheiding = "," if labels else ""
+        regels = []
+        cumulatief = 0
+        for grens, telling in zip(self.grenzen + ("+Inf",), self.tellingen):
+            cumulatief += telling
+            regels.append(f'{self.naam}_bucket{{{labels}{scheiding}le="{grens}"}} {cumulatief}')
+        achtervoegsel = f"{{{labels}}}" if labels else ""
+        regels.append(f"{self.naam}_sum{achtervoegsel} {self.som}")
+        regels.append(f"{self.naam}_count{achtervoegsel} {self.aantal}")
+        return regels
+
+
+def exporteer() -> str:
+    """Alle geregistreerde metingen in het tekstformaat van Prometheus (versie 0.0.4)."""
+    regels = []
+    for meting in REGISTER:
+        regels += meting.exporteer()
+    return "\n".join(regels) + "\n"
+
+
+async def meet_lus_vertraging(histogram: Histogram, meter: Meter = None, interval: float = 0.5) -> None:
+    """Meet hoe veel later dan gevraagd een asyncio.sleep terugkomt: de tijd dat de event loop bezet was."""
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        vertraging = max(0.0, time.monotonic() - start - interval)
+        histogram.observeer(vertraging)
+        if meter is not None:
+            meter.zet(vertraging)
+
+
+async def _behandel_verzoek(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        verzoek = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass  # headers negeren
+        delen = verzoek.split()
+        if len(delen) >= 2 and delen[0] == b"GET" and delen[1].split(b"?")[0] in (b"/", b"/metrics"):
+            body = exporteer().encode()
+            status, soort = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"Niet gevonden\n"
+            status, soort = "404 Not Found", "text/plain; charset=utf-8"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {soort}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serveer(host: str = "127.0.0.1", poort: int = 9100) -> asyncio.AbstractServer:
+    """Start de HTTP server voor /metrics en geef hem terug (hij draait op de achtergrond)."""
+    server = await asyncio.start_server(_behandel_verzoek, host, poort)
+    logging.info("Metrics op http://%s:%s/metrics", host, poort)
+    return server
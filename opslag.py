@@ -0,0 +1,120 @@
+"""
+Binaire snapshots van tafels, om ze na een crash of herstart terug te zetten.
+
+Eén bestand per tafel in een map. Een snapshot beschrijft de tafel zoals hij aan het begin van de
+huidige hand was: wie op welke stoel zit, met hoeveel coins, tijdbank en het token waarmee zijn
+client de sessie kan hervatten (zie server.hervat_sessie). Een hand die bezig was
+wordt bij het herstellen als misdeal behandeld: iedereen heeft zijn inzet terug en er wordt opnieuw
+gedeeld.
+
+Formaat (little-endian):
+    header  magic "PKTS", versie (u16), aantal spelers (u8), tafel_id
+    speler  stoel (u8), coins (i32), tijdbank (f32), uuid, naam, token
+Teksten staan er als lengte (u8) plus UTF-8; een leeg token betekent geen token. Versie 1 had
+nog geen token en wordt ook gelezen.
+
+Het schrijven (schrijf_tafels) doet alleen bestands-I/O en is bedoeld voor een executor; de bytes
+zelf maakt de server in de event loop, zodat ze een consistente momentopname zijn.
+"""
+
+import logging
+import os
+import struct
+
+VERSIE = 2
+_MAGIC = b"PKTS"
+_KOP = struct.Struct("<4sHB")
+_SPELER = struct.Struct("<Bif")
+EXTENSIE = ".tafel"
+
+
+def _tekst(tekst: str) -> bytes:
+    data = str(tekst).encode()[:255]
+    return bytes((len(data),)) + data
+
+
+def _lees_tekst(data: bytes, positie: int) -> tuple[str, int]:
+    lengte = data[positie]
+    einde = positie + 1 + lengte
+    if einde > len(data):
+        raise ValueError("Snapshot is afgekapt.")
+    return data[positie + 1:einde].decode(), einde
+
+
+def codeer_tafel(tafel_id: str, spelers: list[tuple]) -> bytes:
+    """spelers: lijst van (uuid, naam, stoel, coins, tijdbank, token), in de volgorde waarin ze aan tafel zitten."""
+    delen = [_KOP.pack(_MAGIC, VERSIE, len(spelers)), _tekst(tafel_id)]
+    for uuid, naam, stoel, coins, tijdbank, token in spelers:
+        delen.append(_SPELER.pack(stoel, coins, tijdbank))
+        delen.append(_tekst(uuid))
+        delen.append(_tekst(naam))
+        delen.append(_tekst(token or ""))
+    return b"".join(delen)
+
+
+def decodeer_tafel(data: bytes) -> tuple[str, list[tuple]]:
+    """Omgekeerde van codeer_tafel: (tafel_id, spelers). Raises ValueError bij een onbekend of kapot bestand."""
+    try:
+        magic, versie, aantal = _KOP.unpack_from(data)
+        if magic != _MAGIC or versie not in (1, VERSIE):
+            raise ValueError("Onbekend snapshotformaat.")
+        tafel_id, positie = _lees_tekst(data, _KOP.size)
+        spelers = []
+        for _ in range(aantal):
+            stoel, coins, tijdbank = _SPELER.unpack_from(data, positie)
+            uuid, positie = _lees_tekst(data, positie + _SPELER.size)
+            naam, positie = _lees_tekst(data, positie)
+            token = None
+            if versie >= 2:
+                token, positie = _lees_tekst(data, positie)
+            spelers.append((uuid, naam, stoel, coins, tijdbank, token or None))
+    except (struct.error, IndexError, UnicodeDecodeError) as fout:
+        raise ValueError(f"Kapotte snapshot: {fout}") from fout
+    if positie != len(data):
+        raise ValueError("Snapshot heeft data na de laatste speler.")
+    return tafel_id, spelers
+
+
+def bestandsnaam(snapshot_map: str, tafel_id: str) -> str:
+    # tafel_ids komen (deels) van clients; hex houdt de bestandsnaam veilig en uniek
+    return os.path.join(snapshot_map, str(tafel_id).encode().hex() + EXTENSIE)
+
+
+def schrijf_tafels(snapshot_map: str, snapshots: dict[str, bytes], weg=()) -> None:
+    """
+    Schrijf {tafel_id: snapshot} elk naar hun eigen bestand en verwijder de bestanden van tafels in `weg`.
+    Ieder bestand wordt via een tijdelijk bestand en os.replace vervangen, zodat er na een crash
+    altijd de oude of de nieuwe snapshot staat. Blokkeert (fsync); draai dit in een executor.
+    """
+    os.makedirs(snapshot_map, exist_ok=True)
+    for tafel_id, data in snapshots.items():
+        pad = bestandsnaam(snapshot_map, tafel_id)
+        tijdelijk = pad + ".tmp"
+        with open(tijdelijk, "wb") as bestand:
+            bestand.write(data)
+            bestand.flush()
+            os.fsync(bestand.fileno())
+        os.replace(tijdelijk, pad)
+    for tafel_id in weg:
+        try:
+            os.remove(bestandsnaam(snapshot_map, tafel_id))
+        except FileNotFoundError:
+            pass
+
+
+def lees_tafels(snapshot_map: str) -> list[tuple[str, list[tuple]]]:
+    """Alle snapshots in een map als (tafel_id, spelers). Kapotte bestanden worden gemeld en overgeslagen."""
+    if not os.path.isdir(snapshot_map):
+        return []
+    tafels = []
+    with os.scandir(snapshot_map) as bestanden:
+        for bestand in bestanden:
+            if not bestand.name.endswith(EXTENSIE):
+                continue
+            with open(bestand.path, "rb") as invoer:
+                data = invoer.read()
+            try:
+                tafels.append(decodeer_tafel(data))
+            except ValueError as fout:
+                logging.warning("Snapshot %s overgeslagen: %s", bestand.name, fout)
+    return tafels
@@ -0,0 +1,240 @@
+"""
+Benchmark voor de hand-evaluators: calc_waarde, score_of_hand, hand_evaluator.evalueer
+en (als NumPy er is) batch_evaluator.evalueer_batch.
+
+Voor elke evaluator en elke corpus (vaste seed, 5, 6 en 7 kaarten) meten we:
+- handen per seconde
+- p50 en p99 latency per aanroep (in microseconden); voor de batch-evaluator de tijd van een
+  batch van BATCH_GROOTTE handen gedeeld door BATCH_GROOTTE (geamortiseerd, met * in de tabel)
+- piekgeheugen tijdens een run (tracemalloc)
+- het aantal handen waarop de evaluator een exception gooide
+
+Gebruik:
+    python poker_gamelogic_testing/benchmark_evaluators.py --opslaan       # nieuwe baseline
+    python poker_gamelogic_testing/benchmark_evaluators.py --drempel 10    # vergelijk met baseline
+
+Met --drempel faalt het script (exit code 1) als een evaluator meer dan dat
+percentage trager is geworden dan in de baseline. De baseline (benchmark_baseline.json) staat in
+de repo; maak hem opnieuw met --opslaan op de machine waar de vergelijking draait, want absolute
+tijden verschillen per machine. Zonder baseline faalt het script als de omgevingsvariabele CI
+gezet is, zodat de check in CI niet ongemerkt uit staat.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+MAP = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(MAP)
+sys.path.insert(0, REPO)
+
+import hand_evaluator  # noqa: E402
+
+STANDAARD_BASELINE = os.path.join(MAP, "benchmark_baseline.json")
+STANDAARD_AANTAL = 20_000
+STANDAARD_SEED = 2024
+GEHEUGEN_STEEKPROEF = 1_000  # tracemalloc is traag, dus geheugen meten we op een deel van de corpus
+BATCH_GROOTTE = 256  # handen per aanroep van de batch-evaluator bij het meten van de latency
+
+
+@contextlib.contextmanager
+def stil():
+    """Gooi print-uitvoer weg; de legacy-code print tijdens het importeren en evalueren."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def laad_module(naam: str, pad: str):
+    """Laad een los script als module (de bestandsnaam van "poker_utils copy.py" is geen geldige modulenaam)."""
+    spec = importlib.util.spec_from_file_location(naam, pad)
+    module = importlib.util.module_from_spec(spec)
+    with stil():
+        spec.loader.exec_module(module)
+    return module
+
+
+def maak_corpus(aantal: int, kaarten_per_hand: int, seed: int) -> list[list[int]]:
+    """Vaste, geseede lijst met handen als kaartcodes."""
+    rng = random.Random(seed * 10 + kaarten_per_hand)
+    deck = list(hand_evaluator.DECK)
+    return [rng.sample(deck, kaarten_per_hand) for _ in range(aantal)]
+
+
+def _legacy_kaarten(kaart_klasse, corpus):
+    return [[kaart_klasse(*hand_evaluator.int_naar_kaart(code)) for code in hand] for hand in corpus]
+
+
+def evaluators() -> dict:
+    """
+    Naam -> (voorbereiden(corpus) -> invoer, evalueer(hand)).
+    De legacy-functies krijgen Kaart-objecten uit hun eigen module.
+    """
+    mark1 = laad_module("poker_mark1", os.path.join(MAP, "poker_mark1.py"))
+    utils_copy = laad_module("poker_utils_copy", os.path.join(REPO, "poker_utils copy.py"))
+
+    return {
+        "calc_waarde": (lambda corpus: _legacy_kaarten(mark1.Kaart, corpus), mark1.calc_waarde),
+        "score_of_hand": (lambda corpus: _legacy_kaarten(utils_copy.Kaart, corpus), utils_copy.score_of_hand),
+        "evalueer": (lambda corpus: corpus, hand_evaluator.evalueer),
+    }
+
+
+def meet(evalueer, handen) -> dict:
+    """Meet één evaluator op één (voorbereide) corpus."""
+    latencies = []
+    fouten = 0
+    klok = time.perf_counter_ns
+    with stil():
+        start = time.perf_counter()
+        for hand in handen:
+            begin = klok()
+            try:
+                evalueer(hand)
+            except Exception:
+                fouten += 1
+            latencies.append(klok() - begin)
+        duur = time.perf_counter() - start
+
+        tracemalloc.start()
+        for hand in handen[:GEHEUGEN_STEEKPROEF]:
+            try:
+                evalueer(hand)
+            except Exception:
+                pass
+        _, piek = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "handen_per_seconde": len(handen) / duur,
+        "p50_us": latencies[len(latencies) // 2] / 1000,
+        "p99_us": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] / 1000,
+        "piek_geheugen_bytes": piek,
+        "fouten": fouten,
+    }
+
+
+def meet_batch(corpus) -> dict:
+    """
+    De NumPy-evaluator werkt per batch. Handen/s komt uit één aanroep op de hele corpus; de
+    latency uit batches van BATCH_GROOTTE handen, per batch gedeeld door het aantal handen
+    (geamortiseerde tijd per hand, zodat hij naast die van de andere evaluators kan staan).
+    """
+    import numpy as np
+    from batch_evaluator import evalueer_batch
+
+    kaarten = np.array(corpus, dtype=np.uint8)
+    evalueer_batch(kaarten[:100])
+    start = time.perf_counter()
+    evalueer_batch(kaarten)
+    duur = time.perf_counter() - start
+
+    latencies = []
+    klok = time.perf_counter_ns
+    for begin in range(0, len(kaarten) - BATCH_GROOTTE + 1, BATCH_GROOTTE):
+        batch = kaarten[begin:begin + BATCH_GROOTTE]
+        tik = klok()
+        evalueer_batch(batch)
+        latencies.append((klok() - tik) / BATCH_GROOTTE)
+    if not latencies:  # corpus kleiner dan één batch
+        tik = klok()
+        evalueer_batch(kaarten)
+        latencies.append((klok() - tik) / len(kaarten))
+    latencies.sort()
+
+    tracemalloc.start()
+    evalueer_batch(kaarten)
+    _, piek = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "handen_per_seconde": len(corpus) / duur,
+        "p50_us": latencies[len(latencies) // 2] / 1000,
+        "p99_us": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] / 1000,
+        "piek_geheugen_bytes": piek,
+        "fouten": 0,
+        "batch": min(BATCH_GROOTTE, len(kaarten)),
+    }
+
+
+def draai(aantal: int = STANDAARD_AANTAL, seed: int = STANDAARD_SEED) -> dict:
+    """Alle evaluators op alle corpora. Resultaat: {"evaluator/kaarten": metingen}."""
+    resultaten = {}
+    alle_evaluators = evaluators()
+    for kaarten_per_hand in (5, 6, 7):
+        corpus = maak_corpus(aantal, kaarten_per_hand, seed)
+        for naam, (voorbereiden, evalueer) in alle_evaluators.items():
+            resultaten[f"{naam}/{kaarten_per_hand}"] = meet(evalueer, voorbereiden(corpus))
+        try:
+            resultaten[f"evalueer_batch/{kaarten_per_hand}"] = meet_batch(corpus)
+        except ImportError:
+            pass  # NumPy is optioneel
+    return resultaten
+
+
+def vergelijk(resultaten: dict, baseline: dict, drempel: float) -> list[str]:
+    """Lijst met regressies: meer dan `drempel` procent minder handen/s of een hogere p99."""
+    regressies = []
+    for sleutel, meting in resultaten.items():
+        oud = baseline.get(sleutel)
+        if oud is None:
+            continue
+        daling = 100 * (1 - meting["handen_per_seconde"] / oud["handen_per_seconde"])
+        if daling > drempel:
+            regressies.append(f"{sleutel}: {daling:.1f}% minder handen per seconde")
+        stijging = 100 * (meting["p99_us"] / oud["p99_us"] - 1) if oud["p99_us"] else 0.0
+        if stijging > drempel:
+            regressies.append(f"{sleutel}: p99 {stijging:.1f}% hoger")
+        if meting["fouten"] > oud["fouten"]:
+            regressies.append(f"{sleutel}: {meting['fouten'] - oud['fouten']} extra fouten")
+    return regressies
+
+
+def print_tabel(resultaten: dict) -> None:
+    print(f"{'evaluator/kaarten':<20}{'handen/s':>14}{'p50 us':>10}{'p99 us':>10}{'piek KB':>10}{'fouten':>8}")
+    batch = None
+    for sleutel, meting in resultaten.items():
+        teken = "*" if "batch" in meting else " "
+        batch = meting.get("batch", batch)
+        print(f"{sleutel:<20}{meting['handen_per_seconde']:>14,.0f}{meting['p50_us']:>9.2f}{teken}"
+              f"{meting['p99_us']:>9.2f}{teken}{meting['piek_geheugen_bytes'] / 1024:>10.1f}{meting['fouten']:>8}")
+    if batch is not None:
+        print(f"* geamortiseerd: tijd per batch van {batch} handen gedeeld door {batch}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark voor de hand-evaluators.")
+    parser.add_argument("--aantal", type=int, default=STANDAARD_AANTAL, help="handen per corpus")
+    parser.add_argument("--seed", type=int, default=STANDAARD_SEED)
+    parser.add_argument("--baseline", default=STANDAARD_BASELINE)
+    parser.add_argument("--opslaan", action="store_true", help="schrijf de resultaten als nieuwe baseline")
+    parser.add_argument("--drempel", type=float, default=10.0, help="toegestane vertraging in procent")
+    args = parser.parse_args()
+
+    resultaten = draai(args.aantal, args.seed)
+    print_tabel(resultaten)
+
+    if args.opslaan:
+        with open(args.baseline, "w") as bestand:
+            json.dump({"aantal": args.aantal, "seed": args.seed, "resultaten": resultaten}, bestand, indent=2)
+        print(f"Baseline opgeslagen in {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as bestand:
+            baseline = json.load(bestand)
+        if (baseline["aantal"], baseline["seed"]) != (args.aantal, args.seed):
+            print("[WAARSCHUWING] Baseline is met een andere corpus gemaakt")
+        regressies = vergelijk(resultaten, baseline["resultaten"], args.drempel)
+        for regressie in regressies:
+            print("[REGRESSIE]", regressie)
+        if regressies:
+            sys.exit(1)
+        print(f"Geen regressies boven {args.drempel}%")
+    else:
+        print(f"Geen baseline gevonden in {args.baseline}; draai met --opslaan om er een te maken")
+        if os.environ.get("CI"):
+            sys.exit(1)
@@ -0,0 +1,248 @@
+"""
+Differentiële correctheidscontrole voor de hand-ranking.
+
+1. Alle 2.598.960 handen van 5 kaarten worden (verdeeld over een process pool)
+   geëvalueerd met hand_evaluator.evalueer. De aantallen per categorie en het
+   aantal verschillende sterktes (7462) moeten exact kloppen.
+2. Een geseede steekproef van 7-kaart handen: de verdeling over de categorieën
+   wordt getoetst tegen de bekende kansen, en een deel van de handen wordt
+   vergeleken met een simpele, onafhankelijke referentie (beste 5 uit 7),
+   met calc_waarde en met score_of_hand.
+
+Afwijkingen van de nieuwe evaluator laten het script falen (exit code 1).
+Afwijkingen van de oude evaluators worden alleen gerapporteerd.
+
+Gebruik:
+    python poker_gamelogic_testing/differentieel.py --steekproef 2000000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+MAP = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(MAP)
+sys.path.insert(0, REPO)
+sys.path.insert(0, MAP)
+
+import hand_evaluator as he  # noqa: E402
+from benchmark_evaluators import laad_module, stil  # noqa: E402
+
+BEKEND_5 = {
+    he.STRAIGHT_FLUSH: 40, he.FOUR_OF_A_KIND: 624, he.FULL_HOUSE: 3744, he.FLUSH: 5108,
+    he.STRAIGHT: 10200, he.THREE_OF_A_KIND: 54912, he.TWO_PAIR: 123552, he.ONE_PAIR: 1098240,
+    he.HIGH_CARD: 1302540,
+}
+AANTAL_KLASSEN_5 = 7462
+BEKEND_7 = {
+    he.STRAIGHT_FLUSH: 41584, he.FOUR_OF_A_KIND: 224848, he.FULL_HOUSE: 3473184, he.FLUSH: 4047644,
+    he.STRAIGHT: 6180020, he.THREE_OF_A_KIND: 6461620, he.TWO_PAIR: 31433400, he.ONE_PAIR: 58627800,
+    he.HIGH_CARD: 23294460,
+}
+TOTAAL_7 = 133_784_560
+MAX_Z = 5.0  # toegestane afwijking (in standaarddeviaties) van de steekproef
+MAX_VOORBEELDEN = 5
+CHUNK_7 = 50_000
+
+# calc_waarde geeft namen terug, score_of_hand een score 1..10 (10 = royal flush)
+_NAAM_NAAR_CATEGORIE = {naam: cat for cat, naam in he.CATEGORIE_NAMEN.items()}
+
+
+def referentie_5(kaarten) -> tuple:
+    """Simpele, onafhankelijke 5-kaart ranking: (categorie, rangen in volgorde van belang)."""
+    rangen = sorted((kaart >> 2 for kaart in kaarten), reverse=True)
+    flush = len({kaart & 3 for kaart in kaarten}) == 1
+    uniek = sorted(set(rangen), reverse=True)
+    straight_hoog = None
+    if len(uniek) == 5:
+        if uniek[0] - uniek[4] == 4:
+            straight_hoog = uniek[0]
+        elif uniek == [12, 3, 2, 1, 0]:
+            straight_hoog = 3
+    groepen = sorted(Counter(rangen).items(), key=lambda item: (item[1], item[0]), reverse=True)
+    vorm = [aantal for _, aantal in groepen]
+    volgorde = tuple(rang for rang, _ in groepen)
+
+    if straight_hoog is not None and flush:
+        return he.STRAIGHT_FLUSH, (straight_hoog,)
+    if vorm == [4, 1]:
+        return he.FOUR_OF_A_KIND, volgorde
+    if vorm == [3, 2]:
+        return he.FULL_HOUSE, volgorde
+    if flush:
+        return he.FLUSH, tuple(rangen)
+    if straight_hoog is not None:
+        return he.STRAIGHT, (straight_hoog,)
+    if vorm == [3, 1, 1]:
+        return he.THREE_OF_A_KIND, volgorde
+    if vorm == [2, 2, 1]:
+        return he.TWO_PAIR, volgorde
+    if vorm == [2, 1, 1, 1]:
+        return he.ONE_PAIR, volgorde
+    return he.HIGH_CARD, tuple(rangen)
+
+
+def referentie(kaarten) -> tuple:
+    return max(referentie_5(vijf) for vijf in combinations(kaarten, 5))
+
+
+def als_tuple(sterkte: int) -> tuple:
+    return he.categorie(sterkte), tuple(he.WAARDES.index(waarde) for waarde in he.kickers(sterkte))
+
+
+def leesbaar(kaarten) -> str:
+    return " ".join(f"{waarde}{kleur[0]}" for kleur, waarde in map(he.int_naar_kaart, kaarten))
+
+
+_legacy = None
+
+
+def _legacy_modules():
+    global _legacy
+    if _legacy is None:
+        _legacy = (
+            laad_module("poker_mark1", os.path.join(MAP, "poker_mark1.py")),
+            laad_module("poker_utils_copy", os.path.join(REPO, "poker_utils copy.py")),
+        )
+    return _legacy
+
+
+def _legacy_categorieen(kaarten) -> dict:
+    """Categorie volgens calc_waarde en score_of_hand (None als de functie crasht)."""
+    mark1, utils_copy = _legacy_modules()
+    resultaat = {}
+    try:
+        hand = [mark1.Kaart(*he.int_naar_kaart(kaart)) for kaart in kaarten]
+        resultaat["calc_waarde"] = _NAAM_NAAR_CATEGORIE[mark1.calc_waarde(hand)["resultaat"]]
+    except Exception:
+        resultaat["calc_waarde"] = None
+    try:
+        hand = [utils_copy.Kaart(*he.int_naar_kaart(kaart)) for kaart in kaarten]
+        with stil():
+            score = utils_copy.score_of_hand(hand)[0]
+        resultaat["score_of_hand"] = min(score, he.STRAIGHT_FLUSH)
+    except Exception:
+        resultaat["score_of_hand"] = None
+    return resultaat
+
+
+def _alle_vijf(eerste: int) -> tuple:
+    """Alle 5-kaart handen waarvan de laagste kaart `eerste` is."""
+    tellingen = Counter()
+    sterktes = set()
+    evalueer = he.evalueer
+    for rest in combinations(range(eerste + 1, 52), 4):
+        sterkte = evalueer((eerste,) + rest)
+        tellingen[sterkte >> 20] += 1
+        sterktes.add(sterkte)
+    return tellingen, sterktes
+
+
+def _steekproef_7(seed: int, aantal: int, referentie_aantal: int, legacy_aantal: int) -> dict:
+    rng = random.Random(seed)
+    deck = list(he.DECK)
+    tellingen = Counter()
+    afwijkingen = {"referentie": [0, []], "calc_waarde": [0, []], "score_of_hand": [0, []]}
+    vergeleken = Counter()
+
+    def noteer(naam, kaarten, verwacht, gekregen):
+        afwijkingen[naam][0] += 1
+        if len(afwijkingen[naam][1]) < MAX_VOORBEELDEN:
+            afwijkingen[naam][1].append(f"{leesbaar(kaarten)}: verwacht {verwacht}, kreeg {gekregen}")
+
+    for i in range(aantal):
+        kaarten = rng.sample(deck, 7)
+        sterkte = he.evalueer(kaarten)
+        cat = sterkte >> 20
+        tellingen[cat] += 1
+        if i < referentie_aantal:
+            vergeleken["referentie"] += 1
+            ref = referentie(kaarten)
+            if als_tuple(sterkte) != ref:
+                noteer("referentie", kaarten, ref, als_tuple(sterkte))
+        if i < legacy_aantal:
+            for naam, legacy_cat in _legacy_categorieen(kaarten).items():
+                vergeleken[naam] += 1
+                if legacy_cat != cat:
+                    noteer(naam, kaarten, he.CATEGORIE_NAMEN[cat],
+                           he.CATEGORIE_NAMEN.get(legacy_cat, "exception"))
+    return {"tellingen": tellingen, "afwijkingen": afwijkingen, "vergeleken": vergeleken}
+
+
+def controleer_vijf(pool) -> bool:
+    start = time.perf_counter()
+    tellingen = Counter()
+    sterktes = set()
+    for deel_tellingen, deel_sterktes in pool.map(_alle_vijf, range(48)):
+        tellingen.update(deel_tellingen)
+        sterktes |= deel_sterktes
+    goed = dict(tellingen) == BEKEND_5 and len(sterktes) == AANTAL_KLASSEN_5
+    print(f"[5 KAARTEN] {sum(tellingen.values()):,} handen in {time.perf_counter() - start:.1f}s")
+    for cat, verwacht in sorted(BEKEND_5.items(), reverse=True):
+        teken = "OK" if tellingen[cat] == verwacht else "FOUT"
+        print(f"  {he.CATEGORIE_NAMEN[cat]:<16}{tellingen[cat]:>10,}{verwacht:>10,}  {teken}")
+    print(f"  verschillende sterktes: {len(sterktes)} (verwacht {AANTAL_KLASSEN_5})")
+    return goed
+
+
+def controleer_zeven(pool, aantal: int, referentie_aantal: int, legacy_aantal: int, seed: int) -> bool:
+    start = time.perf_counter()
+    chunks = math.ceil(aantal / CHUNK_7)
+    taken = []
+    for nummer in range(chunks):
+        grootte = min(CHUNK_7, aantal - nummer * CHUNK_7)
+        # referentie- en legacy-controles gelijk over de chunks verdelen
+        taken.append(pool.submit(_steekproef_7, seed * 100_003 + nummer, grootte,
+                                 math.ceil(referentie_aantal / chunks), math.ceil(legacy_aantal / chunks)))
+    tellingen = Counter()
+    vergeleken = Counter()
+    afwijkingen = {}
+    for taak in taken:
+        deel = taak.result()
+        tellingen.update(deel["tellingen"])
+        vergeleken.update(deel["vergeleken"])
+        for naam, (aantal_fout, voorbeelden) in deel["afwijkingen"].items():
+            totaal = afwijkingen.setdefault(naam, [0, []])
+            totaal[0] += aantal_fout
+            totaal[1].extend(voorbeelden[:MAX_VOORBEELDEN - len(totaal[1])])
+
+    n = sum(tellingen.values())
+    goed = True
+    print(f"[7 KAARTEN] {n:,} handen in {time.perf_counter() - start:.1f}s")
+    for cat, bekend in sorted(BEKEND_7.items(), reverse=True):
+        p = bekend / TOTAAL_7
+        z = (tellingen[cat] - n * p) / math.sqrt(n * p * (1 - p))
+        teken = "OK" if abs(z) <= MAX_Z else "FOUT"
+        goed &= abs(z) <= MAX_Z
+        print(f"  {he.CATEGORIE_NAMEN[cat]:<16}{tellingen[cat] / n:>10.5f}{p:>10.5f}  z={z:+.2f}  {teken}")
+    for naam, (aantal_fout, voorbeelden) in afwijkingen.items():
+        print(f"  {naam}: {aantal_fout} van {vergeleken[naam]} handen wijken af")
+        for voorbeeld in voorbeelden:
+            print(f"    {voorbeeld}")
+    goed &= afwijkingen.get("referentie", [0])[0] == 0
+    return goed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Differentiële controle van de hand-ranking.")
+    parser.add_argument("--steekproef", type=int, default=2_000_000, help="aantal 7-kaart handen")
+    parser.add_argument("--referentie", type=int, default=100_000, help="handen vergeleken met de referentie")
+    parser.add_argument("--legacy", type=int, default=20_000, help="handen vergeleken met de oude evaluators")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--processen", type=int, default=None)
+    parser.add_argument("--zonder-vijf", action="store_true", help="sla de volledige 5-kaart controle over")
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.processen) as pool:
+        goed = True
+        if not args.zonder_vijf:
+            goed &= controleer_vijf(pool)
+        goed &= controleer_zeven(pool, args.steekproef, args.referentie, args.legacy, args.seed)
+    print("ALLES OK" if goed else "FOUTEN GEVONDEN")
+    sys.exit(0 if goed else 1)
@@ -0,0 +1,73 @@
+"""
+Regressietests voor inzetten en side pots (GameState.bet, bied_fase en maak_potten).
+
+Een short stack kan nooit meer inzetten dan hij heeft: hij gaat all-in, en wat de anderen
+daarboven inzetten komt in een side pot waar hij geen aanspraak op maakt.
+
+Gebruik:
+    python -m pytest poker_gamelogic_testing/test_potten.py
+    python poker_gamelogic_testing/test_potten.py
+"""
+
+import asyncio
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from server import GameState, Speler  # noqa: E402
+
+
+def _tafel(*spelers) -> GameState:
+    state = GameState(seed=1)
+    for naam, coins, bot in spelers:
+        state.voeg_speler_toe(naam, Speler(naam, coins, bot=bot))
+    return state
+
+
+def test_maak_potten_side_pot():
+    state = _tafel(("kort", 0, None), ("a", 50, None), ("b", 50, None), ("weg", 30, None))
+    for uuid, inzet, gepast in (("kort", 5, False), ("a", 50, False), ("b", 50, False), ("weg", 20, True)):
+        speler = state.spelers[uuid]
+        speler.current_bet = inzet
+        speler.is_Gepast = gepast
+    state.pot = 125
+    assert state.maak_potten() == [(20, ["kort", "a", "b"]), (105, ["a", "b"])]
+
+
+def test_bet_niet_meer_dan_stack():
+    state = _tafel(("kort", 5, None), ("a", 100, None))
+    state.spelers["kort"].is_Gepast = False
+    assert state.bet("kort", 50) == 5
+    assert state.spelers["kort"].coins == 0
+    assert state.spelers["kort"].current_bet == 5
+    assert state.pot == 5
+
+
+def test_short_stack_all_in_wint_alleen_main_pot():
+    """Heads-up: 5 coins tegen een raise van 50. De short stack kan hooguit 2 x 5 winnen."""
+    def raiser(state, uuid):
+        speler = state.spelers[uuid]
+        if speler.current_bet < state.highest_bet:
+            return {"action": "check"}
+        return {"action": "raise", "amount": 50} if state.river[0] is None else {"action": "check"}
+
+    def caller(state, uuid):
+        return {"action": "check"}
+
+    for seed in range(40):
+        state = _tafel(("kort", 5, caller), ("groot", 100, raiser))
+        asyncio.run(state.doe_1_ronde("groot", seed))
+        kort, groot = state.spelers["kort"], state.spelers["groot"]
+        assert kort.coins >= 0 and groot.coins >= 0
+        assert kort.coins + groot.coins == 105
+        assert kort.coins in (0, 5, 10)  # verliezen, gesplitst of de main pot winnen
+        assert state.pot == 0
+
+
+if __name__ == "__main__":
+    for naam, test in list(globals().items()):
+        if naam.startswith("test_"):
+            test()
+            print(f"{naam}: ok")
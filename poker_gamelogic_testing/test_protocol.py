@@ -0,0 +1,112 @@
+"""
+protocol.decodeer() moet dezelfde dicts geven als json.loads() op de JSON-berichten van de server,
+voor snapshots en delta's, met en zonder eigen hand. Alleen staat een gewijzigde stoel in een
+binaire delta als volledig record, waar JSON alleen de gewijzigde velden stuurt.
+
+Gebruik:
+    python -m pytest poker_gamelogic_testing/test_protocol.py
+    python poker_gamelogic_testing/test_protocol.py
+"""
+
+import json
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import protocol  # noqa: E402
+from server import GameState, Speler  # noqa: E402
+
+
+def _tafel() -> GameState:
+    state = GameState(seed=3)
+    state.voeg_speler_toe("a", Speler("anné", 100))
+    state.voeg_speler_toe("b", Speler("b" * protocol.NAAM_BYTES, 250))
+    return state
+
+
+def _vergelijk(state: GameState, ontvanger: str) -> None:
+    json_berichten = state.update_berichten([ontvanger])
+    state.gesynchroniseerd.clear()
+    binaire_berichten = state.update_berichten([ontvanger], {ontvanger})
+    uit_json = json.loads(json_berichten[ontvanger])
+    uit_json.pop("versie", None)  # alleen in JSON, voor debuggen
+    assert protocol.decodeer(binaire_berichten[ontvanger]) == uit_json
+
+
+def test_snapshot_lege_hand():
+    """Net aan tafel, nog geen kaarten: beide formaten geven [None, None]."""
+    state = _tafel()
+    _vergelijk(state, "a")
+    assert json.loads(state.create_state_message("a"))["spelers"]["1"]["hand"] == [None, None]
+
+
+def test_snapshot_met_hand():
+    state = _tafel()
+    state.schud(11)
+    state.deel_kaarten()
+    state.leg_kaart_in_river(0)
+    state.leg_kaart_in_river(1)
+    state.leg_kaart_in_river(2)
+    state.markeer_gewijzigd()
+    _vergelijk(state, "b")
+
+
+def test_delta_met_eigen_hand():
+    """Een gewijzigde stoel staat binair als volledig record in de delta; de rest is gelijk."""
+    berichten = []
+    for binair in (set(), {"a"}):  # twee tafels met precies dezelfde geschiedenis
+        state = _tafel()
+        state.update_berichten(["a"], binair)
+        state.schud(5)
+        state.deel_kaarten()
+        state.bet("a", 2)
+        berichten.append(state.update_berichten(["a"], binair)["a"])
+    uit_json, uit_binair = json.loads(berichten[0]), protocol.decodeer(berichten[1])
+    assert uit_json["eigen"]["hand"][0] is not None
+    for stoel, velden in uit_json.pop("spelers").items():
+        record = uit_binair["spelers"][stoel]
+        assert {veld: record[veld] for veld in velden} == velden
+    uit_binair.pop("spelers")
+    assert uit_binair == uit_json
+
+
+def test_snapshot_voor_een_client():
+    """Een snapshot voor één client tijdens een beurt geeft de rest geen delta en geen nieuw volgnummer."""
+    state = _tafel()
+    state.beurt_uuid, state.beurt_einde = "a", 1760000000.04
+    state.update_berichten(["a", "b"])
+    seq = state.seq
+    state.vraag_snapshot("a")
+    berichten = state.update_berichten(["a", "b"])
+    assert list(berichten) == ["a"] and state.seq == seq
+    snapshot = json.loads(berichten["a"])
+    assert snapshot["type"] == "gamestate" and snapshot["spelers"]["1"]["beurt_einde"] == 1760000000.0
+
+
+def test_ongeldig_bedrag():
+    state = _tafel()
+    for bedrag in (2**40, 1.5, True, 0, -3, 101, "10"):
+        try:
+            state.handle_client_input({"action": "raise", "amount": bedrag}, "a")
+        except ValueError:
+            continue
+        raise AssertionError(f"bedrag {bedrag!r} geaccepteerd")
+    assert state.spelers["a"].mostrecentaction is None
+
+
+def test_onverpakbaar_bericht():
+    """Past een stoel niet in het binaire formaat, dan krijgen de JSON-clients hun bericht toch."""
+    state = _tafel()
+    state.spelers["a"].coins = 2**40
+    berichten = state.update_berichten(["a", "b"], {"a"})
+    assert "a" not in berichten and "a" not in state.gesynchroniseerd
+    assert json.loads(berichten["b"])["spelers"]["1"]["coins"] == 2**40
+
+
+if __name__ == "__main__":
+    for naam, test in list(globals().items()):
+        if naam.startswith("test_"):
+            test()
+            print(f"{naam}: ok")
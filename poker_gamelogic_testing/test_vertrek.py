@@ -0,0 +1,124 @@
+"""
+Regressietests voor spelers die tijdens een hand komen of gaan.
+
+Een speler die tijdens een hand van tafel gaat (verbroken en niet hervat) checkt of past tot de
+hand klaar is en gaat daarna pas weg. Wie tijdens een hand gaat zitten speelt vanaf de volgende
+hand mee, en wie geen coins meer heeft zit uit. En als de game loop van een tafel toch stopt, wordt de hand een misdeal en krijgt de
+tafel een nieuwe loop.
+
+Gebruik:
+    python -m pytest poker_gamelogic_testing/test_vertrek.py
+    python poker_gamelogic_testing/test_vertrek.py
+"""
+
+import asyncio
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import server  # noqa: E402
+from server import Speler  # noqa: E402
+
+
+def _check(state, uuid):
+    return {"action": "check"}
+
+
+async def _speel_hand_met_vertrek():
+    tafels = server.TableManager()
+    state = tafels.maak_tafel("vertrek")
+    spelers = {}
+    for naam, bot in (("mens", None), ("bot1", _check), ("bot2", _check)):
+        spelers[naam] = Speler(naam, 100, bot=bot)
+        state.voeg_speler_toe(naam, spelers[naam])
+        tafels.speler_tafel[naam] = state.tafel_id
+    hand = asyncio.create_task(state.doe_1_ronde("bot2", 7))
+    while state.beurt_uuid != "mens":  # de hand wacht op de speler zonder bot
+        await asyncio.sleep(0)
+    tafels.verwijder_speler("bot1")  # niet aan de beurt
+    tafels.verwijder_speler("mens")  # midden in zijn beurt
+    assert "mens" in state.spelers and "bot1" in state.spelers  # zitten nog tot de hand klaar is
+    await asyncio.wait_for(hand, 5)
+    tafels.na_vertrek(state)
+    assert list(state.spelers) == ["bot2"]
+    assert sum(speler.coins for speler in spelers.values()) == 300
+    assert state.pot == 0
+    assert state.tafel_id in tafels.met_vrije_stoel
+
+
+def test_vertrek_tijdens_hand():
+    asyncio.run(_speel_hand_met_vertrek())
+
+
+async def _speel_hand_met_nieuwkomer():
+    state = server.TableManager().maak_tafel("erbij")
+    # deler bot1, blinds bot2 en bot3: mens is als eerste aan de beurt, bot4 moet nog in deze ronde
+    for naam, bot in (("bot1", _check), ("bot2", _check), ("bot3", _check), ("mens", None), ("bot4", _check)):
+        state.voeg_speler_toe(naam, Speler(naam, 100, bot=bot))
+    hand = asyncio.create_task(state.doe_1_ronde("bot1", 7))
+    while state.beurt_uuid != "mens":  # nog in de eerste ronde langs de tafel
+        await asyncio.sleep(0)
+    state.voeg_speler_toe("nieuw", Speler("nieuw", 100, bot=_check))
+    state.handle_client_input({"action": "check"}, "mens")
+    while not hand.done():
+        if state.beurt_uuid == "mens":
+            state.handle_client_input({"action": "check"}, "mens")
+        await asyncio.sleep(0)
+    hand.result()
+    assert state.spelers["nieuw"].hand_status is None  # niet meegespeeld
+    assert sum(speler.coins for speler in state.spelers.values()) == 600
+
+
+def test_nieuwkomer_tijdens_hand():
+    asyncio.run(_speel_hand_met_nieuwkomer())
+
+
+def test_zonder_coins_zit_uit():
+    """Een speler met 0 coins krijgt geen kaarten en zit niet in de beurtvolgorde."""
+    state = server.TableManager().maak_tafel("blut")
+    for naam, coins in (("blut", 0), ("a", 100), ("b", 100)):
+        state.voeg_speler_toe(naam, Speler(naam, coins, bot=_check))
+    assert state.spelers_met_coins() == ["a", "b"]
+    asyncio.run(state.doe_1_ronde("a", 7))
+    blut = state.spelers["blut"]
+    assert blut.hand == [None, None] and blut.hand_status is None and blut.coins == 0
+    assert state.spelers["a"].coins + state.spelers["b"].coins == 200
+
+
+async def _gecrashte_loop():
+    tafels = server.TableManager()
+    state = tafels.maak_tafel("crash")
+    for naam in ("a", "b"):
+        state.voeg_speler_toe(naam, Speler(naam, 100))
+        tafels.speler_tafel[naam] = state.tafel_id
+    state.hand_bezig = True
+    state.bet("a", 10)
+
+    async def kapot():
+        raise RuntimeError("stuk")
+
+    oude_loop = server.game_loop
+    server.game_loop = lambda state: kapot()
+    try:
+        tafels.start_loop(state)
+        eerste = tafels.taken["crash"]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+    finally:
+        server.game_loop = oude_loop
+    assert tafels.taken["crash"] is not eerste  # opnieuw gestart
+    assert state.spelers["a"].coins == 100 and state.pot == 0  # inzet terug
+    tafels.sluit_tafel("crash")
+
+
+def test_gecrashte_loop_wordt_herstart():
+    asyncio.run(_gecrashte_loop())
+
+
+if __name__ == "__main__":
+    for naam, test in list(globals().items()):
+        if naam.startswith("test_"):
+            test()
+            print(f"{naam}: ok")
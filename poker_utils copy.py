@@ -77,10 +77,10 @@ def bevat_flush(cards):
         waardes = {"2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8, "9": 9, "T": 10, "B": 11, "V": 12, "K": 13, "A": 14}
         return waardes[waarde]
 
-    kaarten_gesorteerd = sorted(hand, key=lambda kaart: waarde_naar_getal(kaart.waarde), reverse=True)
+    kaarten_gesorteerd = sorted(cards, key=lambda kaart: waarde_naar_getal(kaart.waarde), reverse=True)
 
     kleur_telling = {}
-    for kaart in hand:
+    for kaart in cards:
         if kaart.kleur in kleur_telling:
             kleur_telling[kaart.kleur] += 1
         else:
@@ -111,7 +111,7 @@ def all_same_color(cards):
     first_color = cards[0].kleur
     return all(card.kleur == first_color for card in cards)
 
-def kind_of_straight():
+def kind_of_straight(hand):
     all_straights = contains_straight(hand)[1]
 
     for i in range(len(all_straights)):
@@ -260,7 +260,7 @@ def bevat_full_house(quads, trips, paar):
     else:
         return [False, []]
 
-def beste_full_house():
+def beste_full_house(hand):
     rank_map = {
         '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
         'T': 10, 'B': 11, 'V': 12, 'K': 13, 'A': 14
@@ -314,7 +314,7 @@ def score_of_hand(hand):
     pairs = bevat_paar(hand)
     
     if contains_straight(hand)[0]: # als een straight, straigth flush of straigth het hoogste is
-        return kind_of_straight()
+        return kind_of_straight(hand)
     
     elif quads[0]: # als quads het hoogste is
         if high_cards[0] != quads[1]:
@@ -323,7 +323,7 @@ def score_of_hand(hand):
             return 8, [quads(hand)[1], high_cards[4]]
 
     elif bevat_full_house(bevat_four_of_a_kind(hand), bevat_three_of_a_kind(hand), bevat_paar(hand))[0]: # als full house het hoogste is
-        return beste_full_house()
+        return beste_full_house(hand)
     
     elif bevat_flush(hand)[0]:
         return 6, bevat_flush(hand)[1]
@@ -372,5 +372,5 @@ hand = [
     Kaart('Harten', '2')
 ]
 
-# beste_full_house()
+# beste_full_house(hand)
 print(score_of_hand(hand))
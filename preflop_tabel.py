@@ -0,0 +1,130 @@
+"""
+Vooraf berekende preflop-equity voor de 169 klassen van starthanden.
+
+Het bestand bestaat uit een header en daarna een float32-tabel van
+169 klassen x MAX_TEGENSTANDERS. Lezen gaat via mmap: openen kost niets en
+een opzoeking is één index in een memoryview.
+
+Klasse-index: een 13x13 matrix op rang (0 = "2" .. 12 = "A").
+Paren staan op de diagonaal, suited handen op (hoog, laag) en offsuit op (laag, hoog).
+
+Gebruik:
+    python preflop_tabel.py --iteraties 20000
+"""
+
+import argparse
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from equity import equity, naar_codes
+from hand_evaluator import WAARDES
+
+TABEL_VERSIE = 1  # ophogen als de evaluator of de layout verandert, dan wordt de tabel opnieuw gebouwd
+MAX_TEGENSTANDERS = 7  # GameState.MAXSPELERS - 1
+AANTAL_KLASSEN = 169
+STANDAARD_PAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.bin")
+STANDAARD_ITERATIES = 20_000
+
+_MAGIC = b"PFEQ"
+_HEADER = struct.Struct("<4sHHII")  # magic, versie, max tegenstanders, aantal klassen, iteraties per cel
+
+
+def klasse_index(kaart1, kaart2) -> int:
+    """Index (0..168) van de starthand; kaarten als Kaart-objecten of kaartcodes."""
+    code1, code2 = naar_codes([kaart1, kaart2])
+    rang1, rang2 = code1 >> 2, code2 >> 2
+    hoog, laag = max(rang1, rang2), min(rang1, rang2)
+    if (code1 & 3) == (code2 & 3):
+        return hoog * 13 + laag
+    return laag * 13 + hoog
+
+
+def klasse_naam(index: int) -> str:
+    """Bijv. "AKs", "T9o" of "77"."""
+    rij, kolom = divmod(index, 13)
+    if rij == kolom:
+        return WAARDES[rij] * 2
+    if rij > kolom:
+        return f"{WAARDES[rij]}{WAARDES[kolom]}s"
+    return f"{WAARDES[kolom]}{WAARDES[rij]}o"
+
+
+def _voorbeeld_hand(index: int) -> list[int]:
+    """Een concrete hand uit de klasse: suited in harten, anders harten + ruiten."""
+    rij, kolom = divmod(index, 13)
+    if rij > kolom:
+        return [rij * 4, kolom * 4]
+    return [rij * 4, kolom * 4 + 1]
+
+
+def _bereken_cel(index: int, tegenstanders: int, iteraties: int) -> tuple:
+    resultaat = equity(_voorbeeld_hand(index), (), tegenstanders, iteraties,
+                       processen=1, seed=index * 16 + tegenstanders)
+    return index, tegenstanders, resultaat["equity"]
+
+
+def genereer(pad: str = STANDAARD_PAD, iteraties: int = STANDAARD_ITERATIES, processen: int = None) -> None:
+    """Bereken de volledige tabel over alle cores en schrijf hem atomair weg."""
+    tabel = [0.0] * (AANTAL_KLASSEN * MAX_TEGENSTANDERS)
+    taken = [(index, tegenstanders) for index in range(AANTAL_KLASSEN)
+             for tegenstanders in range(1, MAX_TEGENSTANDERS + 1)]
+    with ProcessPoolExecutor(max_workers=processen) as pool:
+        futures = [pool.submit(_bereken_cel, index, tegenstanders, iteraties) for index, tegenstanders in taken]
+        for future in futures:
+            index, tegenstanders, waarde = future.result()
+            tabel[index * MAX_TEGENSTANDERS + tegenstanders - 1] = waarde
+
+    tijdelijk = pad + ".tmp"
+    with open(tijdelijk, "wb") as bestand:
+        bestand.write(_HEADER.pack(_MAGIC, TABEL_VERSIE, MAX_TEGENSTANDERS, AANTAL_KLASSEN, iteraties))
+        bestand.write(struct.pack(f"<{len(tabel)}f", *tabel))
+    os.replace(tijdelijk, pad)
+
+
+class PreflopTabel:
+    """Alleen-lezen toegang tot een preflop-tabel via mmap."""
+
+    def __init__(self, pad: str = STANDAARD_PAD):
+        with open(pad, "rb") as bestand:
+            self._mmap = mmap.mmap(bestand.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, versie, max_tegenstanders, klassen, self.iteraties = _HEADER.unpack_from(self._mmap)
+        verwachte_grootte = _HEADER.size + 4 * klassen * max_tegenstanders
+        if (magic != _MAGIC or versie != TABEL_VERSIE or max_tegenstanders != MAX_TEGENSTANDERS
+                or klassen != AANTAL_KLASSEN or len(self._mmap) != verwachte_grootte):
+            self._mmap.close()
+            raise ValueError(f"Verouderde of ongeldige preflop-tabel: {pad}")
+        self._waardes = memoryview(self._mmap)[_HEADER.size:].cast("f")
+
+    def equity(self, kaart1, kaart2, tegenstanders: int = 1) -> float:
+        """Equity van de starthand tegen `tegenstanders` willekeurige handen."""
+        if not 1 <= tegenstanders <= MAX_TEGENSTANDERS:
+            raise ValueError("Ongeldig aantal tegenstanders")
+        return self._waardes[klasse_index(kaart1, kaart2) * MAX_TEGENSTANDERS + tegenstanders - 1]
+
+    def sluit(self) -> None:
+        self._waardes.release()
+        self._mmap.close()
+
+
+def laad(pad: str = STANDAARD_PAD, iteraties: int = STANDAARD_ITERATIES) -> PreflopTabel:
+    """Open de tabel; als hij ontbreekt of van een oude versie is wordt hij eerst opnieuw gebouwd."""
+    try:
+        return PreflopTabel(pad)
+    except (OSError, ValueError, struct.error):
+        genereer(pad, iteraties)
+        return PreflopTabel(pad)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genereer de preflop-equitytabel.")
+    parser.add_argument("--pad", default=STANDAARD_PAD)
+    parser.add_argument("--iteraties", type=int, default=STANDAARD_ITERATIES)
+    parser.add_argument("--processen", type=int, default=None)
+    args = parser.parse_args()
+    genereer(args.pad, args.iteraties, args.processen)
+    tabel = PreflopTabel(args.pad)
+    for index in (12 * 13 + 12, 12 * 13 + 11, 0 * 13 + 5):
+        print(klasse_naam(index), [round(tabel._waardes[index * MAX_TEGENSTANDERS + n], 3)
+                                   for n in range(MAX_TEGENSTANDERS)])
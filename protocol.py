@@ -0,0 +1,275 @@
+"""
+Compact binair formaat voor de berichten van de server naar de client, als alternatief voor JSON.
+
+De client vraagt het formaat aan in de handshake ({"type": "connect", "formaten": ["binair", "json"]});
+de server antwoordt in "register" met het gekozen "formaat". Berichten van de client naar de server
+blijven JSON, die zijn klein en zeldzaam.
+
+Een kaart is één byte: de kaartcode uit hand_evaluator (rang * 4 + kleur), GEEN_KAART voor een lege
+plek of een dichte kaart. Een stoel is een record met vaste breedte (_STOEL). Alle getallen zijn
+little-endian.
+
+    snapshot: _SNAPSHOT_KOP, aantal x _STOEL, [_EIGEN]
+    delta:    _DELTA_KOP, [river 5 bytes], [pot], [highest bid], aantal x _STOEL,
+              aantal x vrijgekomen stoel (1 byte), [_EIGEN]
+
+Het eigen blok (hand en hand_info van de ontvanger) staat altijd achteraan, zodat de server het
+publieke deel één keer kan coderen en per client alleen nog iets hoeft aan te plakken.
+decodeer() geeft dezelfde dicts terug als json.loads() op de JSON-berichten, dus de client
+verwerkt beide formaten met dezelfde code. Het enige verschil: een gewijzigde stoel in een delta
+is binair een volledig record, in JSON alleen de gewijzigde velden; toegepast geven ze dezelfde staat.
+
+Gebruik (meet bytes per update en codeer/decodeer-snelheid tegen JSON):
+    python protocol.py
+"""
+
+import math
+import struct
+
+from hand_evaluator import KLEUREN, WAARDES, hand_naam, kickers
+
+FORMAAT = "binair"
+SNAPSHOT = 1
+DELTA = 2
+GEEN_KAART = 0xFF
+NAAM_BYTES = 16  # langste naam in UTF-8; de server weigert langere namen bij het registreren
+
+# Vlaggen in de delta-kop: welke optionele velden volgen
+RIVER = 1
+POT = 2
+HIGHEST_BID = 4
+
+# Vlaggen in een stoel-record
+AAN_DE_BEURT = 1
+GEPAST = 2
+
+ACTIES = (None, "pass", "check", "raise")
+DRAWS = ("flush draw", "open-ended straight draw", "gutshot")
+
+_SNAPSHOT_KOP = struct.Struct("<BIii5sB")  # type, seq, pot, highest bid, river, aantal stoelen
+_DELTA_KOP = struct.Struct("<BIBBB")  # type, seq, vlaggen, aantal gewijzigde stoelen, aantal vrijgekomen stoelen
+_STOEL = struct.Struct(f"<BB{NAAM_BYTES}siiBifd")  # stoel, vlaggen, naam, coins, current_bet, actie, bedrag, equity, beurt_einde
+_EIGEN = struct.Struct("<B2sIBB")  # stoel, hand, sterkte (0 = onbekend), aantal kaarten, draws
+_RIVER = struct.Struct("<5s")
+_BEDRAG = struct.Struct("<i")
+
+_CODES = {(kleur, waarde): rang * 4 + kleur_index
+          for rang, waarde in enumerate(WAARDES) for kleur_index, kleur in enumerate(KLEUREN)}
+
+
+def _kaarten_naar_bytes(kaarten) -> bytes:
+    """Lijst met kaart-dicts ({"kleur", "waarde"}) of None -> één byte per kaart."""
+    return bytes(_CODES[kaart["kleur"], kaart["waarde"]] if kaart else GEEN_KAART for kaart in kaarten)
+
+
+def _bytes_naar_kaarten(data: bytes) -> list:
+    return [{"kleur": KLEUREN[code & 3], "waarde": WAARDES[code >> 2]} if code != GEEN_KAART else None
+            for code in data]
+
+
+def _codeer_naam(naam: str) -> bytes:
+    """De server weigert langere namen bij het registreren; afkappen is alleen een vangnet (zonder half UTF-8 teken)."""
+    data = naam.encode()[:NAAM_BYTES]
+    return data.decode(errors="ignore").encode()
+
+
+def _codeer_stoel(record: dict) -> bytes:
+    actie = record["mostrecentaction"] or {}
+    equity = record["equity"]
+    beurt_einde = record.get("beurt_einde")
+    return _STOEL.pack(
+        record["stoelnummer"],
+        (AAN_DE_BEURT if record["isAanDeBeurt"] else 0) | (GEPAST if record["isGepast"] else 0),
+        _codeer_naam(record["naam"]),
+        record["coins"],
+        record["current_bet"],
+        ACTIES.index(actie.get("action")),
+        actie.get("amount", 0),
+        math.nan if equity is None else equity,
+        math.nan if beurt_einde is None else beurt_einde,
+    )
+
+
+def _decodeer_stoel(data, offset: int) -> dict:
+    stoel, vlaggen, naam, coins, current_bet, actie, bedrag, equity, beurt_einde = _STOEL.unpack_from(data, offset)
+    if actie == 0:
+        mostrecentaction = None
+    elif ACTIES[actie] == "raise":
+        mostrecentaction = {"action": "raise", "amount": bedrag}
+    else:
+        mostrecentaction = {"action": ACTIES[actie]}
+    return {
+        "naam": naam.rstrip(b"\0").decode(),
+        "coins": coins,
+        "current_bet": current_bet,
+        "mostrecentaction": mostrecentaction,
+        "isAanDeBeurt": bool(vlaggen & AAN_DE_BEURT),
+        "isGepast": bool(vlaggen & GEPAST),
+        "stoelnummer": stoel,
+        "equity": None if math.isnan(equity) else equity,
+        "beurt_einde": None if math.isnan(beurt_einde) else beurt_einde,
+    }
+
+
+def codeer_snapshot(velden: dict, seq: int) -> bytes:
+    """Het publieke deel van een snapshot; velden zoals GameState._publieke_velden() ze geeft."""
+    spelers = velden["spelers"]
+    delen = [_SNAPSHOT_KOP.pack(SNAPSHOT, seq, velden["pot"], velden["highest bid"],
+                                _kaarten_naar_bytes(velden["river"]), len(spelers))]
+    delen.extend(_codeer_stoel(record) for record in spelers.values())
+    return b"".join(delen)
+
+
+def codeer_delta(delta: dict, velden: dict, seq: int) -> bytes:
+    """
+    Het publieke deel van een delta (zie server._delta). Een gewijzigde stoel gaat altijd als
+    volledig record mee; dat is met vaste breedte kleiner dan losse velden met hun naam.
+    """
+    vlaggen = (RIVER if "river" in delta else 0) | (POT if "pot" in delta else 0) \
+        | (HIGHEST_BID if "highest bid" in delta else 0)
+    gewijzigd = delta.get("spelers", {})
+    weg = delta.get("weg", [])
+    delen = [_DELTA_KOP.pack(DELTA, seq, vlaggen, len(gewijzigd), len(weg))]
+    if vlaggen & RIVER:
+        delen.append(_kaarten_naar_bytes(delta["river"]))
+    if vlaggen & POT:
+        delen.append(_BEDRAG.pack(delta["pot"]))
+    if vlaggen & HIGHEST_BID:
+        delen.append(_BEDRAG.pack(delta["highest bid"]))
+    delen.extend(_codeer_stoel(velden["spelers"][stoel]) for stoel in gewijzigd)
+    delen.append(bytes(int(stoel) for stoel in weg))
+    return b"".join(delen)
+
+
+def codeer_eigen(stoel: int, hand_codes, hand_status) -> bytes:
+    """
+    Hand en hand_info van de ontvanger. hand_codes: kaartcodes (None voor nog niet gedeeld),
+    hand_status: een HandStatus of None. De client rekent "hand" en "kickers" terug uit de sterkte.
+    """
+    hand = bytes(GEEN_KAART if code is None else code for code in (list(hand_codes) + [None, None])[:2])
+    if hand_status is None:
+        return _EIGEN.pack(stoel, hand, 0, 0, 0)
+    draws = hand_status.draws()
+    masker = sum(1 << i for i, draw in enumerate(DRAWS) if draw in draws)
+    return _EIGEN.pack(stoel, hand, hand_status.sterkte, hand_status.aantal, masker)
+
+
+def _decodeer_eigen(data, offset: int) -> dict:
+    stoel, hand, sterkte, aantal, masker = _EIGEN.unpack_from(data, offset)
+    hand_info = None
+    if sterkte:
+        hand_info = {
+            "hand": hand_naam(sterkte),
+            "kickers": kickers(sterkte, aantal),
+            "draws": [draw for i, draw in enumerate(DRAWS) if masker >> i & 1],
+        }
+    return {"stoel": stoel, "hand": _bytes_naar_kaarten(hand), "hand_info": hand_info}
+
+
+def decodeer(data: bytes) -> dict:
+    """Binair bericht -> dezelfde dict als json.loads() op het JSON-bericht geeft. Raises ValueError bij onzin."""
+    try:
+        return _decodeer(data)
+    except (struct.error, IndexError, KeyError, UnicodeDecodeError) as e:
+        raise ValueError(f"Ongeldig binair bericht: {e}") from None
+
+
+def _decodeer(data: bytes) -> dict:
+    soort = data[0]
+    if soort == SNAPSHOT:
+        _, seq, pot, highest_bet, river, aantal = _SNAPSHOT_KOP.unpack_from(data)
+        offset = _SNAPSHOT_KOP.size
+        spelers = {}
+        for _ in range(aantal):
+            record = _decodeer_stoel(data, offset)
+            record["hand"] = [None, None]
+            record["hand_info"] = None
+            spelers[str(record["stoelnummer"])] = record
+            offset += _STOEL.size
+        if len(data) - offset == _EIGEN.size:
+            eigen = _decodeer_eigen(data, offset)
+            spelers[str(eigen.pop("stoel"))].update(eigen)
+        return {"type": "gamestate", "seq": seq, "spelers": spelers,
+                "river": _bytes_naar_kaarten(river), "pot": pot, "highest bid": highest_bet}
+
+    if soort == DELTA:
+        _, seq, vlaggen, aantal, aantal_weg = _DELTA_KOP.unpack_from(data)
+        offset = _DELTA_KOP.size
+        event = {"type": "delta", "seq": seq}
+        if vlaggen & RIVER:
+            event["river"] = _bytes_naar_kaarten(_RIVER.unpack_from(data, offset)[0])
+            offset += _RIVER.size
+        if vlaggen & POT:
+            event["pot"] = _BEDRAG.unpack_from(data, offset)[0]
+            offset += _BEDRAG.size
+        if vlaggen & HIGHEST_BID:
+            event["highest bid"] = _BEDRAG.unpack_from(data, offset)[0]
+            offset += _BEDRAG.size
+        if aantal:
+            event["spelers"] = {}
+            for _ in range(aantal):
+                record = _decodeer_stoel(data, offset)
+                event["spelers"][str(record["stoelnummer"])] = record
+                offset += _STOEL.size
+        if aantal_weg:
+            event["weg"] = [str(stoel) for stoel in data[offset:offset + aantal_weg]]
+            offset += aantal_weg
+        if len(data) - offset == _EIGEN.size:
+            event["eigen"] = _decodeer_eigen(data, offset)
+        return event
+
+    raise ValueError(f"Onbekend berichttype: {soort}")
+
+
+if __name__ == "__main__":
+    import json
+    import random
+    import time
+
+    rng = random.Random(1)
+
+    def kaart():
+        return {"kleur": rng.choice(KLEUREN), "waarde": rng.choice(WAARDES)}
+
+    # Een volle tafel van 8 halverwege een hand, en een typische delta: één speler zet in
+    velden = {
+        "spelers": {
+            str(stoel): {
+                "naam": f"speler{stoel}", "coins": rng.randint(0, 300), "current_bet": rng.randint(0, 20),
+                "mostrecentaction": rng.choice([None, {"action": "check"}, {"action": "raise", "amount": 10}]),
+                "isAanDeBeurt": stoel == 3, "isGepast": stoel % 4 == 0, "stoelnummer": stoel, "equity": None,
+                "beurt_einde": 1760000017.5 if stoel == 3 else None,
+            }
+            for stoel in range(1, 9)
+        },
+        "river": [kaart(), kaart(), kaart(), None, None],
+        "pot": 120,
+        "highest bid": 20,
+    }
+    delta = {"spelers": {"3": {"coins": 80, "current_bet": 20}}, "pot": 140}
+
+    def json_snapshot():
+        spelers = {stoel: dict(record, hand=[None, None], hand_info=None) for stoel, record in velden["spelers"].items()}
+        return json.dumps({"type": "gamestate", "seq": 7, **velden, "spelers": spelers}).encode()
+
+    def json_delta():
+        return json.dumps({"type": "delta", "seq": 8, **delta}).encode()
+
+    gevallen = {
+        "snapshot": (json_snapshot, lambda: codeer_snapshot(velden, 7)),
+        "delta": (json_delta, lambda: codeer_delta(delta, velden, 8)),
+    }
+    n = 20_000
+    print(f"{'bericht':<10}{'formaat':<8}{'bytes':>7}{'codeer/s':>12}{'decodeer/s':>12}")
+    for naam, (als_json, als_binair) in gevallen.items():
+        for formaat, codeer, lees in (("json", als_json, json.loads), ("binair", als_binair, decodeer)):
+            bericht = codeer()
+            start = time.perf_counter()
+            for _ in range(n):
+                codeer()
+            codeer_duur = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(n):
+                lees(bericht)
+            lees_duur = time.perf_counter() - start
+            print(f"{naam:<10}{formaat:<8}{len(bericht):>7}{n / codeer_duur:>12,.0f}{n / lees_duur:>12,.0f}")
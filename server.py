@@ -1,22 +1,81 @@
 #!/usr/bin/env python
 
+import argparse
 import asyncio
+import heapq
 import json
 import logging
+import multiprocessing
+import os
+import re
+import secrets
+import struct
+import time
 import uuid
+import zlib
 from websockets.asyncio.server import broadcast, serve
 # import websockets
 import random
+from collections import deque
 from itertools import cycle
 
+import journaal
+import metingen
+import opslag
+import protocol
+from equity import exacte_equity
+from timerwiel import TimerWiel
+from hand_evaluator import DECK, HandStatus, evalueer, hand_naam, int_naar_kaart, kaart_naar_int
+
 logging.basicConfig()
 
 USERS = {}  # Slaat de websocket en bijbehorende UUID op
+FORMATEN = {}  # {client_uuid: formaat} voor clients die in de handshake om protocol.FORMAAT hebben gevraagd
+SESSIES = {}  # {token: client_uuid}; met het token kan een client na een verbroken verbinding hervatten
+TOKENS = {}  # {client_uuid: token}
+AFWEZIG = {}  # {client_uuid: Timer} van spelers zonder verbinding; als de timer afgaat verliezen ze hun stoel
 
 USERS_LOCK = asyncio.Lock()
 
+STANDAARD_HOST = os.environ.get("POKER_HOST", "192.168.178.110")
+STANDAARD_POORT = int(os.environ.get("POKER_PORT", 8000))
+HARTSLAG_INTERVAL = 1.0  # seconden tussen statusberichten van een worker
+HARTSLAG_TIMEOUT = 5.0  # een worker die zo lang niets meldt wordt herstart
+BEURT_TIJD = 20.0  # seconden per beurt
+TIJDBANK = 30.0  # extra seconden per speler, voor de hele sessie, als een beurt langer duurt
+
+BEURT_KLOK = TimerWiel()  # alle beurt-timers van alle tafels in dit proces
+JOURNAAL_SYNC_INTERVAL = 1.0  # seconden tussen twee fsyncs van het handjournaal
+JOURNAAL: journaal.Journaal = None  # handjournaal van dit proces (--journaal), None = niet opslaan
+SNAPSHOT_INTERVAL = 5.0  # seconden tussen twee rondes snapshots van gewijzigde tafels (--snapshots)
+HERVAT_TIJD = 60.0  # seconden dat een stoel bezet blijft na een verbroken verbinding, om te kunnen hervatten
+INHAAL_BUFFER = 128  # aantal recente delta's per tafel waaruit een hervattende client kan inhalen
+
+# Metrics (zie metingen.py), op te vragen via --metrics-poort
+ACTIE_LATENTIE = metingen.Histogram("poker_actie_latentie_seconden", "Van een binnenkomende actie tot de push van de nieuwe staat")
+BEURT_DUUR = metingen.Histogram("poker_beurt_seconden", "Bedenktijd van spelers, tot hun actie of het einde van hun beurt",
+                                grenzen=(0.5, 1, 2, 5, 10, 20, 30, 60))
+UPDATE_TIJD = metingen.Histogram("poker_update_seconden", "Tijd om de staatberichten van één push te maken")
+UPDATE_BYTES = metingen.Teller("poker_update_bytes_total", "Verstuurde bytes aan staatberichten", ("formaat",))
+UPDATE_BERICHTEN = metingen.Teller("poker_update_berichten_total", "Verstuurde staatberichten", ("formaat",))
+FASE_DUUR = metingen.Histogram("poker_fase_seconden", "Duur van een biedronde", ("fase",),
+                               grenzen=(0.001, 0.01, 0.1, 1, 5, 10, 30, 60, 120, 300))
+HANDEN = metingen.Teller("poker_handen_total", "Gespeelde handen", ("tafel",))
+VERBINDINGEN = metingen.Meter("poker_verbindingen", "Verbonden websockets", functie=lambda: len(USERS))
+TAFELS = metingen.Meter("poker_tafels", "Open tafels", functie=lambda: len(tafels.tafels))
+LUS_VERTRAGING = metingen.Histogram("poker_event_loop_vertraging_seconden", "Hoe veel later de event loop een timer afhandelt dan gepland")
+HERVATTINGEN = metingen.Teller("poker_hervattingen_total", "Hervatte sessies, ingehaald met delta's of met een snapshot", ("manier",))
+LUS_VERTRAGING_LAATST = metingen.Meter("poker_event_loop_vertraging_laatste_seconden", "De laatst gemeten vertraging van de event loop")
+FASEN = {0: "preflop", 3: "flop", 4: "turn", 5: "river"}  # naam van een biedronde, naar het aantal kaarten in de river
+
+# Ingevuld door worker_main als de server met meerdere processen draait.
+WORKER_INDEX = 0
+AANTAL_WORKERS = 1
+BASIS_POORT = STANDAARD_POORT
+
 class Kaart:
     SUIT_SYMBOLS = {"harten": "♥", "ruiten": "♦", "klaveren": "♣", "schoppen": "♠"}
+    __slots__ = ("kleur", "waarde", "code")
 
     def __init__(self, kleur, waarde):
         """
@@ -25,14 +84,22 @@ class Kaart:
         """
         self.kleur = kleur
         self.waarde = waarde
+        self.code = kaart_naar_int(self)  # rang * 4 + kleur, zoals in hand_evaluator
+
+# Eén Kaart per kaartcode. Kaarten veranderen nooit, dus alle tafels en handen delen deze 52 objecten.
+KAARTEN = tuple(Kaart(*int_naar_kaart(code)) for code in DECK)
 
 class Speler:
-    def __init__(self, naam: str, coins: int, hand: list[tuple[Kaart, bool]] = None):
+    __slots__ = ("naam", "coins", "hand", "is_AanDeBeurt", "is_Gepast", "stoelnummer", "current_bet",
+                 "current_inzet", "mostrecentaction", "hand_status", "action_event", "bot", "tijdbank", "weg")
+
+    def __init__(self, naam: str, coins: int, hand: list[tuple[Kaart, bool]] = None, bot = None):
         """
         Parameters:
         - naam: Name of the player.
         - coins: The number of coins the player has.
         - hand: A list of tuples, each containing a Kaart instance and a boolean for face-down status.
+        - bot: optioneel bot(state, uuid) -> actie-dict (zoals mostrecentaction); dan wacht de speler niet op een client.
         """
         self.naam: str = naam
         self.coins: int = coins
@@ -42,56 +109,124 @@ class Speler:
         self.stoelnummer:int
         self.current_bet:int = 0
         self.mostrecentaction = None
+        self.hand_status: HandStatus = None  # wordt per kaart in de river bijgewerkt
+        self.bot = bot
+        self.weg: bool = False  # van tafel gehaald tijdens een hand; gaat weg zodra de hand klaar is
+        self.tijdbank: float = TIJDBANK
 
     async def wait_for_action(self):
         await self.action_event.wait()  # Wait for the player to take action
         self.action_event.clear()  # Reset the event for the next round
 
+# Wat andere spelers van een hand zien, als staart van een stoel-record
+_VERBORGEN_HAND = b', "hand": [null, null], "hand_info": null}'
+_ACTIE_CODES = {actie: code for code, actie in enumerate(journaal.ACTIES)}
+
+
+def _delta(oud:dict, nieuw:dict) -> dict:
+    """
+    Verschil tussen twee publieke toestanden (zie GameState._publieke_velden). Alle waardes zijn
+    absoluut, dus een delta twee keer toepassen kan geen kwaad. Nieuwe stoelen komen er compleet in,
+    vrijgekomen stoelen staan onder "weg".
+    """
+    delta = {}
+    spelers = {}
+    for stoel, record in nieuw["spelers"].items():
+        vorig = oud["spelers"].get(stoel)
+        if vorig is None:
+            spelers[stoel] = record
+            continue
+        gewijzigd = {veld: waarde for veld, waarde in record.items() if vorig.get(veld) != waarde}
+        if gewijzigd:
+            spelers[stoel] = gewijzigd
+    if spelers:
+        delta["spelers"] = spelers
+    weg = [stoel for stoel in oud["spelers"] if stoel not in nieuw["spelers"]]
+    if weg:
+        delta["weg"] = weg
+    for sleutel in ("river", "pot", "highest bid"):
+        if oud[sleutel] != nieuw[sleutel]:
+            delta[sleutel] = nieuw[sleutel]
+    return delta
+
+
 class GameState:
     SUIT_SYMBOLS = {"harten": "♥", "ruiten": "♦", "klaveren": "♣", "schoppen": "♠"}
-    def __init__(self) -> None:
+    def __init__(self, seed:int = None) -> None:
         self.MAXSPELERS = 8
         self.spelers:dict = {}  # {client_uuid: speler_object}
         self.AanDeBerut:str = None # uuid of player whos turn it is # of stoelnummer?
         self.river = [None, None, None, None, None] # List of cards in river. None represents no card
+        self.deck = bytearray(DECK)  # kaartcodes; de eerste `self.getrokken` zijn deze hand al gedeeld
+        self.getrokken:int = 0
+        self.rng = random.Random(seed)  # eigen stroom per tafel; levert de seed van iedere hand
+        self.hand_seed:int = None  # seed van het deck van de huidige hand (staat in het journaal)
+        self._deck_rng = random.Random()  # trekt de kaarten van één hand, opnieuw geseed door schud()
         self.is_stoel_bezet = [False,False,False,False,False,False,False,False]
+        self.vrije_stoelen = list(range(1, self.MAXSPELERS + 1))  # heap, laagste vrije stoel eerst
+        self.tafel_id:str = None
         self.pot = 0       # Total coins in the pot
         self.current_bet = 0  # Current highest bet
         self.round_state = ""  # Describes the current phase of the game
         self.highest_bet = 0  # The highest bet in the current round
+        self.equities:dict = {}  # {client_uuid: equity} als de actieve spelers all-in zijn
+        self.deler_uuid:str = None
+        self.beurt_uuid:str = None  # speler op wie bied_fase wacht
+        self.beurt_einde:float = None  # time.time() waarop zijn beurt automatisch eindigt (clients tellen zelf af)
+        self.gewijzigd = asyncio.Event()  # gezet bij elke wijziging; stuur_updates pusht dan de nieuwe staat
+        self.versie:int = 0  # gaat omhoog bij elke wijziging van de staat
+        self.seq:int = 0  # volgnummer van de laatst gepushte delta
+        self._velden:tuple = None  # (versie, publieke velden)
+        self._publiek:tuple = None  # (versie, seq, ...) van de laatst geserialiseerde publieke staat
+        self._publiek_binair:tuple = None  # (versie, seq, bytes): hetzelfde in het binaire formaat
+        self._gepusht:dict = None  # de publieke velden zoals ze bij de laatste push waren
+        self.gesynchroniseerd:dict = {}  # {client_uuid: laatst gestuurde privé-JSON}; ontbreekt = krijgt een snapshot
+        self.recente_deltas = deque(maxlen=INHAAL_BUFFER)  # (seq, JSON-delta, delta, records van de gewijzigde stoelen) per push
+        self.journaal:journaal.Journaal = None  # als gezet wordt elke hand hierin vastgelegd
+        self._journaal_tafel:int = None  # tafelnummer in self.journaal
+        self.hand_bezig:bool = False  # tussen het delen en het uitbetalen van een hand
+        self.vuil:bool = False  # stoelen of coins zijn veranderd sinds de laatste snapshot (zie opslag.py)
+        self.actie_ontvangen:float = None  # perf_counter() van de eerste actie die nog niet gepusht is
+
+    def markeer_gewijzigd(self) -> None:
+        """
+        Meld dat de staat veranderd is: de versie gaat omhoog (dus de gecachte serialisatie vervalt)
+        en stuur_updates pusht. Meerdere wijzigingen binnen één tik worden samen gepusht.
+        """
+        self.versie += 1
+        self.gewijzigd.set()
 
-    def create_state_message(self, target_uuid) -> str:
+    def vraag_snapshot(self, client_uuid) -> None:
         """
-        Genereer een gamestate die alleen informatie bevat die zichtbaar is voor de gevraagde client.
+        Stuur deze client bij de volgende push de volledige staat, bijv. na een gat in de volgnummers.
+        De staat zelf verandert niet: de rest krijgt niets en het volgnummer blijft gelijk.
         """
-        spelers_data = {}
+        self.gesynchroniseerd.pop(client_uuid, None)
+        self.gewijzigd.set()
+
+    def _publieke_velden(self) -> dict:
+        """Alles wat iedereen aan tafel mag zien, één keer per versie opgebouwd. Stoelnummers als str, zoals in JSON."""
+        if self._velden is not None and self._velden[0] == self.versie:
+            return self._velden[1]
+        spelers = {}
         for uuid, speler in self.spelers.items():
-            # spelers_data[uuid] = {
-            if speler.stoelnummer in spelers_data:
+            stoel = str(speler.stoelnummer)
+            if stoel in spelers:
                 raise ValueError(f"Duplicate stoelnummer detected: {speler.stoelnummer}")
-            
-            if (uuid == target_uuid):
-                hand = [{'kleur':kaart.kleur, "waarde": kaart.waarde}for kaart in speler.hand]
-            else:
-                hand = [None, None]
-
-            spelers_data[speler.stoelnummer] = {
+            spelers[stoel] = {
                 "naam": speler.naam,
                 "coins": speler.coins,
                 "current_bet": speler.current_bet,
                 "mostrecentaction": speler.mostrecentaction,
-                "hand": hand,
-                # "hand": [
-                #     {"kleur": kaart.kleur, "waarde": kaart.waarde} if (uuid == target_uuid or not dicht) and kaart is not None else None
-                #     for kaart, dicht in speler.hand
-                # ],
                 "isAanDeBeurt": speler.is_AanDeBeurt,
                 "isGepast": speler.is_Gepast,
-                "stoelnummer": speler.stoelnummer
+                "stoelnummer": speler.stoelnummer,
+                "equity": self.equities.get(uuid),
+                # één keer per beurt; de client telt zelf af, dus de klok geeft geen delta's
+                "beurt_einde": round(self.beurt_einde, 1) if uuid == self.beurt_uuid else None,
             }
-        return json.dumps({
-            "type": "gamestate",
-            "spelers": spelers_data,
+        velden = {
+            "spelers": spelers,
             "river": [
                 {"kleur": kaart.kleur, "waarde": kaart.waarde} if kaart else None
                 for kaart in self.river
@@ -99,13 +234,162 @@ class GameState:
             # "aanDeBeurt": self.AanDeBerut,
             "pot": self.pot,
             "highest bid": self.highest_bet,
+        }
+        self._velden = (self.versie, velden)
+        return velden
+
+    def _publieke_staat(self) -> tuple:
+        """
+        Het publieke deel van de gamestate, één keer per versie geserialiseerd.
+
+        Returns:
+        - (versie, seq, delen, posities): `delen` zijn de bytes van het bericht zoals een toeschouwer het ziet,
+          met iedere stoel als apart deel; posities = {client_uuid: (index in delen, stoel zonder hand)}.
+        """
+        if self._publiek is not None and self._publiek[:2] == (self.versie, self.seq):
+            return self._publiek
+        velden = self._publieke_velden()
+        delen = [json.dumps({"type": "gamestate", "versie": self.versie, "seq": self.seq})[:-1].encode() + b', "spelers": {']
+        posities = {}
+        for uuid, speler in self.spelers.items():
+            if len(delen) > 1:
+                delen.append(b", ")
+            # Het record zonder de afsluitende "}", zodat de hand er per kijker achter geplakt kan worden
+            stoel = str(speler.stoelnummer)
+            zonder_hand = (f'"{stoel}": ' + json.dumps(velden["spelers"][stoel])[:-1]).encode()
+            posities[uuid] = (len(delen), zonder_hand)
+            delen.append(zonder_hand + _VERBORGEN_HAND)
+        rest = {sleutel: velden[sleutel] for sleutel in ("river", "pot", "highest bid")}
+        delen.append(b"}, " + json.dumps(rest)[1:].encode())
+        self._publiek = (self.versie, self.seq, delen, posities)
+        return self._publiek
+
+    def _prive(self, client_uuid) -> str:
+        """De eigen hand en hand_info van een speler als JSON-object."""
+        speler = self.spelers[client_uuid]
+        return json.dumps({
+            # altijd twee plekken, ook voor wie nog geen kaarten heeft (zoals protocol.codeer_eigen)
+            "hand": [{"kleur": kaart.kleur, "waarde": kaart.waarde} if kaart else None for kaart in (speler.hand + [None, None])[:2]],
+            "hand_info": speler.hand_status.als_dict() if speler.hand_status else None,
         })
-    
+
+    def _eigen_json(self, client_uuid, prive:str) -> bytes:
+        """Het "eigen"-veld van een delta, om achter een JSON-object zonder zijn laatste "}" te plakken."""
+        return f', "eigen": {{"stoel": {self.spelers[client_uuid].stoelnummer}, {prive[1:]}}}'.encode()
+
+    def create_state_message(self, target_uuid, prive:str = None) -> bytes:
+        """
+        Genereer een gamestate die alleen informatie bevat die zichtbaar is voor de gevraagde client.
+
+        Het publieke deel komt uit de cache van de huidige versie; alleen de eigen hand en hand_info
+        van de kijker worden nog geserialiseerd en op zijn stoel ingevoegd. Het resultaat is JSON
+        als UTF-8 bytes (verstuur als tekstframe: websocket.send(msg, text=True)).
+        """
+        _, _, delen, posities = self._publieke_staat()
+        if target_uuid not in posities:
+            return b"".join(delen)
+        index, zonder_hand = posities[target_uuid]
+        prive = prive or self._prive(target_uuid)
+        return b"".join(delen[:index]) + zonder_hand + b", " + prive[1:].encode() + b"".join(delen[index + 1:])
+
+    def _eigen_binair(self, client_uuid) -> bytes:
+        speler = self.spelers[client_uuid]
+        hand_codes = [kaart.code if kaart else None for kaart in speler.hand]
+        return protocol.codeer_eigen(speler.stoelnummer, hand_codes, speler.hand_status)
+
+    def binaire_snapshot(self, target_uuid) -> bytes:
+        """create_state_message in het binaire formaat: het publieke deel één keer per versie, de eigen hand erachter."""
+        if self._publiek_binair is None or self._publiek_binair[:2] != (self.versie, self.seq):
+            self._publiek_binair = (self.versie, self.seq, protocol.codeer_snapshot(self._publieke_velden(), self.seq))
+        publiek = self._publiek_binair[2]
+        if target_uuid not in self.spelers:
+            return publiek
+        return publiek + self._eigen_binair(target_uuid)
+
+    def update_berichten(self, ontvangers, binair=frozenset()) -> dict[str, bytes]:
+        """
+        De berichten voor één push: {client_uuid: bytes}.
+
+        Wie al gesynchroniseerd is krijgt een "delta" met alleen de gewijzigde publieke velden,
+        plus zijn eigen hand onder "eigen" als die veranderd is. Het volgnummer gaat alleen omhoog
+        als het publieke deel veranderd is. Clients zonder (geldige) staat krijgen een volledige
+        "gamestate" met het huidige volgnummer. Wie niets nieuws te zien krijgt, krijgt geen bericht.
+        Clients in `binair` krijgen dezelfde berichten in het formaat van protocol.py.
+        """
+        velden = self._publieke_velden()
+        delta = _delta(self._gepusht, velden) if self._gepusht is not None else None
+        if delta is None or delta:
+            self.seq += 1
+        self._gepusht = velden
+        publiek = json.dumps({"type": "delta", "seq": self.seq, **(delta or {})}).encode()
+        publiek_binair = None
+        if delta is None:
+            self.recente_deltas.clear()  # de eerste push: daarvoor valt niets in te halen
+        elif delta:
+            # alleen de records die codeer_delta nodig heeft, niet de hele tafel per push
+            records = {stoel: velden["spelers"][stoel] for stoel in delta.get("spelers", ())}
+            self.recente_deltas.append((self.seq, publiek, delta, {"spelers": records}))
+
+        berichten = {}
+        for client_uuid in ontvangers:
+            prive = self._prive(client_uuid)
+            vorige = self.gesynchroniseerd.get(client_uuid)
+            self.gesynchroniseerd[client_uuid] = prive
+            try:
+                if client_uuid in binair:
+                    if vorige is None:
+                        berichten[client_uuid] = self.binaire_snapshot(client_uuid)
+                        continue
+                    if vorige == prive and not delta:
+                        continue
+                    if publiek_binair is None:
+                        publiek_binair = protocol.codeer_delta(delta or {}, velden, self.seq)
+                    berichten[client_uuid] = publiek_binair + (self._eigen_binair(client_uuid) if vorige != prive else b"")
+                elif vorige is None:
+                    berichten[client_uuid] = self.create_state_message(client_uuid, prive)
+                elif vorige != prive:
+                    berichten[client_uuid] = publiek[:-1] + self._eigen_json(client_uuid, prive)
+                elif delta:
+                    berichten[client_uuid] = publiek
+            except (struct.error, ValueError, OverflowError) as fout:
+                # één onverpakbaar bericht mag de pushes aan de rest niet stoppen; deze client krijgt
+                # daarna een snapshot
+                logging.error("Bericht voor %s niet te coderen: %r", client_uuid, fout)
+                self.gesynchroniseerd.pop(client_uuid, None)
+        return berichten
+
+    def inhaal_berichten(self, client_uuid, seq, binair:bool = False) -> list[bytes]:
+        """
+        De delta's die een hervattende client gemist heeft sinds volgnummer `seq`, uit recente_deltas,
+        gevolgd door een delta zonder publieke wijzigingen met zijn eigen hand. Daarna geldt hij als
+        gesynchroniseerd tot en met de laatste push.
+
+        Returns:
+        - de berichten in volgorde, of None als ze niet meer allemaal in de buffer staan (of `seq`
+          niet klopt); de client moet dan een snapshot krijgen.
+        """
+        if self._gepusht is None or not isinstance(seq, int) or not 0 <= self.seq - seq <= len(self.recente_deltas):
+            return None
+        if client_uuid not in self.gesynchroniseerd:
+            return None  # niets van dit proces gekregen (bijv. hersteld na een herstart): andere volgnummers
+        gemist = list(self.recente_deltas)[len(self.recente_deltas) - (self.seq - seq):]
+        if gemist and gemist[0][0] != seq + 1:
+            return None
+        prive = self._prive(client_uuid)
+        if binair:
+            berichten = [protocol.codeer_delta(delta, records, nummer) for nummer, _, delta, records in gemist]
+            berichten.append(protocol.codeer_delta({}, self._gepusht, self.seq) + self._eigen_binair(client_uuid))
+        else:
+            berichten = [publiek for _, publiek, _, _ in gemist]
+            berichten.append(json.dumps({"type": "delta", "seq": self.seq})[:-1].encode() + self._eigen_json(client_uuid, prive))
+        self.gesynchroniseerd[client_uuid] = prive
+        return berichten
+
 
     def handle_client_input(self, event:dict, client_uuid:str)->None:
         # assert that client is allowed to make this action
         # update the gamestate, for example if the action is pass, then set the next player's is_AanDeBeurt to True. 
-        logging.info(f"Speler {client_uuid} heeft actie: {event['action']} uitgevoerd.")
+        logging.info("Speler %s heeft actie: %s uitgevoerd.", client_uuid, event["action"])
         if event["action"] == "pass":
             self.spelers[client_uuid].mostrecentaction = {"action":'pass'}
         elif event["action"] == "check":
@@ -113,33 +397,96 @@ class GameState:
         elif event["action"] == "raise":
             bedrag:int = event.get("amount")
             if bedrag is None: return
+            # alleen hele coins die de speler ook heeft: alles daarbuiten past niet in journaal of protocol
+            if type(bedrag) is not int or not 0 < bedrag <= self.spelers[client_uuid].coins:
+                raise ValueError("Ongeldig bedrag")
             self.spelers[client_uuid].mostrecentaction = {"action":'raise', 'amount': bedrag}
         else:
             raise ValueError("Onbekende actie")
         # Signal that the player has made their move
+        if self.actie_ontvangen is None:
+            self.actie_ontvangen = time.perf_counter()
         self.spelers[client_uuid].action_event.set()
+        self.markeer_gewijzigd()
 
 
 
-    def voeg_speler_toe(self, client_uuid, speler):
-        if len(self.spelers) >= self.MAXSPELERS:
+    def voeg_speler_toe(self, client_uuid, speler, stoel:int = None):
+        """Zet een speler op de laagste vrije stoel, of op `stoel` (bijv. bij het herspelen van een hand)."""
+        if len(self.spelers) >= self.MAXSPELERS or not self.vrije_stoelen:
             raise ValueError("Maximale aantal spelers bereikt.")
-        for i,stoel in enumerate(self.is_stoel_bezet):
-            if stoel==False:
-                speler.stoelnummer = i+1
-                self.is_stoel_bezet[i] = True
-                break
+        if stoel is None:
+            speler.stoelnummer = heapq.heappop(self.vrije_stoelen)
+        elif stoel in self.vrije_stoelen:
+            self.vrije_stoelen.remove(stoel)
+            heapq.heapify(self.vrije_stoelen)
+            speler.stoelnummer = stoel
+        else:
+            raise ValueError(f"Stoel {stoel} is niet vrij.")
+        self.is_stoel_bezet[speler.stoelnummer-1] = True
         speler.is_Gepast = True
-        print("[CONNECTION]",f'Beshcikbare stoelen {["X" if stoel else "O" for stoel in self.is_stoel_bezet]}')
+        logging.debug("[CONNECTION] Beschikbare stoelen %s", ["X" if stoel else "O" for stoel in self.is_stoel_bezet])
         speler.action_event = asyncio.Event()
         self.spelers[client_uuid] = speler
+        self.vuil = True
+        self.markeer_gewijzigd()
 
-    def verwijder_speler(self, client_uuid):
+    def verwijder_speler(self, client_uuid) -> bool:
+        """
+        Haal een speler van tafel. Tijdens een hand blijft hij zitten tot de hand klaar is (zie
+        ruim_vertrekkers_op): bied_fase checkt of past dan voor hem zonder te wachten, zoals de
+        beurtklok. Returns of de stoel nu al vrij is.
+        """
+        speler = self.spelers.get(client_uuid)
+        if speler is not None and self.hand_bezig:
+            speler.weg = True
+            if self.beurt_uuid == client_uuid:
+                self.verloop_beurt(speler)
+            self.markeer_gewijzigd()
+            return False
         if client_uuid in self.spelers:
             stoel = self.spelers[client_uuid].stoelnummer
             self.is_stoel_bezet[stoel-1] = False
+            heapq.heappush(self.vrije_stoelen, stoel)
             del self.spelers[client_uuid]
-        print("[DISCONNECTION]",f'Beshcikbare stoelen {["X" if stoel else "O" for stoel in self.is_stoel_bezet]}')
+            self.gesynchroniseerd.pop(client_uuid, None)
+            self.vuil = True
+            self.markeer_gewijzigd()
+        logging.debug("[DISCONNECTION] Beschikbare stoelen %s", ["X" if stoel else "O" for stoel in self.is_stoel_bezet])
+        return True
+
+    def misdeal(self) -> None:
+        """Breek de huidige hand af: iedereen krijgt zijn inzet terug, zoals bij herstel uit een snapshot."""
+        if self.hand_bezig:
+            for speler in self.spelers.values():
+                speler.coins += speler.current_bet
+                speler.current_bet = 0
+                speler.is_AanDeBeurt = False
+            self.pot = 0
+            self.hand_bezig = False
+        self.beurt_uuid = self.beurt_einde = None
+        self.ruim_vertrekkers_op()
+        self.vuil = True
+        self.markeer_gewijzigd()
+
+    def ruim_vertrekkers_op(self) -> list[str]:
+        """Haal na een hand de spelers weg die tijdens de hand vertrokken zijn. Returns hun uuids."""
+        vertrokken = [uuid for uuid, speler in self.spelers.items() if speler.weg]
+        for uuid in vertrokken:
+            self.verwijder_speler(uuid)
+        return vertrokken
+
+    def snapshot(self) -> bytes:
+        """
+        De tafel zoals hij aan het begin van de huidige hand was, in het formaat van opslag.py.
+        Tijdens een hand tellen de inzetten nog mee bij de coins van de speler. Met het token
+        kan een client na een herstart van de server zijn stoel terugkrijgen.
+        """
+        return opslag.codeer_tafel(self.tafel_id, [
+            (client_uuid, speler.naam, speler.stoelnummer,
+             speler.coins + (speler.current_bet if self.hand_bezig else 0), speler.tijdbank, TOKENS.get(client_uuid))
+            for client_uuid, speler in self.spelers.items()
+        ])
 
     def bezette_stoelen(self):
         l = []
@@ -155,19 +502,75 @@ class GameState:
                 l.append(uuid)
         return l
 
+    def spelers_aan_zet(self):
+        """Actieve spelers die nog kunnen bieden, dus niet all-in."""
+        return [uuid for uuid in self.actieve_spelers() if self.spelers[uuid].coins > 0]
+
+    def spelers_met_coins(self) -> list[str]:
+        """Wie de volgende hand meespeelt: spelers zonder coins zitten uit tot ze weg zijn."""
+        return [uuid for uuid, speler in self.spelers.items() if speler.coins > 0 and not speler.weg]
+
         
-    def deel_kaarten(self):
-        for uuid, speler in self.spelers.items():
-            speler.hand = [self.kaarten.pop(), self.kaarten.pop()]
+    def journaliseer(self, soort:int, stoel:int = 0, bedrag:int = 0, data:int = 0) -> None:
+        """Schrijf een record voor deze tafel naar het handjournaal, als dat er is (zie journaal.py)."""
+        if self.journaal is None:
+            return
+        if self._journaal_tafel is None:
+            self._journaal_tafel = self.journaal.tafel_nummer(self.tafel_id or "")
+        self.journaal.schrijf(soort, self._journaal_tafel, stoel, bedrag, data)
 
+    def schud(self, seed:int = None) -> None:
+        """
+        Begin een nieuwe hand met het hele deck in vaste volgorde. Het echte schudden gebeurt per
+        getrokken kaart, met een RNG die op de seed van deze hand staat: dezelfde seed geeft dezelfde
+        kaarten. Zonder `seed` komt die uit de RNG van de tafel.
+        """
+        self.hand_seed = self.rng.getrandbits(64) if seed is None else seed
+        self._deck_rng.seed(self.hand_seed)
+        self.deck[:] = DECK
+        self.getrokken = 0
 
-    def bet(self,player_uuid:str,amount:int)->None:
+    def trek_kaart(self) -> Kaart:
+        """
+        Eén stap van een Fisher–Yates shuffle: kies een willekeurige kaart uit het nog niet gedeelde
+        deel van het deck. Een hand schudt zo alleen de 2n + 5 kaarten die hij echt nodig heeft.
+        """
+        i = self.getrokken
+        j = self._deck_rng.randrange(i, len(self.deck))
+        self.deck[i], self.deck[j] = self.deck[j], self.deck[i]
+        self.getrokken = i + 1
+        return KAARTEN[self.deck[i]]
+
+    def deel_kaarten(self, deelnemers:list[str] = None):
+        for uuid in self.spelers if deelnemers is None else deelnemers:
+            speler = self.spelers[uuid]
+            speler.hand = [self.trek_kaart(), self.trek_kaart()]
+            speler.hand_status = HandStatus(kaart.code for kaart in speler.hand)
+        self.markeer_gewijzigd()
+
+    def leg_kaart_in_river(self, index:int) -> None:
+        """Leg de volgende kaart open in de river en werk de HandStatus van iedere speler bij."""
+        kaart = self.trek_kaart()
+        self.river[index] = kaart
+        code = kaart.code
+        self.journaliseer(journaal.RIVER, index, 0, code)
+        for speler in self.spelers.values():
+            if speler.hand_status is not None:
+                speler.hand_status.voeg_toe(code)
+        self.markeer_gewijzigd()
+
+
+    def bet(self,player_uuid:str,amount:int)->int:
+        """Zet `amount` in, maar nooit meer dan de speler heeft: met 0 coins over is hij all-in. Returns de inzet."""
         player = self.spelers[player_uuid]
+        amount = max(0, min(amount, player.coins))
         self.pot+=amount
         player.coins+=-amount
         player.current_bet+=amount
         if player.current_bet > self.highest_bet:
             self.highest_bet = player.current_bet
+        self.markeer_gewijzigd()
+        return amount
 
 
     def eerste_fase(self,iterator):
@@ -175,18 +578,23 @@ class GameState:
         self.highest_bet = 0  # De hoogste inzet start op 0
         """Handle the initial blinds phase."""
         self.round_state = "eerste_fase"
-        next_player = next(iterator)
-        self.bet(next_player,1)
-        next_player = next(iterator)
-        self.bet(next_player,2)
+        for blind in (1, 2):
+            next_player = next(iterator)
+            self.bet(next_player,blind)
+            self.journaliseer(journaal.BLIND, self.spelers[next_player].stoelnummer, blind)
 
     async def bied_fase(self, iterator):
         """Verwerkt de biedronde waar elke speler kan passen, checken of raisen."""
         self.round_state = "biedfase"
-        print("Biedfase begint")
+        logging.debug("Biedfase begint")
         if len(self.actieve_spelers()) == 1:
-            print("biedfase skipped because of only 1 active player")
+            logging.debug("biedfase skipped because of only 1 active player")
             return
+        aan_zet = self.spelers_aan_zet()
+        if not aan_zet or (len(aan_zet) == 1 and self.spelers[aan_zet[0]].current_bet >= self.highest_bet):
+            logging.debug("biedfase skipped because the other players are all-in")
+            return
+        start = time.perf_counter()
         self.current_bet = 0  # Start met een inzet van 0
         # self.highest_bet = 0  # De hoogste inzet start op 0
         actieve_spelers = self.actieve_spelers()  # Alle actieve spelers (niet gepast)
@@ -197,17 +605,26 @@ class GameState:
         while True:
             # 1 loop van deze loop is 1 beurt van 1 speler
             speler_uuid = next(iterator)
-            speler:Speler = self.spelers[speler_uuid]
-            print(speler.naam, ' is aan de beurt' )
-            speler.is_AanDeBeurt = True
-            
-
-            if speler.is_Gepast:
-                continue  # Sla spelers over die gepast hebben
+            speler:Speler = self.spelers.get(speler_uuid)
 
-            print(f"awaiting action from player {speler.naam}")
-            await speler.wait_for_action()
-            print(f"reveived action from player {speler.naam}")
+            if speler is None or speler.is_Gepast or speler.coins == 0:
+                continue  # Sla spelers over die er niet meer zijn, gepast hebben of all-in zijn
+            speler.is_AanDeBeurt = True
+            logging.debug("%s is aan de beurt", speler.naam)
+
+            self.markeer_gewijzigd()  # laat iedereen zien wie aan de beurt is
+            if speler.weg:
+                speler.mostrecentaction = self.automatische_actie(speler)
+            elif speler.bot is not None:
+                # headless (zie simulatie.py): de bot beslist meteen, zonder websocket of Event
+                speler.mostrecentaction = speler.bot(self, speler_uuid)
+            else:
+                logging.debug("awaiting action from player %s", speler.naam)
+                await self.wacht_op_actie(speler_uuid)
+            logging.debug("received action from player %s", speler.naam)
+            if self.journaal is not None:
+                self.journaliseer(journaal.ACTIE, speler.stoelnummer, speler.mostrecentaction.get("amount", 0) or 0,
+                                  _ACTIE_CODES.get(speler.mostrecentaction["action"], 0xFF))
 
             # # Wacht op de actie van de speler
             # if speler.mostrecentaction is None:  # Als de speler nog niets heeft gedaan
@@ -217,7 +634,7 @@ class GameState:
             if actie == "pass":
                 if speler.current_bet < self.highest_bet:                    
                     speler.is_Gepast = True  # Markeer de speler als gepast
-                    logging.info(f"Speler {speler.naam} heeft gepast.")
+                    logging.info("Speler %s heeft gepast.", speler.naam)
                     self.check_length:int = 0
 
                 elif speler.current_bet == self.highest_bet:
@@ -238,16 +655,16 @@ class GameState:
                     ontbrekend_bedrag = self.highest_bet - speler.current_bet
                     self.bet(speler_uuid, ontbrekend_bedrag)
                     self.check_length+=1
-                    logging.info(f"Speler {speler.naam} heeft gecheckt.")
+                    logging.info("Speler %s heeft gecheckt.", speler.naam)
                 elif speler.current_bet == self.highest_bet:
-                    logging.info(f"Speler {speler.naam} heeft gecheckt.")
+                    logging.info("Speler %s heeft gecheckt.", speler.naam)
                     speler.is_AanDeBeurt = False
                     self.check_length+=1
                     # continue
                 elif speler.current_bet > self.highest_bet:
                     # speler kan niet checken als de inzet hoger is dan de hoogste inzet
                     # goto actie == "raise"
-                    print(f"speler.current_bet: {speler.current_bet}, self.highest_bet: {self.highest_bet}")
+                    logging.debug("speler.current_bet: %s, self.highest_bet: %s", speler.current_bet, self.highest_bet)
                     raise ValueError("Speler kan niet checken als zijn inzet hoger is dan de hoogste inzet")
                     exit()
 
@@ -259,7 +676,7 @@ class GameState:
 
                 # moet deze check perse hier
                 if target_bet < self.highest_bet:
-                    logging.warning(f"Speler {speler.naam} probeert te raisen met een bedrag dat lager is dan de hoogste inzet.")
+                    logging.warning("Speler %s probeert te raisen met een bedrag dat lager is dan de hoogste inzet.", speler.naam)
                     # this action is invalid
                     # simply act as if the player has passed
                     speler.is_Gepast = True  # Markeer de speler als gepast
@@ -271,96 +688,227 @@ class GameState:
 
                 elif target_bet > self.highest_bet:
                     self.bet(speler_uuid, bedrag)
-                    logging.info(f"Speler {speler.naam} heeft verhoogd naar {bedrag}.")
+                    logging.info("Speler %s heeft verhoogd naar %s.", speler.naam, bedrag)
                     self.check_length:int = 1
 
+            if speler.coins == 0 and not speler.is_Gepast:
+                # all-in: hij telt niet meer mee bij de spelers die nog moeten reageren (spelers_aan_zet)
+                self.check_length = max(self.check_length - 1, 0)
             speler.is_AanDeBeurt = False  # Speler is klaar met handelen
+            self.markeer_gewijzigd()
 
-            print("[DEBUG] Check length: ",self.check_length)
-            print("[DEBUG] Actieve spelers: ",self.actieve_spelers())
+            if logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug("Check length: %s", self.check_length)
+                logging.debug("Actieve spelers: %s", self.actieve_spelers())
             # Controleer of de biedronde klaar is (alle spelers hebben dezelfde inzet of gepast)
-            if all(speler.is_Gepast for speler in self.spelers.values()) or self.check_length >= len(self.actieve_spelers()):
-                print("einde biedronde(1)")
+            if all(speler.is_Gepast for speler in self.spelers.values()) or self.check_length >= len(self.spelers_aan_zet()):
+                logging.debug("einde biedronde(1)")
                 break  # Einde biedronde
 
         self.round_state = "fase_einde"
+        fase = FASEN.get(sum(kaart is not None for kaart in self.river), "onbekend")
+        FASE_DUUR.met(fase).observeer(time.perf_counter() - start)
         logging.info("Biedronde is geëindigd.")
-        print("einde biedronde(2).")
-
-    def compare(self):
-        # compare hands
-        # get the best hand
-        # give the pot to the player with the best hand
-        # if there is a draw, split the pot
-        # Not implemented yet, for now just give the pot to the first player
-        return "1"
-    
+        logging.debug("einde biedronde(2).")
+
+    async def wacht_op_actie(self, speler_uuid:str) -> None:
+        """
+        Wacht op de actie van een speler, maar niet langer dan BEURT_TIJD plus zijn tijdbank.
+        Wat hij boven BEURT_TIJD gebruikt gaat van zijn tijdbank af. De timer staat in het
+        gedeelde BEURT_KLOK-wiel, niet in een eigen asyncio.wait_for.
+        """
+        speler = self.spelers[speler_uuid]
+        start = time.monotonic()
+        self.beurt_uuid = speler_uuid
+        self.beurt_einde = time.time() + BEURT_TIJD + speler.tijdbank
+        timer = BEURT_KLOK.plan(BEURT_TIJD + speler.tijdbank, lambda: self.verloop_beurt(speler))
+        try:
+            await speler.wait_for_action()
+        finally:
+            BEURT_KLOK.annuleer(timer)
+            self.beurt_uuid = self.beurt_einde = None
+        BEURT_DUUR.observeer(time.monotonic() - start)
+        overschreden = time.monotonic() - start - BEURT_TIJD
+        if overschreden > 0:
+            speler.tijdbank = max(0.0, speler.tijdbank - overschreden)
+
+    def automatische_actie(self, speler:Speler) -> dict:
+        """Check als dat kan, anders pas (fold): voor wie te laat is of van tafel gaat."""
+        return {"action": "check" if speler.current_bet >= self.highest_bet else "pass"}
+
+    def verloop_beurt(self, speler:Speler) -> None:
+        """De beurtklok is om: check als dat kan, anders pas (fold)."""
+        speler.mostrecentaction = self.automatische_actie(speler)
+        logging.info("Tijd van speler %s is om, automatisch %s.", speler.naam, speler.mostrecentaction["action"])
+        speler.action_event.set()
+
+    def bereken_allin_equity(self):
+        """
+        Als alle actieve spelers (op hooguit één na) all-in zijn, reken de exacte equity uit.
+        Vanaf de flop zijn dat maximaal 990 run-outs; de turn komt daarna uit de cache.
+        """
+        actieve_spelers = self.actieve_spelers()
+        met_coins = [uuid for uuid in actieve_spelers if self.spelers[uuid].coins > 0]
+        if len(actieve_spelers) < 2 or len(met_coins) > 1 or sum(kaart is not None for kaart in self.river) < 3:
+            if self.equities:
+                self.equities = {}
+                self.markeer_gewijzigd()
+            return
+        resultaten = exacte_equity([self.spelers[uuid].hand for uuid in actieve_spelers], self.river)
+        self.equities = {uuid: resultaat["equity"] for uuid, resultaat in zip(actieve_spelers, resultaten)}
+        self.markeer_gewijzigd()
+
+    def maak_potten(self) -> list[tuple[int, list[str]]]:
+        """
+        Bouw de main pot en side pots uit de inzet van iedere speler (Speler.current_bet).
+
+        Eén keer sorteren op inzet en dan één keer langs: ieder nieuw niveau van een actieve speler
+        sluit een pot, waarin iedereen vanaf hem in de volgorde dat niveau (min het vorige) betaalt.
+
+        Returns:
+        - lijst van (bedrag, [uuids die er aanspraak op maken]), main pot eerst.
+        """
+        volgorde = sorted(self.spelers.items(), key=lambda item: item[1].current_bet)
+        actief = [uuid for uuid, speler in volgorde if not speler.is_Gepast]
+        potten = []
+        vorig_niveau = 0
+        los = 0  # inzet van gepaste spelers boven vorig_niveau, nog niet in een pot
+        i_actief = 0
+        for i, (uuid, speler) in enumerate(volgorde):
+            inzet = speler.current_bet
+            if speler.is_Gepast:
+                los += max(inzet - vorig_niveau, 0)
+                continue
+            if inzet > vorig_niveau:
+                potten.append([los + (inzet - vorig_niveau) * (len(volgorde) - i), actief[i_actief:]])
+                los = 0
+                vorig_niveau = inzet
+            i_actief += 1
+        if not potten:
+            return [(self.pot, actief)] if self.pot and actief else []
+        # Geld boven het hoogste niveau (gepaste spelers) en inzet van vertrokken spelers hoort er ook bij.
+        potten[-1][0] += los
+        potten[0][0] += self.pot - sum(speler.current_bet for _, speler in volgorde)
+        return [(bedrag, gerechtigd) for bedrag, gerechtigd in potten]
+
+    def sterkte_van(self, uuid:str) -> int:
+        """Eindsterkte van de hand van een speler; uit zijn HandStatus als die compleet is."""
+        speler = self.spelers[uuid]
+        if speler.hand_status is not None and speler.hand_status.aantal == 7:
+            return speler.hand_status.sterkte
+        return evalueer([kaart.code for kaart in speler.hand + self.river if kaart])
+
+    def _afstand_tot_deler(self, uuid:str) -> int:
+        """Aantal stoelen links van de deler; bepaalt wie de oneven chip krijgt."""
+        deler = self.spelers.get(self.deler_uuid)
+        deler_stoel = deler.stoelnummer if deler else 0
+        return (self.spelers[uuid].stoelnummer - deler_stoel - 1) % self.MAXSPELERS
+
+    def bepaal_winnaar(self) -> dict[str, int]:
+        """
+        Bepaal de winnaar(s) van de ronde en deel de pot uit, inclusief side pots.
+
+        Alle handen worden één keer geëvalueerd. Een gesplitste pot wordt gelijk verdeeld;
+        oneven chips gaan naar de winnaar(s) die het eerst links van de deler zitten.
 
-    def bepaal_winnaar(self):
-        """Bepaal de winnaar van de ronde en deel de pot uit."""
-        print("De game is klaar")
+        Returns:
+        - {uuid: gewonnen coins}
+        """
+        logging.debug("De game is klaar")
         actieve_spelers = self.actieve_spelers()
         if len(actieve_spelers) == 1:
-            winnaar_uuid = actieve_spelers[0]
+            sterktes = {actieve_spelers[0]: 0}
         else:
-            # for speler_uuid in actieve_spelers:
-            #     for 
-            #     self.compare()
-            # not implemented yet, just give the pot to the first player
-            winnaar_uuid = actieve_spelers[0]
-        winnaar = self.spelers[winnaar_uuid]
-        winnaar.coins += self.pot
-        logging.info(f"Speler {winnaar.naam} wint de pot van {self.pot} coins.")
+            sterktes = {uuid: self.sterkte_van(uuid) for uuid in actieve_spelers}
+
+        uitslag = {}
+        for bedrag, gerechtigd in self.maak_potten():
+            beste = max(sterktes[uuid] for uuid in gerechtigd)
+            winnaars = sorted((uuid for uuid in gerechtigd if sterktes[uuid] == beste), key=self._afstand_tot_deler)
+            deel, oneven = divmod(bedrag, len(winnaars))
+            for i, uuid in enumerate(winnaars):
+                uitslag[uuid] = uitslag.get(uuid, 0) + deel + (1 if i < oneven else 0)
+
+        for uuid, gewonnen in uitslag.items():
+            winnaar = self.spelers[uuid]
+            winnaar.coins += gewonnen
+            self.journaliseer(journaal.WINST, winnaar.stoelnummer, gewonnen)
+            if len(actieve_spelers) > 1:
+                if logging.root.isEnabledFor(logging.INFO):  # hand_naam niet uitrekenen voor niets
+                    logging.info("Speler %s wint %s coins met %s.", winnaar.naam, gewonnen, hand_naam(sterktes[uuid]))
+            else:
+                logging.info("Speler %s wint de pot van %s coins.", winnaar.naam, gewonnen)
+        self.journaliseer(journaal.HAND_EINDE, 0, self.pot)
+        self.pot = 0
+        self.hand_bezig = False
+        self.vuil = True
+        self.markeer_gewijzigd()
+        return uitslag
     
-    async def doe_1_ronde(self,deler_uuid):
-        print("Nieuwe ronde begint")
-        """Execute one full poker round."""
+    async def doe_1_ronde(self,deler_uuid, seed:int = None):
+        """Execute one full poker round. Met een `seed` wordt precies dat deck gedeeld (zie schud)."""
+        logging.debug("Nieuwe ronde begint")
 
         # SETUP
 
+        self.deler_uuid = deler_uuid
         self.pot = 0
         for _,speler in self.spelers.items():
             speler.current_bet = 0
 
         self.highest_bet = 0
+        self.equities = {}
     
         # reset kaarten
         self.river = [None,None,None,None,None] # None represents the lack of a card.
+        # een kopie: wie tijdens de hand gaat zitten speelt pas vanaf de volgende hand mee
+        actieve_spelers:list[str] = self.spelers_met_coins()
         for uuid, speler in self.spelers.items():
             speler.hand = [None,None]
-            speler.is_Gepast = False
+            speler.hand_status = None
+            speler.is_Gepast = uuid not in actieve_spelers  # zonder coins zit je deze hand uit
             speler.current_inzet = 0
+        self.hand_bezig = True
+        self.markeer_gewijzigd()
         # schud kaarten
-        self.kaarten = [Kaart(kleur, waarde) for kleur in self.SUIT_SYMBOLS.keys() for waarde in ["A", "2", "3", "4", "5", "6", "7", "8", "9", "T", "B", "V", "K"]]
-        random.shuffle(self.kaarten)
-        self.deel_kaarten()
+        self.schud(seed)
+        self.deel_kaarten(actieve_spelers)
+        if self.journaal is not None:
+            deler = self.spelers.get(deler_uuid)
+            self.journaliseer(journaal.HAND_START, deler.stoelnummer if deler else 0, len(actieve_spelers), self.hand_seed)
+            for uuid in actieve_spelers:
+                speler = self.spelers[uuid]
+                self.journaliseer(journaal.SPELER, speler.stoelnummer, speler.coins,
+                                  journaal.hole_cards_naar_data(kaart.code for kaart in speler.hand))
 
-        actieve_spelers:list[str] = self.spelers.keys()
         # turn it into an iterator that can loop
         iterator = cycle(actieve_spelers)
-        print("[DEBUG] Making the dealer start.")
+        logging.debug("Making the dealer start.")
         while next(iterator) != deler_uuid:
-            await asyncio.sleep(1)
             continue
 
         # BEGIN
 
         self.eerste_fase(iterator)
-        print("[DEBUG] 0 kaarten in river")
+        logging.debug("0 kaarten in river")
         await self.bied_fase(iterator)
-        self.river[0] = self.kaarten.pop()
-        self.river[1] = self.kaarten.pop()
-        self.river[2] = self.kaarten.pop()
-        print("[DEBUG] 3 kaarten in river")
+        self.leg_kaart_in_river(0)
+        self.leg_kaart_in_river(1)
+        self.leg_kaart_in_river(2)
+        self.bereken_allin_equity()
+        logging.debug("3 kaarten in river")
         await self.bied_fase(iterator)
-        self.river[3] = self.kaarten.pop()
-        print("[DEBUG] 4 kaarten in river")
+        self.leg_kaart_in_river(3)
+        self.bereken_allin_equity()
+        logging.debug("4 kaarten in river")
         await self.bied_fase(iterator)
-        self.river[4] = self.kaarten.pop()
-        print("[DEBUG] 5 kaarten in river")
+        self.leg_kaart_in_river(4)
+        self.bereken_allin_equity()
+        logging.debug("5 kaarten in river")
         await self.bied_fase(iterator)
-        print("[DEBUG] bepaal winnaar")
+        logging.debug("bepaal winnaar")
         self.bepaal_winnaar()
+        self.ruim_vertrekkers_op()
 
     #     # Check for winner
     #     # made by a friend
@@ -368,28 +916,237 @@ class GameState:
 
 
 
-state = GameState()
+class TableManager:
+    """
+    Beheert alle tafels in dit proces: aanmaken, opzoeken, stoelen toewijzen en opruimen.
+    Iedere tafel is een eigen GameState met een eigen game_loop-taak.
+    """
+    def __init__(self, prefix:str = "") -> None:
+        self.prefix = prefix  # bij meerdere workers: "<worker>-", zodat een tafel_id zijn eigenaar verraadt
+        self.tafels:dict[str, GameState] = {}  # {tafel_id: GameState}
+        self.taken:dict[str, asyncio.Task] = {}  # {tafel_id: game_loop-taak}
+        self.met_vrije_stoel:dict[str, None] = {}  # geordende set van tafels met een vrije stoel
+        self.speler_tafel:dict[str, str] = {}  # {client_uuid: tafel_id}
+        self._volgnummer = 0
+
+    def maak_tafel(self, tafel_id:str = None) -> GameState:
+        if tafel_id is None:
+            self._volgnummer += 1
+            while f"{self.prefix}{self._volgnummer}" in self.tafels:  # bijv. hersteld uit een snapshot
+                self._volgnummer += 1
+            tafel_id = f"{self.prefix}{self._volgnummer}"
+        if tafel_id in self.tafels:
+            raise ValueError(f"Tafel {tafel_id} bestaat al.")
+        state = GameState()
+        state.tafel_id = tafel_id
+        state.journaal = JOURNAAL
+        self.tafels[tafel_id] = state
+        self.met_vrije_stoel[tafel_id] = None
+        return state
+
+    def tafel_van(self, client_uuid:str) -> GameState:
+        return self.tafels[self.speler_tafel[client_uuid]]
+
+    def plaats_speler(self, client_uuid:str, speler:Speler, tafel_id:str = None) -> GameState:
+        """
+        Zet een speler aan tafel `tafel_id`, of aan de eerste tafel met een vrije stoel.
+        Een onbekende tafel_id wordt aangemaakt. Raises ValueError als de gevraagde tafel vol is.
+        """
+        if tafel_id is None:
+            tafel_id = next(iter(self.met_vrije_stoel), None)
+        if tafel_id is None or tafel_id not in self.tafels:
+            state = self.maak_tafel(tafel_id)
+        else:
+            state = self.tafels[tafel_id]
+        state.voeg_speler_toe(client_uuid, speler)
+        self.speler_tafel[client_uuid] = state.tafel_id
+        if not state.vrije_stoelen:
+            self.met_vrije_stoel.pop(state.tafel_id, None)
+        if state.tafel_id not in self.taken:
+            self.start_loop(state)
+        return state
+
+    def start_loop(self, state:GameState) -> None:
+        taak = asyncio.create_task(game_loop(state))
+        taak.add_done_callback(lambda taak: self._loop_klaar(state, taak))
+        self.taken[state.tafel_id] = taak
+
+    def _loop_klaar(self, state:GameState, taak:asyncio.Task) -> None:
+        """
+        Done-callback van een game_loop. Een loop die door een fout stopt mag geen dode tafel
+        achterlaten waar nog spelers aan gezet worden: de hand wordt een misdeal en de tafel
+        krijgt een nieuwe loop, of gaat dicht als er niemand meer zit.
+        """
+        if taak.cancelled() or self.taken.get(state.tafel_id) is not taak:
+            return  # gesloten via sluit_tafel
+        del self.taken[state.tafel_id]
+        fout = taak.exception()
+        if fout is not None:
+            logging.error("Game loop van tafel %s gestopt: %r", state.tafel_id, fout, exc_info=fout)
+        state.misdeal()
+        if state.spelers:
+            if state.vrije_stoelen:
+                self.met_vrije_stoel[state.tafel_id] = None
+            self.start_loop(state)
+        else:
+            self.sluit_tafel(state.tafel_id)
+
+    def verwijder_speler(self, client_uuid:str) -> None:
+        tafel_id = self.speler_tafel.pop(client_uuid, None)
+        if tafel_id is None:
+            return
+        state = self.tafels[tafel_id]
+        if state.verwijder_speler(client_uuid):
+            self.na_vertrek(state)
+        # anders is de hand nog bezig; speel_tafel roept na_vertrek aan als hij klaar is
+
+    def na_vertrek(self, state:GameState) -> None:
+        """Een lege tafel gaat dicht, een tafel met een vrije stoel kan weer spelers krijgen."""
+        if not state.spelers:
+            self.sluit_tafel(state.tafel_id)
+        elif state.vrije_stoelen:
+            self.met_vrije_stoel[state.tafel_id] = None
+
+    def sluit_tafel(self, tafel_id:str) -> None:
+        """Ruim een (lege) tafel op en stop zijn game_loop."""
+        taak = self.taken.pop(tafel_id, None)
+        if taak is not None:
+            taak.cancel()
+        self.met_vrije_stoel.pop(tafel_id, None)
+        state = self.tafels.pop(tafel_id, None)
+        if state is not None:
+            for client_uuid in state.spelers:
+                self.speler_tafel.pop(client_uuid, None)
+        HANDEN.verwijder(tafel_id)
+        logging.info("Tafel %s gesloten, nog %s tafels", tafel_id, len(self.tafels))
+
+    def aantal_spelers(self) -> int:
+        return len(self.speler_tafel)
+
+    def herstel(self, snapshot_map:str) -> list[str]:
+        """
+        Zet de tafels uit de snapshots in `snapshot_map` terug, met hun spelers op dezelfde stoelen.
+        Iedere tafel begint met een nieuwe hand. Returns de tafel_ids die hersteld zijn.
+
+        Er is nog niemand verbonden: iedere speler kan met zijn token hervatten (hervat_sessie), en
+        wie niet binnen HERVAT_TIJD terugkomt verliest zijn stoel, net als na een verbroken verbinding.
+        """
+        hersteld = []
+        for tafel_id, spelers in opslag.lees_tafels(snapshot_map):
+            if tafel_id in self.tafels or not spelers:
+                continue
+            state = self.maak_tafel(tafel_id)
+            try:
+                for client_uuid, naam, stoel, coins, tijdbank, token in spelers:
+                    speler = Speler(naam, coins)
+                    speler.tijdbank = tijdbank
+                    state.voeg_speler_toe(client_uuid, speler, stoel=stoel)
+                    self.speler_tafel[client_uuid] = tafel_id
+                    if token is not None:
+                        SESSIES[token] = client_uuid
+                        TOKENS[client_uuid] = token
+                    AFWEZIG[client_uuid] = BEURT_KLOK.plan(HERVAT_TIJD, lambda client_uuid=client_uuid: verloop_sessie(client_uuid))
+            except ValueError as fout:
+                logging.warning("Snapshot van tafel %s overgeslagen: %s", tafel_id, fout)
+                self.sluit_tafel(tafel_id)
+                continue
+            state.vuil = False  # staat al zo op schijf
+            if not state.vrije_stoelen:
+                self.met_vrije_stoel.pop(tafel_id, None)
+            self.start_loop(state)
+            hersteld.append(tafel_id)
+        return hersteld
+
+
+def eigenaar_van_tafel(tafel_id:str, aantal_workers:int) -> int:
+    """Welke worker een tafel host: het nummer voor de "-" als die er is, anders een vaste hash."""
+    match = re.match(r"^(\d+)-", tafel_id)
+    if match and int(match.group(1)) < aantal_workers:
+        return int(match.group(1))
+    return zlib.crc32(tafel_id.encode()) % aantal_workers
+
+
+def register_bericht(client_uuid:str, state:"GameState", formaat:str, token:str, **extra) -> str:
+    """
+    Het "register"-antwoord op een handshake. Met meerdere workers staat de eigen poort van deze
+    worker erbij: via de gedeelde poort kan een hervatting bij een worker landen die het token niet kent.
+    """
+    bericht = {"type": "register", "uuid": client_uuid, "tafel": state.tafel_id, "formaat": formaat, "token": token, **extra}
+    if AANTAL_WORKERS > 1:
+        bericht["port"] = BASIS_POORT + 1 + WORKER_INDEX
+    return json.dumps(bericht)
+
+
+tafels = TableManager()
+_UPDATE_BYTES = {True: UPDATE_BYTES.met("json"), False: UPDATE_BYTES.met("binair")}  # naar text=...
+_UPDATE_BERICHTEN = {True: UPDATE_BERICHTEN.met("json"), False: UPDATE_BERICHTEN.met("binair")}
 
-async def game_loop():
+async def stuur_updates(state:GameState):
     """
-    Periodieke taken voor de game, zoals het bijwerken van de staat.
+    Push de staat naar alle spelers aan een tafel zodra hij verandert, in plaats van te wachten
+    tot iedere client erom vraagt: een snapshot voor nieuwe clients, daarna alleen delta's
+    (zie GameState.update_berichten). broadcast() wacht niet op trage clients.
     """
+    while True:
+        await state.gewijzigd.wait()
+        state.gewijzigd.clear()
+        ontvangers = [client_uuid for client_uuid in state.spelers if client_uuid in USERS]
+        binair = {client_uuid for client_uuid in ontvangers if FORMATEN.get(client_uuid) == protocol.FORMAAT}
+        start = time.perf_counter()
+        berichten = state.update_berichten(ontvangers, binair)
+        UPDATE_TIJD.observeer(time.perf_counter() - start)
+        for client_uuid, bericht in berichten.items():
+            tekst = client_uuid not in binair
+            broadcast([USERS[client_uuid]], bericht, text=tekst)
+            _UPDATE_BYTES[tekst].verhoog(len(bericht))
+            _UPDATE_BERICHTEN[tekst].verhoog()
+        if state.actie_ontvangen is not None:
+            ACTIE_LATENTIE.observeer(time.perf_counter() - state.actie_ontvangen)
+            state.actie_ontvangen = None
+
+
+async def game_loop(state:GameState):
+    """
+    Periodieke taken voor één tafel, zoals het bijwerken van de staat.
+    """
+    updates = asyncio.create_task(stuur_updates(state))
+    try:
+        await speel_tafel(state)
+    finally:
+        updates.cancel()
+
+
+async def speel_tafel(state:GameState):
     # await asyncio.sleep(3)
 
     while len(state.spelers) < 2:
-        print("not enough players")
+        logging.debug("not enough players at table %s", state.tafel_id)
         await asyncio.sleep(3)
-    print("Genoeg spelers")
+    logging.debug("Genoeg spelers aan tafel %s", state.tafel_id)
     await asyncio.sleep(10) # wait for players to vote for start
-    print("De game begint")
+    logging.info("De game begint aan tafel %s", state.tafel_id)
 
 
+    handen = HANDEN.met(state.tafel_id)
     while True:
+        await asyncio.sleep(0)  # geef andere tafels een beurt, ook als deze hand nergens op wachtte
+        deelnemers = state.spelers_met_coins()
+        if len(deelnemers) < 2:
+            # met hooguit één speler met coins valt er niets te spelen: wacht op nieuwe spelers of vertrek
+            tafels.na_vertrek(state)
+            if not state.spelers:
+                return
+            await asyncio.sleep(3)
+            continue
         # Start een nieuwe ronde
-        deler_uuid = random.choice(list(state.spelers.keys()))
+        deler_uuid = state.rng.choice(deelnemers)
 
-        print("[GAME] Game loopt. Bezig met state updates...", "Nieuwe ronde begint")
+        logging.debug("Nieuwe ronde aan tafel %s", state.tafel_id)
         await state.doe_1_ronde(deler_uuid)
+        handen.verhoog()
+        tafels.na_vertrek(state)  # wie tijdens de hand vertrok is nu van tafel (zie GameState.verwijder_speler)
+        if not state.spelers:
+            return
 
 
 
@@ -399,35 +1156,113 @@ async def startup_handshake(websocket):
     Registreer de client, geef een unieke UUID terug en voeg een speler toe aan de game.
     """
     client_uuid:str = str(uuid.uuid4())  # Genereer unieke UUID
-    async with USERS_LOCK:  # Voorkom race conditions
-        USERS[client_uuid] = websocket  # Bewaar websocket met UUID
 
-    print(f"[INFO] Client verbonden met UUID: {client_uuid}")
+    logging.info("Client verbonden met UUID: %s", client_uuid)
 
     msg = await websocket.recv()
     event:dict = json.loads(msg)
+    if "token" in event:
+        hervat_uuid = await hervat_sessie(websocket, event)
+        if hervat_uuid is not None:
+            return hervat_uuid
+        # onbekend of verlopen token: de client gaat als nieuwe speler aan tafel
     if "name" in event:
-        speler_naam = event["name"]
+        speler_naam = str(event["name"])
+        if len(speler_naam.encode()) > protocol.NAAM_BYTES:
+            # het binaire formaat heeft een vast veld voor de naam; afkappen zou JSON en binair laten verschillen
+            await websocket.send(json.dumps({"type": "error", "message": f"Naam is te lang (maximaal {protocol.NAAM_BYTES} bytes)."}))
+            return
     
     else:
     # Voeg een nieuwe speler toe aan de game met een standaardnaam en startcoins
-        speler_naam = f"Speler_{len(state.spelers) + 1}"  # Dynamisch gegenereerde naam
-        print("Er is iets fout gegaan bij het ontvangen van de naam van deze speler")
-        print("Event is ",event)
+        speler_naam = f"Speler_{len(USERS)}"  # Dynamisch gegenereerde naam
+        logging.warning("Er is iets fout gegaan bij het ontvangen van de naam van deze speler: %s", event)
     speler_start_coins = 100  # Standaard aantal coins
     nieuwe_speler = Speler(naam=speler_naam, coins=speler_start_coins)
+    tafel_id = event.get("tafel") # optioneel: aan een specifieke tafel gaan zitten
+    if tafel_id is not None and AANTAL_WORKERS > 1:
+        eigenaar = eigenaar_van_tafel(str(tafel_id), AANTAL_WORKERS)
+        if eigenaar != WORKER_INDEX:
+            # Deze tafel hoort bij een ander proces: stuur de client naar de eigen poort van die worker
+            await websocket.send(json.dumps({"type": "redirect", "port": BASIS_POORT + 1 + eigenaar}))
+            return
     
     try:
-        state.voeg_speler_toe(client_uuid, nieuwe_speler)
-        print(f"[INFO] {speler_naam} toegevoegd aan het spel.")
+        state = tafels.plaats_speler(client_uuid, nieuwe_speler, None if tafel_id is None else str(tafel_id))
+        logging.info("%s toegevoegd aan tafel %s.", speler_naam, state.tafel_id)
         # Stuur de UUID naar de client
-        await websocket.send(json.dumps({"type": "register", "uuid": client_uuid}))
+        # Optioneel binair formaat (protocol.py) als de client erom vraagt; anders JSON zoals altijd
+        formaat = protocol.FORMAAT if protocol.FORMAAT in event.get("formaten", ()) else "json"
+        # Met het token kan de client na een verbroken verbinding zijn stoel terugkrijgen (zie hervat_sessie)
+        token = secrets.token_urlsafe(16)
+        SESSIES[token] = client_uuid
+        TOKENS[client_uuid] = token
+        await websocket.send(register_bericht(client_uuid, state, formaat, token))
     except ValueError as e:
         await websocket.send(json.dumps({"type": "error", "message": str(e)}))
         return  # Stop als er te veel spelers zijn
+    # Pas na "register" mag stuur_updates de client bereiken; de eerste staat volgt direct
+    async with USERS_LOCK:  # Voorkom race conditions
+        USERS[client_uuid] = websocket  # Bewaar websocket met UUID
+        if formaat != "json":
+            FORMATEN[client_uuid] = formaat
+    state.markeer_gewijzigd()
     return client_uuid
 
 
+async def hervat_sessie(websocket, event:dict):
+    """
+    Koppel een nieuwe verbinding aan de sessie van event["token"]: dezelfde speler, stoel en coins.
+    De client stuurt het volgnummer van zijn laatste update mee ("seq") en krijgt alleen de delta's
+    die hij gemist heeft (GameState.inhaal_berichten), of een snapshot als die niet meer in de
+    buffer staan. Returns de client_uuid, of None als de sessie niet (meer) bestaat.
+    """
+    token = event["token"]
+    client_uuid = SESSIES.get(token)
+    if client_uuid is None or client_uuid not in tafels.speler_tafel:
+        return None
+    BEURT_KLOK.annuleer(AFWEZIG.pop(client_uuid, None))
+    state = tafels.tafel_van(client_uuid)
+    formaat = protocol.FORMAAT if protocol.FORMAAT in event.get("formaten", ()) else "json"
+    await websocket.send(register_bericht(client_uuid, state, formaat, token, hervat=True))
+    # Zonder await tot de client in USERS staat, zodat geen push tussen de ingehaalde delta's valt
+    async with USERS_LOCK:
+        oud = USERS.get(client_uuid)
+        USERS[client_uuid] = websocket
+        if formaat != "json":
+            FORMATEN[client_uuid] = formaat
+        else:
+            FORMATEN.pop(client_uuid, None)
+        berichten = state.inhaal_berichten(client_uuid, event.get("seq"), formaat != "json")
+        if berichten is None:
+            state.vraag_snapshot(client_uuid)
+        else:
+            for bericht in berichten:
+                broadcast([websocket], bericht, text=formaat == "json")
+    HERVATTINGEN.met("snapshot" if berichten is None else "inhalen").verhoog()
+    logging.info("Client %s hervat aan tafel %s, %s.", client_uuid, state.tafel_id,
+                 "met een snapshot" if berichten is None else f"{len(berichten) - 1} delta's ingehaald")
+    if oud is not None and oud is not websocket:
+        # een halfopen oude verbinding; zijn handle_message ruimt niets meer op (USERS wijst hierheen)
+        asyncio.create_task(oud.close())
+    return client_uuid
+
+
+def verwijder_sessie(client_uuid:str) -> None:
+    """Haal een speler van tafel en laat zijn token vervallen."""
+    BEURT_KLOK.annuleer(AFWEZIG.pop(client_uuid, None))
+    SESSIES.pop(TOKENS.pop(client_uuid, None), None)
+    tafels.verwijder_speler(client_uuid)
+
+
+def verloop_sessie(client_uuid:str) -> None:
+    """Timer uit AFWEZIG: de client is niet binnen HERVAT_TIJD teruggekomen."""
+    AFWEZIG.pop(client_uuid, None)
+    if client_uuid in USERS:
+        return  # toch weer verbonden
+    logging.info("Client %s is niet teruggekomen en verliest zijn stoel.", client_uuid)
+    verwijder_sessie(client_uuid)
+
 
 async def handle_message(websocket, client_uuid):
     """
@@ -436,6 +1271,7 @@ async def handle_message(websocket, client_uuid):
     try:
         async for message in websocket:
             event = json.loads(message)
+            state = tafels.tafel_van(client_uuid)
 
             # Controleer of de client zijn UUID meestuurt
             if event.get("uuid") != client_uuid:
@@ -456,26 +1292,35 @@ async def handle_message(websocket, client_uuid):
                     await websocket.send(json.dumps({"type": "error", "message": str(e)}))
 
             if event['type'] == 'request gamestate':
-                msg = state.create_state_message(client_uuid) # use uuid or websocket to refer to a specific player?
-                await websocket.send(msg)
+                # Een client die een volgnummer mist (of een oude client die nog pollt) krijgt via
+                # stuur_updates een volledige snapshot, met hetzelfde volgnummer als de delta's van de rest
+                state.vraag_snapshot(client_uuid)
 
 
                         # Verwerk een disconnect event
             if event["type"] == "disconnect":
-                logging.info(f"[INFO] Client {client_uuid} heeft verbinding verbroken via disconnect-event.")
+                logging.info("Client %s heeft verbinding verbroken via disconnect-event.", client_uuid)
                 async with USERS_LOCK:
                     USERS.pop(client_uuid, None)  # Verwijder websocket uit USERS
-                state.verwijder_speler(client_uuid)  # Verwijder speler uit de game state
+                    FORMATEN.pop(client_uuid, None)
+                verwijder_sessie(client_uuid)  # Verwijder speler uit de game state
                 await websocket.send(json.dumps({"type": "info", "message": "Je bent succesvol afgemeld."}))
                 return  # Beëindig de communicatie met deze clien
             
 
     finally:
-        # async with USERS_LOCK:
-        #     del USERS[client_uuid]
-        if client_uuid in state.spelers:
-            del state.spelers[client_uuid]
-        logging.info(f"[INFO] Client {client_uuid} is verbroken.")
+        async with USERS_LOCK:
+            # na een disconnect-event of een hervatting via een nieuwe verbinding is er niets op te ruimen
+            verbonden = USERS.get(client_uuid) is websocket
+            if verbonden:
+                USERS.pop(client_uuid, None)
+                FORMATEN.pop(client_uuid, None)
+        if verbonden and client_uuid in tafels.speler_tafel:
+            # Niet meteen van tafel: de client kan binnen HERVAT_TIJD met zijn token hervatten.
+            # Tot dan speelt de beurtklok voor hem (check of pas).
+            BEURT_KLOK.annuleer(AFWEZIG.pop(client_uuid, None))
+            AFWEZIG[client_uuid] = BEURT_KLOK.plan(HERVAT_TIJD, lambda: verloop_sessie(client_uuid))
+            logging.info("Client %s is verbroken, zijn stoel blijft %s s bezet.", client_uuid, HERVAT_TIJD)
 
 
 
@@ -486,17 +1331,175 @@ async def network_manager(websocket):
     - Steady state processing
     """
     client_uuid = await startup_handshake(websocket)
+    if client_uuid is None:
+        return
     await handle_message(websocket, client_uuid)
 
 
-async def main():
-    game_task = asyncio.create_task(game_loop())  # Start de game loop
-    server_task = serve(network_manager, "192.168.178.110", 8000)  # WebSocket server
+async def stuur_hartslag(verbinding) -> None:
+    """Meld periodiek aan de supervisor dat deze worker leeft, met het aantal tafels en spelers."""
+    while True:
+        verbinding.send({
+            "worker": WORKER_INDEX,
+            "pid": os.getpid(),
+            "tafels": len(tafels.tafels),
+            "spelers": tafels.aantal_spelers(),
+            "tijd": time.time(),
+        })
+        await asyncio.sleep(HARTSLAG_INTERVAL)
+
+
+async def sync_journaal() -> None:
+    """Zet het handjournaal periodiek op schijf; de fsync draait in een thread, niet in de event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            await asyncio.sleep(JOURNAAL_SYNC_INTERVAL)
+            JOURNAAL.flush()  # de buffer alleen vanuit de event loop aanraken
+            await loop.run_in_executor(None, os.fsync, JOURNAAL.fileno())
+    finally:
+        JOURNAAL.sluit()
 
-    print("[INFO] Server gestart op ws://192.168.178.110:8000")
-    await asyncio.gather(game_task, server_task)  # Voer beide taken parallel uit
+
+async def bewaar_tafels(snapshot_map:str, bewaard:set = None) -> None:
+    """
+    Schrijf periodiek een snapshot van iedere tafel die sinds de vorige keer veranderd is, en ruim
+    de bestanden van gesloten tafels op. De snapshots worden in de event loop gemaakt (een paar
+    microseconden per tafel); het schrijven en de fsync gebeuren in een executor.
+    """
+    loop = asyncio.get_running_loop()
+    bewaard = set(bewaard or ())  # tafel_ids met een bestand in snapshot_map
+
+    def verzamel() -> tuple[dict, set]:
+        nonlocal bewaard
+        snapshots = {}
+        for tafel_id, state in tafels.tafels.items():
+            if state.vuil:
+                state.vuil = False
+                snapshots[tafel_id] = state.snapshot()
+        weg = bewaard - tafels.tafels.keys()
+        bewaard = (bewaard - weg) | snapshots.keys()
+        return snapshots, weg
+
+    try:
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            snapshots, weg = verzamel()
+            if not snapshots and not weg:
+                continue
+            try:
+                await loop.run_in_executor(None, opslag.schrijf_tafels, snapshot_map, snapshots, weg)
+            except OSError:
+                logging.exception("Snapshots schrijven mislukt")
+                for tafel_id in snapshots.keys() & tafels.tafels.keys():
+                    tafels.tafels[tafel_id].vuil = True  # volgende keer opnieuw proberen
+    finally:
+        # Bij het afsluiten de laatste wijzigingen meteen wegschrijven, voor een herstart. Niets
+        # verwijderen: tafels die nu sluiten, sluiten omdat hun verbindingen wegvallen.
+        snapshots, _ = verzamel()
+        opslag.schrijf_tafels(snapshot_map, snapshots)
+
+
+async def main(host:str = STANDAARD_HOST, poort:int = STANDAARD_POORT, verbinding = None,
+               journaal_pad:str = None, snapshot_map:str = None, metrics_poort:int = None):
+    """
+    Start de websocket server. Met een `verbinding` (Pipe naar de supervisor) draaien we als één
+    van meerdere workers: de gedeelde poort wordt met SO_REUSEPORT geopend, en daarnaast luistert
+    iedere worker op een eigen poort voor clients die naar zijn tafels worden doorgestuurd.
+    Met een `journaal_pad` wordt elke hand in dat handjournaal vastgelegd (zie journaal.py).
+    Met een `snapshot_map` worden de tafels daaruit hersteld en daarin bijgehouden (zie opslag.py).
+    Met een `metrics_poort` staan de metrics op http://127.0.0.1:<poort>/metrics (zie metingen.py).
+    """
+    global JOURNAAL
+    if journaal_pad is not None:
+        JOURNAAL = journaal.Journaal(journaal_pad)
+        asyncio.create_task(sync_journaal())
+    if snapshot_map is not None:
+        start = time.perf_counter()
+        hersteld = tafels.herstel(snapshot_map)
+        if hersteld:
+            print(f"[INFO] {len(hersteld)} tafels hersteld in {time.perf_counter() - start:.2f}s")
+        asyncio.create_task(bewaar_tafels(snapshot_map, hersteld))
+    if metrics_poort is not None:
+        await metingen.serveer("127.0.0.1", metrics_poort)
+        asyncio.create_task(metingen.meet_lus_vertraging(LUS_VERTRAGING, LUS_VERTRAGING_LAATST))
+    # Iedere tafel krijgt zijn eigen game_loop zodra de eerste speler gaat zitten (zie TableManager)
+    if verbinding is None:
+        server = await serve(network_manager, host, poort)  # WebSocket server
+        print(f"[INFO] Server gestart op ws://{host}:{poort}")
+        await server.serve_forever()
+        return
+
+    gedeeld = await serve(network_manager, host, poort, reuse_port=True)
+    eigen = await serve(network_manager, host, poort + 1 + WORKER_INDEX)
+    print(f"[INFO] Worker {WORKER_INDEX} gestart op ws://{host}:{poort} en ws://{host}:{poort + 1 + WORKER_INDEX}")
+    await asyncio.gather(gedeeld.serve_forever(), eigen.serve_forever(), stuur_hartslag(verbinding))
+
+
+def worker_main(index:int, aantal:int, host:str, poort:int, verbinding, journaal_pad:str = None,
+                snapshot_map:str = None, metrics_poort:int = None) -> None:
+    global WORKER_INDEX, AANTAL_WORKERS, BASIS_POORT, tafels
+    WORKER_INDEX, AANTAL_WORKERS, BASIS_POORT = index, aantal, poort
+    tafels = TableManager(prefix=f"{index}-")
+    # ieder proces schrijft zijn eigen journaal; twee schrijvers in één bestand zouden records door elkaar halen
+    asyncio.run(main(host, poort, verbinding, f"{journaal_pad}.{index}" if journaal_pad else None,
+                     os.path.join(snapshot_map, str(index)) if snapshot_map else None,
+                     metrics_poort + index if metrics_poort is not None else None))
+
+
+def supervisor(aantal:int, host:str, poort:int, journaal_pad:str = None, snapshot_map:str = None,
+               metrics_poort:int = None) -> None:
+    """Start `aantal` worker-processen, houd hun hartslag bij en herstart workers die wegvallen."""
+    workers = {}  # {index: (proces, verbinding)}
+    status = {}  # {index: laatste hartslag}
+
+    def start_worker(index:int) -> None:
+        ouder, kind = multiprocessing.Pipe(duplex=False)
+        proces = multiprocessing.Process(target=worker_main, args=(index, aantal, host, poort, kind, journaal_pad, snapshot_map, metrics_poort), daemon=True)
+        proces.start()
+        workers[index] = (proces, ouder)
+        status[index] = {"tijd": time.time(), "tafels": 0, "spelers": 0}
+
+    for index in range(aantal):
+        start_worker(index)
+    print(f"[SUPERVISOR] {aantal} workers gestart op ws://{host}:{poort}")
+
+    vorige_melding = 0.0
+    while True:
+        time.sleep(HARTSLAG_INTERVAL)
+        for index, (proces, ouder) in list(workers.items()):
+            while ouder.poll():
+                try:
+                    status[index] = ouder.recv()
+                except EOFError:
+                    break
+            if not proces.is_alive() or time.time() - status[index]["tijd"] > HARTSLAG_TIMEOUT:
+                print(f"[SUPERVISOR] Worker {index} reageert niet meer, wordt herstart")
+                proces.kill()
+                proces.join()
+                start_worker(index)
+        if time.time() - vorige_melding >= 10:
+            vorige_melding = time.time()
+            tafels_totaal = sum(melding["tafels"] for melding in status.values())
+            spelers_totaal = sum(melding["spelers"] for melding in status.values())
+            print(f"[SUPERVISOR] {tafels_totaal} tafels, {spelers_totaal} spelers",
+                  {index: melding["tafels"] for index, melding in status.items()})
 
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Poker server")
+    parser.add_argument("--host", default=STANDAARD_HOST)
+    parser.add_argument("--port", type=int, default=STANDAARD_POORT)
+    parser.add_argument("--workers", type=int, default=1, help="aantal processen; meer dan 1 start een supervisor")
+    parser.add_argument("--journaal", default=None, help="leg elke hand vast in dit handjournaal (per worker .<index> erachter)")
+    parser.add_argument("--snapshots", default=None, help="map voor tafelsnapshots; tafels worden daaruit hersteld bij het starten")
+    parser.add_argument("--metrics-poort", type=int, default=None, help="lokale poort voor /metrics (per worker +<index>)")
+    parser.add_argument("--log-niveau", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_niveau)
+    if args.workers > 1:
+        supervisor(args.workers, args.host, args.port, args.journaal, args.snapshots, args.metrics_poort)
+    else:
+        asyncio.run(main(args.host, args.port, journaal_pad=args.journaal, snapshot_map=args.snapshots,
+                         metrics_poort=args.metrics_poort))
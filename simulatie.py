@@ -0,0 +1,122 @@
+"""
+Headless simulatie van complete handen met GameState.doe_1_ronde, zonder websockets of pygame.
+
+Iedere speler krijgt een bot: een functie bot(state, uuid) -> actie-dict (zoals Speler.mostrecentaction)
+die bied_fase direct aanroept in plaats van op Speler.action_event te wachten. Zo kun je de
+inzetlogica en strategieën testen met duizenden handen per seconde.
+
+Na elke hand wordt gecontroleerd dat er geen fiches verdwenen of bijgekomen zijn. Spelers die
+blut zijn kopen opnieuw in voor het startbedrag.
+
+Gebruik:
+    python simulatie.py --handen 10000 --spelers 6 --bot willekeurig --seed 1
+    python simulatie.py --handen 100000 --journaal handen.journaal   # en dan: python journaal.py handen.journaal
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from itertools import cycle
+
+from journaal import Journaal
+from server import GameState, Speler
+
+STANDAARD_COINS = 100
+RAISE_BEDRAG = 10
+
+
+def check_bot(state: GameState, uuid: str) -> dict:
+    """Checkt (en callt) altijd."""
+    return {"action": "check"}
+
+
+def willekeurige_bot(rng: random.Random, kans_pass: float = 0.15, kans_raise: float = 0.15,
+                     bedrag: int = RAISE_BEDRAG):
+    """Bot die willekeurig past, checkt of raiset; raisen alleen als hij het kan betalen."""
+    def bot(state: GameState, uuid: str) -> dict:
+        worp = rng.random()
+        if worp < kans_pass:
+            return {"action": "pass"}
+        speler = state.spelers[uuid]
+        te_betalen = state.highest_bet - speler.current_bet + bedrag
+        if worp < kans_pass + kans_raise and speler.coins >= te_betalen:
+            return {"action": "raise", "amount": bedrag}
+        return {"action": "check"}
+    return bot
+
+
+BOTS = {
+    "check": lambda rng: check_bot,
+    "willekeurig": willekeurige_bot,
+}
+
+
+def maak_tafel(aantal_spelers: int, bot: str = "willekeurig", seed: int = None,
+               coins: int = STANDAARD_COINS) -> GameState:
+    """Een GameState met `aantal_spelers` bots, klaar voor doe_1_ronde."""
+    rng = random.Random(seed)
+    state = GameState(seed=seed)
+    for i in range(aantal_spelers):
+        state.voeg_speler_toe(f"bot-{i}", Speler(f"bot{i}", coins, bot=BOTS[bot](rng)))
+    return state
+
+
+async def speel_handen(state: GameState, aantal: int, coins: int = STANDAARD_COINS) -> dict:
+    """
+    Speel `aantal` handen met een doorschuivende deler.
+
+    Returns:
+    - dict met het aantal gespeelde "handen", "herkocht" (aantal keer opnieuw ingekocht) en
+      "fiche_fouten" (handen waarna het totaal aan fiches niet klopte).
+    """
+    delers = cycle(list(state.spelers))
+    herkocht = fouten = 0
+    for _ in range(aantal):
+        voor = sum(speler.coins for speler in state.spelers.values())
+        await state.doe_1_ronde(next(delers))
+        if sum(speler.coins for speler in state.spelers.values()) != voor or state.pot != 0:
+            fouten += 1
+        for speler in state.spelers.values():
+            if speler.coins <= 0:
+                speler.coins += coins
+                herkocht += 1
+    return {"handen": aantal, "herkocht": herkocht, "fiche_fouten": fouten}
+
+
+def simuleer(handen: int, spelers: int = 6, bot: str = "willekeurig", seed: int = None,
+             coins: int = STANDAARD_COINS, journaal_pad: str = None) -> dict:
+    """
+    Draai een simulatie en geef de resultaten van speel_handen plus "seconden" en "handen_per_seconde".
+    Met een `journaal_pad` worden alle handen in dat handjournaal vastgelegd.
+    """
+    state = maak_tafel(spelers, bot, seed, coins)
+    state.tafel_id = "sim"
+    if journaal_pad is not None:
+        state.journaal = Journaal(journaal_pad)
+    start = time.perf_counter()
+    try:
+        resultaat = asyncio.run(speel_handen(state, handen, coins))
+    finally:
+        if state.journaal is not None:
+            state.journaal.sluit()
+    duur = time.perf_counter() - start
+    resultaat["seconden"] = duur
+    resultaat["handen_per_seconde"] = handen / duur
+    return resultaat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless simulatie van pokerhanden met bots.")
+    parser.add_argument("--handen", type=int, default=10_000)
+    parser.add_argument("--spelers", type=int, default=6, choices=range(2, 9))
+    parser.add_argument("--bot", choices=sorted(BOTS), default="willekeurig")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--coins", type=int, default=STANDAARD_COINS)
+    parser.add_argument("--journaal", default=None, help="leg alle handen vast in dit handjournaal")
+    args = parser.parse_args()
+
+    resultaat = simuleer(args.handen, args.spelers, args.bot, args.seed, args.coins, args.journaal)
+    print(f"{resultaat['handen']} handen met {args.spelers} spelers in {resultaat['seconden']:.2f}s: "
+          f"{resultaat['handen_per_seconde']:,.0f} handen/s")
+    print(f"{resultaat['herkocht']} keer opnieuw ingekocht, {resultaat['fiche_fouten']} handen met een fichefout")
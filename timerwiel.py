@@ -0,0 +1,87 @@
+"""
+Timer wheel: één gedeelde klok voor alle beurt-timers van alle tafels.
+
+In plaats van een asyncio.wait_for (met een eigen timer-handle in de event loop) per speler staan
+alle timers in een ring van `slots` emmers. Eén taak schuift elke `tik` seconden één emmer op en
+vuurt daar de timers af die aan de beurt zijn. Plannen en annuleren zijn O(1), en een tik kost
+alleen de timers in die ene emmer, hoeveel tafels er ook zijn.
+
+Een timer verder weg dan slots * tik seconden telt het aantal rondes af dat hij nog moet wachten.
+Een timer gaat nooit te vroeg af en hooguit één tik te laat.
+"""
+
+import asyncio
+import logging
+import math
+import time
+
+STANDAARD_TIK = 0.1  # seconden per emmer
+STANDAARD_SLOTS = 512  # 512 * 0.1s: timers tot ~51s zonder extra rondes
+
+
+class Timer:
+    """Handle van een geplande timer; geef hem aan TimerWiel.annuleer() om hem te stoppen."""
+    __slots__ = ("callback", "ronden", "emmer")
+
+    def __init__(self, callback, ronden: int, emmer: int):
+        self.callback = callback
+        self.ronden = ronden
+        self.emmer = emmer
+
+
+class TimerWiel:
+    def __init__(self, tik: float = STANDAARD_TIK, slots: int = STANDAARD_SLOTS):
+        self.tik = tik
+        self.slots = slots
+        self._emmers: list[set] = [set() for _ in range(slots)]
+        self._positie = 0  # de emmer die bij de volgende tik afgaat
+        self._taak: asyncio.Task = None
+        self.aantal = 0  # aantal geplande timers
+
+    def plan(self, vertraging: float, callback) -> Timer:
+        """Roep callback() aan na (minstens) `vertraging` seconden. Start de klok als die nog niet loopt."""
+        # De eerstvolgende tik komt binnen één tik, dus na `tikken` emmers verder is de vertraging zeker voorbij
+        tikken = max(0, math.ceil(vertraging / self.tik))
+        ronden, stap = divmod(tikken, self.slots)
+        emmer = (self._positie + stap) % self.slots
+        timer = Timer(callback, ronden, emmer)
+        self._emmers[emmer].add(timer)
+        self.aantal += 1
+        if self._taak is None or self._taak.done():
+            self._taak = asyncio.create_task(self._draai())
+        return timer
+
+    def annuleer(self, timer: Timer) -> None:
+        """Stop een timer; geen effect als hij al is afgegaan of geannuleerd."""
+        if timer is not None and timer in self._emmers[timer.emmer]:
+            self._emmers[timer.emmer].discard(timer)
+            self.aantal -= 1
+
+    def draai_tik(self) -> None:
+        """Schuif één emmer op en vuur de timers af die klaar zijn."""
+        emmer = self._emmers[self._positie]
+        self._positie = (self._positie + 1) % self.slots
+        klaar = []
+        for timer in emmer:
+            if timer.ronden:
+                timer.ronden -= 1
+            else:
+                klaar.append(timer)
+        for timer in klaar:
+            emmer.discard(timer)
+            self.aantal -= 1
+            try:
+                timer.callback()
+            except Exception:
+                logging.exception("Timer callback faalde")
+
+    async def _draai(self) -> None:
+        """Tik op een vaste klok zolang er timers zijn; loopt de event loop achter, dan halen we in."""
+        volgende = time.monotonic()
+        while self.aantal:
+            volgende += self.tik
+            await asyncio.sleep(max(0.0, volgende - time.monotonic()))
+            self.draai_tik()
+            while self.aantal and volgende + self.tik <= time.monotonic():
+                volgende += self.tik
+                self.draai_tik()